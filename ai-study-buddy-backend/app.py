@@ -1,27 +1,44 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, stream_with_context
 from flask_cors import CORS
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from werkzeug.local import LocalProxy
 from datetime import datetime
-from dataclasses import asdict
+import base64
+import binascii
+import click
+import json
+import time
 import uuid
 
 from config import Config
 from services import AIStudyBuddyBackend
 from database import Database
+from json_provider import FastJSONProvider
+from metrics import metrics
+from passwords import PasswordHasher
+from session_import import read_sessions
 
-# Flask Application Setup
-app = Flask(__name__)
-app.config.from_object(Config)
-CORS(app)
+# Routes live on a blueprint so create_app can build the Flask application
+api = Blueprint('api', __name__, cli_group=None)
 
-# Authentication setup
-bcrypt = Bcrypt(app)
-jwt = JWTManager(app)
+# Backend services belong to the application built by create_app; views reach them
+# through current_app so every app gets the database and settings of its own config
+study_buddy = LocalProxy(lambda: current_app.extensions['study_buddy'])
+db = LocalProxy(lambda: current_app.extensions['study_buddy'].db)
+passwords = LocalProxy(lambda: current_app.extensions['passwords'])
 
-# Initialize Backend Services
-study_buddy = AIStudyBuddyBackend()
-db = Database()
+def create_app(config=Config) -> Flask:
+    app = Flask(__name__)
+    app.config.from_object(config)
+    app.json = FastJSONProvider(app)
+    CORS(app)
+    metrics.init_app(app)
+    JWTManager(app)
+    # The routes and the service layer share one Database
+    app.extensions['study_buddy'] = AIStudyBuddyBackend(Database(app.config['DB_PATH']), config)
+    app.extensions['passwords'] = PasswordHasher(app.config['BCRYPT_LOG_ROUNDS'], app.config['BCRYPT_WORKERS'])
+    app.register_blueprint(api)
+    return app
 
 # Helper function to get user ID
 def get_user_id():
@@ -36,8 +53,84 @@ def get_user_id():
         pass
     return request.headers.get('User-ID', 'user-123')
 
+def wants_stream():
+    # Opt in with ?stream=1 or an Accept: text/event-stream header
+    if request.args.get('stream') in ('1', 'true'):
+        return True
+    return request.accept_mimetypes.best == 'text/event-stream'
+
+def sse_response(chunks):
+    def events():
+        for chunk in chunks:
+            yield f"data: {json.dumps({'token': chunk})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode() if key else None
+
+def decode_cursor(cursor):
+    key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    # The (sort value, id) pair of the last row served; anything else is not one of ours
+    if not isinstance(key, list) or len(key) != 2 or not all(isinstance(part, str) for part in key):
+        raise ValueError("Invalid cursor")
+    return tuple(key)
+
+def paginated_listing(fetch_page, user_id):
+    # ?limit=&cursor=&fields= select keyset pagination; returns None for the legacy full listing
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        return None
+    try:
+        default, most = current_app.config['PAGE_SIZE_DEFAULT'], current_app.config['PAGE_SIZE_MAX']
+        limit = max(1, min(int(request.args.get('limit', default)), most))
+        cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        fields = [f for f in request.args.get('fields', '').split(',') if f] or None
+        items, next_cursor = fetch_page(user_id, limit, cursor, fields)
+    except (ValueError, binascii.Error) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"items": items, "next_cursor": encode_cursor(next_cursor)})
+
+def generation_count(count, name='count'):
+    # Items per generated quiz or flashcard set; query strings carry it as digits
+    if isinstance(count, str) and count.isdigit():
+        count = int(count)
+    most = current_app.config['GENERATION_COUNT_MAX']
+    if isinstance(count, bool) or not isinstance(count, int) or not 1 <= count <= most:
+        raise ValueError(f"{name} must be between 1 and {most}")
+    return count
+
+def generation_specs(data, with_difficulty):
+    # Validates {"specs": [{"topic", "difficulty", "count"}]} for the batch generation endpoints
+    specs = (data or {}).get('specs')
+    if not isinstance(specs, list) or not specs:
+        raise ValueError("No specs provided")
+    most = current_app.config['GENERATION_BATCH_LIMIT']
+    if len(specs) > most:
+        raise ValueError(f"At most {most} specs per request")
+    parsed = []
+    for spec in specs:
+        if not isinstance(spec, dict) or not isinstance(spec.get('topic'), str) or not spec['topic'].strip():
+            raise ValueError("Each spec needs a topic")
+        item = {'topic': spec['topic'], 'count': generation_count(spec.get('count', 5))}
+        if with_difficulty:
+            item['difficulty'] = spec.get('difficulty', 'easy')
+        parsed.append(item)
+    return parsed
+
+def job_accepted(job, created):
+    # 202 for a new job; a repeated Idempotency-Key gets the original job back with 200
+    response = jsonify({"job_id": job['id'], "status": job['status'], "status_url": f"/api/jobs/{job['id']}"})
+    response.status_code = 202 if created else 200
+    response.headers['Location'] = f"/api/jobs/{job['id']}"
+    return response
+
+def submit_job(kind, params):
+    job, created = study_buddy.jobs.submit(get_user_id(), kind, params, request.headers.get('Idempotency-Key'))
+    return job_accepted(job, created)
+
 # Authentication Routes
-@app.route('/api/auth/register', methods=['POST'])
+@api.route('/api/auth/register', methods=['POST'])
 def register():
     data = request.get_json()
     email = data.get('email')
@@ -47,7 +140,7 @@ def register():
     if db.get_user_by_email(email):
         return jsonify({"error": "User already exists"}), 400
     
-    hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+    hashed_password = passwords.hash(password)
     user_id = str(uuid.uuid4())
     
     user_data = {
@@ -61,27 +154,29 @@ def register():
         return jsonify({"message": "User created successfully"}), 201
     return jsonify({"error": "Registration failed"}), 500
 
-@app.route('/api/auth/login', methods=['POST'])
+@api.route('/api/auth/login', methods=['POST'])
 def login():
     data = request.get_json()
     email = data.get('email')
     password = data.get('password')
     
-    user = db.get_user_by_email(email)
-    if user and bcrypt.check_password_hash(user['password'], password):
+    user = db.get_credentials_by_email(email)
+    if user and passwords.check(user['password'], password):
+        if passwords.needs_rehash(user['password']):
+            db.update_password_hash(user['id'], passwords.hash(password))
         access_token = create_access_token(identity=user['id'])
         return jsonify({
             "access_token": access_token,
             "user": {
                 "id": user['id'],
-                "email": user['email'],
+                "email": email,
                 "name": user['name']
             }
         })
     
     return jsonify({"error": "Invalid credentials"}), 401
 
-@app.route('/api/auth/me', methods=['GET'])
+@api.route('/api/auth/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
     user_id = get_jwt_identity()
@@ -95,7 +190,7 @@ def get_current_user():
     return jsonify({"error": "User not found"}), 404
 
 # API Routes
-@app.route('/')
+@api.route('/')
 def home():
     return '''
     <!DOCTYPE html>
@@ -120,6 +215,8 @@ def home():
         <div class="endpoint"><strong>GET</strong> <a href="/api/progress">/api/progress</a> - Get progress stats</div>
         <div class="endpoint"><strong>GET</strong> <a href="/api/motivation">/api/motivation</a> - Get motivation</div>
         <div class="endpoint"><strong>GET</strong> <a href="/api/study-plans">/api/study-plans</a> - Get study plans</div>
+        <div class="endpoint"><strong>GET</strong> <a href="/api/cache/stats">/api/cache/stats</a> - AI response cache stats</div>
+        <div class="endpoint"><strong>GET</strong> <a href="/api/metrics">/api/metrics</a> - Prometheus metrics</div>
         
         <h2>Authentication Endpoints:</h2>
         <div class="endpoint"><strong>POST</strong> /api/auth/register - Register new user</div>
@@ -129,7 +226,7 @@ def home():
     </html>
     '''
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
         "status": "healthy", 
@@ -138,37 +235,58 @@ def health_check():
         "version": "2.0.0"
     })
 
-@app.route('/api/user/profile', methods=['GET'])
+@api.route('/api/user/profile', methods=['GET'])
 def get_profile():
     user_id = get_user_id()
     profile = study_buddy.get_user_profile(user_id)
     if profile:
-        return jsonify(asdict(profile))
+        return jsonify(profile.to_json_dict())
     return jsonify({"error": "User not found"}), 404
 
-@app.route('/api/user/profile', methods=['PUT'])
+@api.route('/api/user/profile', methods=['PUT'])
 def update_profile():
     user_id = get_user_id()
     profile_data = request.get_json()
     updated_profile = study_buddy.update_user_profile(user_id, profile_data)
     if updated_profile:
-        return jsonify(asdict(updated_profile))
+        return jsonify(updated_profile.to_json_dict())
     return jsonify({"error": "User not found"}), 404
 
-@app.route('/api/sessions', methods=['GET'])
+@api.route('/api/sessions', methods=['GET'])
 def get_sessions():
     user_id = get_user_id()
+    page = paginated_listing(study_buddy.get_study_sessions_page, user_id)
+    if page is not None:
+        return page
     sessions = study_buddy.get_study_sessions(user_id)
-    return jsonify([asdict(session) for session in sessions])
+    return jsonify([session.to_json_dict() for session in sessions])
 
-@app.route('/api/sessions', methods=['POST'])
+@api.route('/api/sessions', methods=['POST'])
 def create_session():
     user_id = get_user_id()
     session_data = request.get_json()
     session = study_buddy.create_study_session(user_id, session_data)
-    return jsonify(asdict(session))
+    return jsonify(session.to_json_dict())
 
-@app.route('/api/sessions/<session_id>/end', methods=['PUT'])
+@api.route('/api/sessions/batch', methods=['POST'])
+def apply_session_events():
+    user_id = get_user_id()
+    data = request.get_json() or {}
+    events = data.get('events')
+    
+    if not isinstance(events, list) or not events:
+        return jsonify({"error": "No events provided"}), 400
+    most = current_app.config['SESSION_BATCH_LIMIT']
+    if len(events) > most:
+        return jsonify({"error": f"At most {most} events per request"}), 400
+
+    try:
+        results = study_buddy.apply_session_events(user_id, events)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"results": results})
+
+@api.route('/api/sessions/<session_id>/end', methods=['PUT'])
 def end_session(session_id):
     user_id = get_user_id()
     data = request.get_json()
@@ -176,16 +294,18 @@ def end_session(session_id):
     
     session = study_buddy.end_study_session(user_id, session_id, confidence_level)
     if session:
-        return jsonify(asdict(session))
+        return jsonify(session.to_json_dict())
     return jsonify({"error": "Session not found"}), 404
 
-@app.route('/api/sessions/<session_id>/question', methods=['POST'])
+@api.route('/api/sessions/<session_id>/question', methods=['POST'])
 def add_question(session_id):
     user_id = get_user_id()
     data = request.get_json()
     question = data.get('question')
     
     if question:
+        if wants_stream():
+            return sse_response(study_buddy.ask_ai_stream(user_id, session_id, question))
         answer = study_buddy.ask_ai(user_id, session_id, question)
         return jsonify({"message": "Question answered", "answer": answer})
     else:
@@ -196,28 +316,89 @@ def add_question(session_id):
     
     return jsonify({"error": "Session not found"}), 404
 
-@app.route('/api/quiz/generate', methods=['GET'])
+# Generation endpoints are plain sync views: under a WSGI server an async view would still
+# hold its worker for the whole request. LLM_MAX_CONCURRENCY and LLM_QUEUE_TIMEOUT bound
+# how many requests wait on the model at once; run a threaded worker class for cheap waiting.
+@api.route('/api/quiz/generate', methods=['GET'])
 def generate_quiz():
     topic = request.args.get('topic', 'python')
     difficulty = request.args.get('difficulty', 'easy')
-    num_questions = int(request.args.get('numQuestions', 5))
+    try:
+        num_questions = generation_count(request.args.get('numQuestions', 5), 'numQuestions')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # Question ids the student has already seen, comma separated
+    exclude_ids = [i for i in request.args.get('exclude', '').split(',') if i]
     
-    quiz_questions = study_buddy.generate_quiz(topic, difficulty, num_questions)
+    quiz_questions = study_buddy.generate_quiz(topic, difficulty, num_questions, exclude_ids)
     return jsonify(quiz_questions)
 
-@app.route('/api/quiz/submit', methods=['POST'])
+@api.route('/api/quiz/generate-batch', methods=['POST'])
+def generate_quiz_batch():
+    try:
+        specs = generation_specs(request.get_json(), with_difficulty=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    batches = study_buddy.generate_quiz_batch(specs)
+    return jsonify({"results": [dict(spec, questions=questions) for spec, questions in zip(specs, batches)]})
+
+@api.route('/api/quiz/submit', methods=['POST'])
 def submit_quiz():
     data = request.get_json()
     questions = data.get('questions', [])
     answers = data.get('answers', {})
     return jsonify(stats)
 
-@app.route('/api/motivation', methods=['GET'])
+@api.route('/api/progress', methods=['GET'])
+def get_progress():
+    user_id = get_user_id()
+    return jsonify(study_buddy.get_progress_stats(user_id))
+
+@api.route('/api/reviews', methods=['POST'])
+def record_reviews():
+    user_id = get_user_id()
+    data = request.get_json() or {}
+    reviews = data.get('reviews')
+    
+    if not isinstance(reviews, list) or not reviews:
+        return jsonify({"error": "No reviews provided"}), 400
+    most = current_app.config['REVIEW_BATCH_LIMIT']
+    if len(reviews) > most:
+        return jsonify({"error": f"At most {most} reviews per request"}), 400
+
+    try:
+        results = study_buddy.record_reviews(user_id, reviews)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"results": results})
+
+@api.route('/api/reviews/due', methods=['GET'])
+def get_due_reviews():
+    user_id = get_user_id()
+    try:
+        limit = max(1, min(int(request.args.get('limit', 50)), current_app.config['REVIEW_BATCH_LIMIT']))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify(study_buddy.get_due_reviews(user_id, limit))
+
+@api.route('/api/motivation', methods=['GET'])
 def get_motivation():
     message = study_buddy.get_motivational_message()
     return jsonify({"message": message})
 
-@app.route('/api/ask-question', methods=['POST'])
+@api.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    stats = study_buddy.cache.stats()
+    stats['profiles'] = study_buddy.profiles.stats()
+    stats['inflight'] = study_buddy.inflight.stats()
+    stats['semantic'] = study_buddy.answers.stats() if study_buddy.answers else None
+    return jsonify(stats)
+
+@api.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/api/ask-question', methods=['POST'])
 def ask_question_endpoint():
     user_id = get_user_id()
     data = request.get_json()
@@ -228,32 +409,54 @@ def ask_question_endpoint():
 
     # Use a generic session ID for the global chat
     # In a real app, we might want to track this better or create a "global" session per user
+    if wants_stream():
+        return sse_response(study_buddy.ask_ai_stream(user_id, "global-chat", question))
     answer = study_buddy.ask_ai(user_id, "global-chat", question)
     return jsonify({"answer": answer})
 
-@app.route('/api/generate-flashcards', methods=['POST'])
+@api.route('/api/generate-flashcards', methods=['POST'])
 def generate_flashcards():
     data = request.get_json()
     topic = data.get('topic')
-    count = data.get('count', 5)
+    try:
+        count = generation_count(data.get('count', 5))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     flashcards = study_buddy.generate_flashcards(topic, count)
     return jsonify(flashcards), 200
 
-@app.route('/api/study-plans', methods=['POST'])
+@api.route('/api/generate-flashcards/batch', methods=['POST'])
+def generate_flashcards_batch():
+    try:
+        specs = generation_specs(request.get_json(), with_difficulty=False)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    batches = study_buddy.generate_flashcards_batch(specs)
+    return jsonify({"results": [dict(spec, flashcards=cards) for spec, cards in zip(specs, batches)]})
+
+@api.route('/api/study-plans', methods=['POST'])
 def create_study_plan():
     user_id = get_user_id()
     plan_data = request.get_json()
+    if request.args.get('async') == '1':
+        try:
+            return submit_job('study_plan', plan_data or {})
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
     plan = study_buddy.create_study_plan(user_id, plan_data)
-    return jsonify(asdict(plan)), 201
+    return jsonify(plan.to_json_dict()), 201
 
-@app.route('/api/study-plans', methods=['GET'])
+@api.route('/api/study-plans', methods=['GET'])
 def get_study_plans():
     user_id = get_user_id()
+    page = paginated_listing(study_buddy.get_study_plans_page, user_id)
+    if page is not None:
+        return page
     plans = study_buddy.get_study_plans(user_id)
-    return jsonify([asdict(plan) for plan in plans])
+    return jsonify([plan.to_json_dict() for plan in plans])
 
-@app.route('/api/study-plans/<plan_id>', methods=['DELETE'])
+@api.route('/api/study-plans/<plan_id>', methods=['DELETE'])
 def delete_study_plan(plan_id):
     user_id = get_user_id()
     success = study_buddy.delete_study_plan(user_id, plan_id)
@@ -261,5 +464,41 @@ def delete_study_plan(plan_id):
         return jsonify({"message": "Study plan deleted successfully"})
     return jsonify({"error": "Failed to delete study plan"}), 404
 
+@api.route('/api/jobs', methods=['POST'])
+def create_job():
+    data = request.get_json() or {}
+    params = data.get('params', {})
+    if not isinstance(params, dict):
+        return jsonify({"error": "params must be an object"}), 400
+    try:
+        return submit_job(data.get('kind'), params)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@api.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = study_buddy.jobs.get(job_id, get_user_id())
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({key: job[key] for key in ('id', 'kind', 'status', 'result', 'error', 'attempts', 'created_at', 'updated_at')})
+
+@api.cli.command('rebuild-progress')
+def rebuild_progress_command():
+    """Recompute per-user progress aggregates from study_sessions."""
+    db.rebuild_progress()
+    print("Progress aggregates rebuilt.")
+
+@api.cli.command('import-sessions')
+@click.argument('path')
+def import_sessions_command(path):
+    """Bulk-load historical study sessions from a .csv or .jsonl file."""
+    start = time.perf_counter()
+    inserted = db.import_study_sessions(read_sessions(path))
+    elapsed = time.perf_counter() - start
+    print(f"Imported {inserted} sessions in {elapsed:.2f}s ({inserted / max(elapsed, 1e-9):.0f} rows/s).")
+
 if __name__ == '__main__':
+    app = create_app()
+    # Resume jobs left queued or running by a previous process
+    app.extensions['study_buddy'].jobs.start()
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,53 @@
+"""Requests/second for the chat question endpoint with and without connection pooling.
+
+Usage: python benchmarks/bench_db_pool.py [num_requests]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from app import create_app
+
+
+def run(pool_size: int, num_requests: int) -> float:
+    Config.DB_POOL_SIZE = pool_size
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(db_fd)
+
+    class BenchConfig(Config):
+        DB_PATH = db_path
+
+    app = create_app(BenchConfig)
+    study_buddy = app.extensions['study_buddy']
+    study_buddy.has_gemini = False
+
+    with app.test_client() as client:
+        headers = {'User-ID': 'bench-user'}
+        session_id = client.post('/api/sessions', json={'topic': 'python'}, headers=headers).json['id']
+        url = f'/api/sessions/{session_id}/question'
+        payload = {'question': 'What is a list?'}
+
+        start = time.perf_counter()
+        for _ in range(num_requests):
+            client.post(url, json=payload, headers=headers)
+        elapsed = time.perf_counter() - start
+
+    study_buddy.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    return num_requests / elapsed
+
+
+if __name__ == '__main__':
+    num_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    original_size = Config.DB_POOL_SIZE
+    before = run(0, num_requests)
+    after = run(original_size or 8, num_requests)
+    print(f"connect-per-call: {before:8.1f} req/s")
+    print(f"pooled ({original_size or 8:>2} conns): {after:8.1f} req/s")
+    print(f"speedup:          {after / before:8.2f}x")
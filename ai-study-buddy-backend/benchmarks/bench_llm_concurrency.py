@@ -0,0 +1,42 @@
+"""Concurrent throughput of /api/quiz/generate against a local fake model.
+
+Usage: python benchmarks/bench_llm_concurrency.py [model_latency_seconds] [requests]
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from cache import ResponseCache
+from providers import FakeProvider
+
+app = create_app()
+study_buddy = app.extensions['study_buddy']
+
+
+def run(limit: int, latency: float, num_requests: int) -> float:
+    study_buddy.has_gemini = True
+    study_buddy.provider = FakeProvider(latency)
+    study_buddy.cache = ResponseCache()
+    study_buddy.model_slots = threading.BoundedSemaphore(limit)
+
+    def fetch(_):
+        with app.test_client() as client:
+            client.get('/api/quiz/generate?topic=python&difficulty=easy')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_requests) as pool:
+        list(pool.map(fetch, range(num_requests)))
+    return num_requests / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.2
+    num_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    print(f"fake model latency {latency}s, {num_requests} concurrent requests")
+    for limit in (1, 2, 4, 8, 16):
+        print(f"LLM_MAX_CONCURRENCY={limit:>2}: {run(limit, latency, num_requests):8.1f} req/s")
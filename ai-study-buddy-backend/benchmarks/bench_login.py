@@ -0,0 +1,59 @@
+"""Login throughput through the Flask test client, inline bcrypt vs the bounded hashing pool.
+
+Usage: python benchmarks/bench_login.py [concurrent_logins] [bcrypt_rounds]
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from config import Config
+from passwords import PasswordHasher
+
+
+def run(app, workers: int, rounds: int, logins: int) -> float:
+    passwords = app.extensions['passwords'] = PasswordHasher(rounds, workers)
+    credentials = {'email': 'bench@example.com', 'password': 'password123'}
+    with app.test_client() as client:
+        client.post('/api/auth/register', json={**credentials, 'name': 'Bench'})
+        client.post('/api/auth/login', json=credentials)
+
+    def login(_):
+        with app.test_client() as client:
+            assert client.post('/api/auth/login', json=credentials).status_code == 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    passwords.close()
+    return logins / elapsed
+
+
+if __name__ == '__main__':
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(db_fd)
+
+    class BenchConfig(Config):
+        DB_PATH = db_path
+
+    app = create_app(BenchConfig)
+    study_buddy = app.extensions['study_buddy']
+
+    print(f"{logins} logins, bcrypt cost {rounds}, {os.cpu_count()} CPUs")
+    for workers in sorted({0, 1, 2, 4, os.cpu_count() or 1}):
+        with study_buddy.db.connection() as conn:
+            conn.execute('DELETE FROM users')
+        label = 'inline' if workers == 0 else f'{workers} workers'
+        print(f"{label:>12}: {run(app, workers, rounds, logins):8.1f} logins/s")
+
+    study_buddy.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
@@ -0,0 +1,46 @@
+"""Backend overhead per generation request, measured against the fake provider.
+
+With zero model latency everything timed is our own code: routing, caching,
+prompt building, resilience wrappers and JSON parsing. Re-running with a
+realistic latency shows how much of a request that overhead amounts to.
+
+Usage: python benchmarks/bench_provider_overhead.py [model_latency_seconds] [requests]
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from cache import ResponseCache
+from providers import FakeProvider
+
+app = create_app()
+study_buddy = app.extensions['study_buddy']
+
+
+def run(latency: float, num_requests: int) -> list:
+    study_buddy.has_gemini = True
+    study_buddy.provider = FakeProvider(latency)
+    study_buddy.cache = ResponseCache()
+
+    timings = []
+    with app.test_client() as client:
+        for i in range(num_requests):
+            start = time.perf_counter()
+            client.get(f'/api/quiz/generate?topic=topic-{i}&difficulty=easy&numQuestions=5')
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+if __name__ == '__main__':
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 0.05
+    num_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    run(0, 20)  # warm up
+    for label, model_latency in (('no model latency', 0), (f'{latency}s model latency', latency)):
+        timings = sorted(run(model_latency, num_requests))
+        overhead = [t - model_latency for t in timings]
+        print(f"{label:>22}: median {statistics.median(overhead) * 1000:6.2f} ms overhead, "
+              f"p95 {overhead[int(len(overhead) * 0.95)] * 1000:6.2f} ms")
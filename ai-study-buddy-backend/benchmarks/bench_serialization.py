@@ -0,0 +1,59 @@
+"""Time and peak allocations for serializing study sessions to a JSON response body.
+
+Compares the previous path (dict-backed dataclasses, dataclasses.asdict, stdlib json)
+with slotted models, to_json_dict and the orjson-backed provider.
+
+Usage: python benchmarks/bench_serialization.py [sessions]
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, fields, make_dataclass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from json_provider import FastJSONProvider, orjson
+from models import StudySession
+
+LegacySession = make_dataclass('LegacySession', [(f.name, f.type) for f in fields(StudySession)])
+
+
+def build(cls, count: int):
+    return [
+        cls(
+            id=f'session-{i}', user_id='user-1', topic=('python', 'java', 'calculus')[i % 3],
+            duration=30, materials_covered=['notes', 'slides', 'exercises'], questions_asked=i % 7,
+            confidence_level=i % 10, start_time='2023-01-01T10:00:00', end_time='2023-01-01T10:30:00'
+        )
+        for i in range(count)
+    ]
+
+
+def measure(label: str, func):
+    # Timed without tracemalloc, which slows allocation-heavy code several times over
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed * 1000:8.1f} ms  peak {peak / 1024 / 1024:6.2f} MiB")
+    return result
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    provider = FastJSONProvider(Flask(__name__))
+    print(f"{count} sessions, orjson {'available' if orjson else 'not installed'}")
+
+    legacy = measure('build legacy models', lambda: build(LegacySession, count))
+    slotted = measure('build slotted models', lambda: build(StudySession, count))
+
+    measure('asdict + json.dumps', lambda: json.dumps([asdict(s) for s in legacy], separators=(',', ':'), sort_keys=True))
+    measure('to_json_dict + json.dumps', lambda: json.dumps([s.to_json_dict() for s in slotted], separators=(',', ':'), sort_keys=True))
+    measure('to_json_dict + provider', lambda: provider.dumps([s.to_json_dict() for s in slotted]))
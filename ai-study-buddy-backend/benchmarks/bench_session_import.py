@@ -0,0 +1,40 @@
+"""Rows/second for Database.import_study_sessions on synthetic history.
+
+Usage: python benchmarks/bench_session_import.py [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from database import Database
+from models import StudySession
+
+
+def synthetic_sessions(count: int):
+    for i in range(count):
+        yield StudySession(
+            id=f'import-{i}', user_id=f'user-{i % 500}', topic=('python', 'java', 'calculus')[i % 3],
+            duration=30, materials_covered=['notes'], questions_asked=i % 7, confidence_level=i % 10,
+            start_time=f'2023-01-01T10:{i % 60:02d}:00', end_time=f'2023-01-01T10:{i % 60:02d}:30'
+        )
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    db_fd, Config.DB_PATH = tempfile.mkstemp(suffix='.db')
+    os.close(db_fd)
+    db = Database()
+
+    start = time.perf_counter()
+    inserted = db.import_study_sessions(synthetic_sessions(rows))
+    elapsed = time.perf_counter() - start
+    print(f"imported {inserted} sessions in {elapsed:.2f}s: {inserted / elapsed:,.0f} rows/s")
+
+    db.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(Config.DB_PATH + suffix):
+            os.remove(Config.DB_PATH + suffix)
@@ -0,0 +1,61 @@
+"""Cold-start cost: time to import and build the app and to serve the first requests.
+
+Each run is a fresh interpreter against a scratch database, first with an
+empty file (schema created) and then with the same file again (schema current).
+The fake provider stands in for the model so no network is involved.
+
+Usage: python benchmarks/bench_startup.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+client = app.test_client()
+client.get('/api/health')
+first_request = time.perf_counter()
+client.get('/api/quiz/generate?topic=python&difficulty=easy')
+first_generation = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'create app': created - imported,
+    'first request': first_request - created,
+    'first generation': first_generation - first_request,
+}))
+'''
+
+
+def probe(db_path: str) -> dict:
+    env = dict(os.environ, DB_PATH=db_path, LLM_PROVIDER='fake', FAKE_MODEL_LATENCY='0', LLM_CACHE_BACKEND='memory')
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report(label: str, samples: list):
+    print(label)
+    for stage in samples[0]:
+        print(f"  {stage:>16}: median {statistics.median(s[stage] for s in samples) * 1000:7.1f} ms")
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    fresh, existing = [], []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'startup.db')
+            fresh.append(probe(db_path))
+            existing.append(probe(db_path))
+    report('empty database', fresh)
+    report('existing database', existing)
@@ -0,0 +1,477 @@
+import copy
+import json
+import math
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from database import Database, get_pool
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class ResponseCache:
+    """Base class for caches of parsed LLM responses.
+
+    Values are stored as JSON so every hit hands out a fresh copy that callers
+    are free to mutate.
+    """
+
+    backend = 'none'
+
+    def __init__(self, ttl: float = 0, max_entries: int = 0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(kind: str, **params) -> str:
+        normalized = {}
+        for name, value in params.items():
+            if isinstance(value, str):
+                value = ' '.join(value.lower().split())
+            normalized[name] = value
+        return f"{kind}:{json.dumps(normalized, sort_keys=True)}"
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._get(key)
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any):
+        expires_at = time.time() + self.ttl if self.ttl > 0 else None
+        self._set(key, json.dumps(value), expires_at)
+
+    def clear(self):
+        pass
+
+    def size(self) -> int:
+        return 0
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': self.size(),
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0
+        }
+
+    def _get(self, key: str) -> Optional[str]:
+        return None
+
+    def _set(self, key: str, raw: str, expires_at: Optional[float]):
+        pass
+
+
+class MemoryCache(ResponseCache):
+    backend = 'memory'
+
+    def __init__(self, ttl: float = 0, max_entries: int = 1000):
+        super().__init__(ttl, max_entries)
+        self._entries = OrderedDict()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            raw, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return raw
+
+    def _set(self, key: str, raw: str, expires_at: Optional[float]):
+        with self._lock:
+            self._entries[key] = (raw, expires_at)
+            self._entries.move_to_end(key)
+            while self.max_entries and len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(ResponseCache):
+    """Persistent cache so warm entries survive restarts."""
+
+    backend = 'sqlite'
+
+    def __init__(self, db_path: str, ttl: float = 0, max_entries: int = 1000):
+        super().__init__(ttl, max_entries)
+        # The response_cache table comes from database.MIGRATIONS like the rest of the schema
+        Database(db_path)
+        self.pool = get_pool(db_path)
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT value, expires_at FROM response_cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None and row[1] <= now:
+                conn.execute('DELETE FROM response_cache WHERE key = ?', (key,))
+                return None
+            conn.execute('UPDATE response_cache SET last_used = ? WHERE key = ?', (now, key))
+        return row[0]
+
+    def _set(self, key: str, raw: str, expires_at: Optional[float]):
+        with self.pool.connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO response_cache (key, value, expires_at, last_used)
+                VALUES (?, ?, ?, ?)
+            ''', (key, raw, expires_at, time.time()))
+            if self.max_entries:
+                cursor = conn.execute('''
+                    DELETE FROM response_cache WHERE key IN (
+                        SELECT key FROM response_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                    )
+                ''', (self.max_entries,))
+                with self._lock:
+                    self.evictions += max(cursor.rowcount, 0)
+
+    def clear(self):
+        with self.pool.connection() as conn:
+            conn.execute('DELETE FROM response_cache')
+
+    def size(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM response_cache').fetchone()[0]
+
+
+class ProfileCache:
+    """In-process LRU of UserProfile objects keyed by user id.
+
+    With ``version_lookup`` set, every hit is checked against the row's version
+    column (a primary-key lookup without JSON decoding), so profiles updated by
+    another worker process are never served stale.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 300,
+                 version_lookup: Optional[Callable[[str], Optional[int]]] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_lookup = version_lookup
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and self.ttl > 0 and entry[2] <= time.monotonic():
+                del self._entries[user_id]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+
+        if entry is not None and self.version_lookup is not None and self.version_lookup(user_id) != entry[1]:
+            self.invalidate(user_id)
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry[0]
+
+    def put(self, user_id: str, profile: Any, version: int = 0):
+        with self._lock:
+            self._entries[user_id] = (profile, version, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while self.max_entries and len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'validated': self.version_lookup is not None,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0
+        }
+
+
+EMBEDDING_DIMENSIONS = 1024
+# Words that change how a question is phrased but not what it asks
+QUESTION_STOPWORDS = frozenset(
+    'a an the is are was were be been do does did i me my we you your it its this that these those of in on at '
+    'for to with about into and or s please can could would will explain tell describe define what'.split()
+)
+# One word can turn a question into its opposite while barely moving its vector, so
+# questions only match others with the same polarity
+NEGATIONS = frozenset('not no never without'.split())
+
+
+def _stem(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+
+
+def question_terms(question: str) -> List[str]:
+    words = re.findall(r"[a-z0-9+#]+", re.sub(r"n['’]t\b", ' not', question.lower()))
+    return [_stem(word) for word in words if word not in QUESTION_STOPWORDS]
+
+
+def is_negated(terms: List[str]) -> bool:
+    return any(term in NEGATIONS for term in terms)
+
+
+def embed_question(terms: List[str]) -> Dict[int, float]:
+    """Sparse unit vector of hashed words and in-word character trigrams.
+
+    Words dominate; trigrams give partial credit for typos and inflections.
+    crc32 keeps bucket assignment stable across processes.
+    """
+    vector: Dict[int, float] = {}
+    for term in terms:
+        features = [(term, 1.0)]
+        padded = f' {term} '
+        features.extend((padded[i:i + 3], 0.25) for i in range(len(padded) - 2))
+        for feature, weight in features:
+            h = zlib.crc32(feature.encode())
+            bucket = h % EMBEDDING_DIMENSIONS
+            vector[bucket] = vector.get(bucket, 0.0) + (weight if h & 0x80000000 else -weight)
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    return {bucket: value / norm for bucket, value in vector.items()} if norm else {}
+
+
+class _TopicAnswers:
+    __slots__ = ('entries', 'matrix', 'keys', 'negated')
+
+    def __init__(self):
+        # normalized question -> (vector, answer, expires_at, negated)
+        self.entries = OrderedDict()
+        self.matrix = None
+        self.keys = None
+        self.negated = None
+
+
+class SemanticCache:
+    """Chat answers found again by meaning rather than exact wording.
+
+    Questions are embedded locally as hashed word and character-trigram vectors
+    and compared by cosine similarity against earlier questions on the same
+    topic; a match at or above ``threshold`` returns the stored answer, provided
+    both questions are negated or neither is (see ``NEGATIONS``). Search
+    uses NumPy when it is installed and a sparse dot product otherwise. Each
+    topic keeps its ``max_entries`` most recently used answers and at most
+    ``max_topics`` topics are kept.
+    """
+
+    def __init__(self, threshold: float = 0.85, max_entries: int = 500, max_topics: int = 200, ttl: float = 0):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_topics = max_topics
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._topics: Dict[str, _TopicAnswers] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, topic: str, question: str) -> Optional[str]:
+        terms = question_terms(question)
+        vector = embed_question(terms)
+        with self._lock:
+            answer = self._lookup(self._topic_key(topic), ' '.join(terms), vector, is_negated(terms)) if vector else None
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return answer
+
+    def put(self, topic: str, question: str, answer: str):
+        terms = question_terms(question)
+        vector = embed_question(terms)
+        if not vector:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+        topic_key = self._topic_key(topic)
+        with self._lock:
+            answers = self._topics.get(topic_key)
+            if answers is None:
+                answers = self._topics[topic_key] = _TopicAnswers()
+                while self.max_topics and len(self._topics) > self.max_topics:
+                    _, dropped = self._topics.popitem(last=False)
+                    self.evictions += len(dropped.entries)
+            self._topics.move_to_end(topic_key)
+            key = ' '.join(terms)
+            answers.entries[key] = (vector, answer, expires_at, is_negated(terms))
+            answers.entries.move_to_end(key)
+            while self.max_entries and len(answers.entries) > self.max_entries:
+                answers.entries.popitem(last=False)
+                self.evictions += 1
+            answers.matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._topics.clear()
+
+    def size(self) -> int:
+        with self._lock:
+            return sum(len(answers.entries) for answers in self._topics.values())
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': self.size(),
+            'topics': len(self._topics),
+            'threshold': self.threshold,
+            'vectorized': np is not None,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0
+        }
+
+    @staticmethod
+    def _topic_key(topic: str) -> str:
+        return ' '.join(topic.lower().split())
+
+    def _lookup(self, topic_key: str, key: str, vector: Dict[int, float], negated: bool) -> Optional[str]:
+        answers = self._topics.get(topic_key)
+        if answers is None or not answers.entries:
+            return None
+        if key not in answers.entries:
+            key, score = self._nearest(answers, vector, negated)
+            if score < self.threshold:
+                return None
+        _, answer, expires_at, _ = answers.entries[key]
+        if expires_at is not None and expires_at <= time.monotonic():
+            del answers.entries[key]
+            answers.matrix = None
+            return None
+        answers.entries.move_to_end(key)
+        self._topics.move_to_end(topic_key)
+        return answer
+
+    def _nearest(self, answers: _TopicAnswers, vector: Dict[int, float], negated: bool) -> Tuple[str, float]:
+        if np is None:
+            best_key, best_score = None, -1.0
+            for key, (stored, _, _, stored_negated) in answers.entries.items():
+                if stored_negated != negated:
+                    continue
+                score = sum(value * stored.get(bucket, 0.0) for bucket, value in vector.items())
+                if score > best_score:
+                    best_key, best_score = key, score
+            return best_key, best_score
+
+        if answers.matrix is None:
+            # Rebuilt lazily; inserts only happen after a model call, so this is rare
+            answers.keys = list(answers.entries)
+            answers.matrix = np.zeros((len(answers.keys), EMBEDDING_DIMENSIONS), dtype=np.float32)
+            for row, key in enumerate(answers.keys):
+                stored = answers.entries[key][0]
+                answers.matrix[row, list(stored)] = list(stored.values())
+            answers.negated = np.array([answers.entries[key][3] for key in answers.keys])
+        query = np.zeros(EMBEDDING_DIMENSIONS, dtype=np.float32)
+        query[list(vector)] = list(vector.values())
+        scores = np.where(answers.negated == negated, answers.matrix @ query, -1.0)
+        row = int(scores.argmax())
+        return answers.keys[row], float(scores[row])
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one execution.
+
+    The first caller runs the function; callers arriving while it is in flight
+    wait and receive a copy of the same result (or the same exception).
+    """
+
+    def __init__(self):
+        self.leaders = 0
+        self.coalesced = 0
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, func: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        # Returns (result, shared); a waiter that gives up after timeout gets (None, True)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                return None, True
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {'leaders': self.leaders, 'coalesced': self.coalesced, 'in_flight': in_flight}
+
+
+def create_response_cache(config=Config) -> ResponseCache:
+    backend = config.LLM_CACHE_BACKEND
+    if backend == 'memory':
+        return MemoryCache(config.LLM_CACHE_TTL, config.LLM_CACHE_MAX_ENTRIES)
+    if backend == 'sqlite':
+        return SQLiteCache(config.LLM_CACHE_PATH, config.LLM_CACHE_TTL, config.LLM_CACHE_MAX_ENTRIES)
+    return ResponseCache()
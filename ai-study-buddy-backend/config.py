@@ -5,4 +5,83 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-change-in-production'
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'dev-secret-key')
     DB_PATH = os.environ.get('DB_PATH', 'study_buddy.db')
+    # Max connections kept open per database file; 0 disables pooling (connect per call)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+    DB_STATEMENT_CACHE_SIZE = int(os.environ.get('DB_STATEMENT_CACHE_SIZE', 128))
+    DB_BUSY_TIMEOUT = float(os.environ.get('DB_BUSY_TIMEOUT', 5.0))
+    # bcrypt cost for new hashes; logins with an older cost are transparently rehashed
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    # Concurrent password hashes, 0 hashes on the request thread
+    BCRYPT_WORKERS = int(os.environ.get('BCRYPT_WORKERS', os.cpu_count() or 1))
+    # Model backend: gemini, fake (offline, deterministic) or none
+    LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'gemini')
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+    GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-2.5-flash')
+    # Fake provider: base latency and random extra in seconds, share of failed calls, RNG seed
+    FAKE_MODEL_LATENCY = float(os.environ.get('FAKE_MODEL_LATENCY', 0.5))
+    FAKE_MODEL_JITTER = float(os.environ.get('FAKE_MODEL_JITTER', 0.0))
+    FAKE_MODEL_FAILURE_RATE = float(os.environ.get('FAKE_MODEL_FAILURE_RATE', 0.0))
+    FAKE_MODEL_SEED = int(os.environ.get('FAKE_MODEL_SEED', 0))
+    # Worker threads for concurrent model calls and the per-step deadline in seconds
+    LLM_MAX_WORKERS = int(os.environ.get('LLM_MAX_WORKERS', 32))
+    LLM_STEP_TIMEOUT = float(os.environ.get('LLM_STEP_TIMEOUT', 30))
+    # Max in-flight model calls and how long a call may wait for a slot before falling back
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 16))
+    LLM_QUEUE_TIMEOUT = float(os.environ.get('LLM_QUEUE_TIMEOUT', 10))
+    # Model call resilience: overall deadline per call including retries, retries for
+    # transient errors with jittered exponential backoff, circuit breaker on the
+    # transient failure rate, and hedging after this latency quantile (0 disables)
+    LLM_CALL_DEADLINE = float(os.environ.get('LLM_CALL_DEADLINE', 20))
+    LLM_RETRIES = int(os.environ.get('LLM_RETRIES', 2))
+    LLM_RETRY_BACKOFF = float(os.environ.get('LLM_RETRY_BACKOFF', 0.5))
+    LLM_BREAKER_THRESHOLD = float(os.environ.get('LLM_BREAKER_THRESHOLD', 0.5))
+    LLM_BREAKER_WINDOW = int(os.environ.get('LLM_BREAKER_WINDOW', 20))
+    LLM_BREAKER_MIN_CALLS = int(os.environ.get('LLM_BREAKER_MIN_CALLS', 10))
+    LLM_BREAKER_COOLDOWN = float(os.environ.get('LLM_BREAKER_COOLDOWN', 30))
+    LLM_HEDGE_QUANTILE = float(os.environ.get('LLM_HEDGE_QUANTILE', 0))
+    # Streamed answers: deadline for the whole stream and the longest wait for the next chunk
+    LLM_STREAM_DEADLINE = float(os.environ.get('LLM_STREAM_DEADLINE', 60))
+    LLM_STREAM_IDLE_TIMEOUT = float(os.environ.get('LLM_STREAM_IDLE_TIMEOUT', 15))
+    # Chat memory: token cap for conversation context in a prompt, verbatim history kept
+    # before the oldest turns are folded into the running summary, and the summary's cap
+    CHAT_CONTEXT_TOKENS = int(os.environ.get('CHAT_CONTEXT_TOKENS', 1500))
+    CHAT_RECENT_TOKENS = int(os.environ.get('CHAT_RECENT_TOKENS', 1000))
+    CHAT_SUMMARY_TOKENS = int(os.environ.get('CHAT_SUMMARY_TOKENS', 300))
+    # Semantic cache for chat answers: cosine similarity needed for a hit, answers kept per
+    # topic, topics kept, and entry lifetime in seconds
+    SEMANTIC_CACHE_ENABLED = os.environ.get('SEMANTIC_CACHE_ENABLED', '1').lower() not in ('0', 'false', 'no')
+    SEMANTIC_CACHE_THRESHOLD = float(os.environ.get('SEMANTIC_CACHE_THRESHOLD', 0.85))
+    SEMANTIC_CACHE_TOPIC_SIZE = int(os.environ.get('SEMANTIC_CACHE_TOPIC_SIZE', 500))
+    SEMANTIC_CACHE_MAX_TOPICS = int(os.environ.get('SEMANTIC_CACHE_MAX_TOPICS', 200))
+    SEMANTIC_CACHE_TTL = float(os.environ.get('SEMANTIC_CACHE_TTL', 24 * 60 * 60))
+    # UserProfile cache; set PROFILE_CACHE_VALIDATE when running several worker processes
+    PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', 1000))
+    PROFILE_CACHE_TTL = float(os.environ.get('PROFILE_CACHE_TTL', 300))
+    PROFILE_CACHE_VALIDATE = os.environ.get('PROFILE_CACHE_VALIDATE', '').lower() in ('1', 'true', 'yes')
+    # Per-route, Database and model call metrics served at /api/metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no')
+    # Max specs per batch generation request, items per spec, and the output tokens one
+    # batched prompt may ask for
+    GENERATION_BATCH_LIMIT = int(os.environ.get('GENERATION_BATCH_LIMIT', 50))
+    GENERATION_COUNT_MAX = int(os.environ.get('GENERATION_COUNT_MAX', 20))
+    LLM_BATCH_TOKEN_BUDGET = int(os.environ.get('LLM_BATCH_TOKEN_BUDGET', 6000))
+    # Background generation jobs: worker threads, idle poll interval, lease before a
+    # stalled job is retried, and tries before it is marked failed
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1.0))
+    JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 300))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+    # Offline quiz questions, re-read when the file changes
+    QUIZ_BANK_PATH = os.environ.get('QUIZ_BANK_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'quiz_bank.json'))
+    QUIZ_BANK_RELOAD_INTERVAL = float(os.environ.get('QUIZ_BANK_RELOAD_INTERVAL', 5))
+    # Page sizes for cursor-paginated listings
+    PAGE_SIZE_DEFAULT = int(os.environ.get('PAGE_SIZE_DEFAULT', 20))
+    PAGE_SIZE_MAX = int(os.environ.get('PAGE_SIZE_MAX', 100))
+    # Max items accepted by one POST /api/reviews or /api/sessions/batch call
+    REVIEW_BATCH_LIMIT = int(os.environ.get('REVIEW_BATCH_LIMIT', 500))
+    SESSION_BATCH_LIMIT = int(os.environ.get('SESSION_BATCH_LIMIT', 500))
+    # Cache for generated quizzes, flashcards, goals and resources: memory, sqlite or none
+    LLM_CACHE_BACKEND = os.environ.get('LLM_CACHE_BACKEND', 'memory')
+    LLM_CACHE_TTL = float(os.environ.get('LLM_CACHE_TTL', 24 * 60 * 60))
+    LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 1000))
+    LLM_CACHE_PATH = os.environ.get('LLM_CACHE_PATH', DB_PATH)
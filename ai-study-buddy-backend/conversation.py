@@ -0,0 +1,108 @@
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+
+from database import Database
+
+ROLE_LABELS = {'student': 'Student', 'assistant': 'Study Buddy'}
+SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+RECENT_HEADER = "Recent conversation:\n"
+
+
+def estimate_tokens(text: str) -> int:
+    # About four characters per token for English; close enough for budgeting
+    return len(text) // 4 + 1
+
+
+def clip_tokens(text: str, max_tokens: int) -> str:
+    # Keeps the end of the text, which holds the most recent content
+    limit = max(max_tokens - 1, 0) * 4
+    if len(text) <= limit:
+        return text
+    clipped = text[len(text) - limit:]
+    newline = clipped.find('\n')
+    return clipped[newline + 1:] if 0 <= newline < len(clipped) - 1 else clipped
+
+
+def format_turn(role: str, content: str) -> str:
+    return f"{ROLE_LABELS.get(role, role)}: {content}"
+
+
+def extractive_summary(summary: str, turns: List[Dict], max_tokens: int) -> str:
+    """Offline summary: the first sentence of each folded turn appended to the
+    running summary, dropping the oldest lines once over ``max_tokens``."""
+    lines = [summary] if summary else []
+    for turn in turns:
+        first_sentence = re.split(r'(?<=[.?!])\s', turn['content'].strip(), maxsplit=1)[0]
+        lines.append(format_turn(turn['role'], first_sentence[:300]))
+    return clip_tokens('\n'.join(lines), max_tokens)
+
+
+class ConversationMemory:
+    """Chat history per study session, held to a fixed token budget.
+
+    Recent turns are kept verbatim. Once they add up to more than
+    ``recent_tokens``, ``compact`` folds the oldest into a running summary via
+    ``summarize(summary, turns)``; each compaction only reads the turns it
+    folds, so its cost does not grow with the session. ``context`` returns the
+    summary plus as many recent turns as fit in ``context_tokens``.
+    """
+
+    def __init__(self, db: Database, context_tokens: int = 1500, recent_tokens: int = 1000,
+                 summary_tokens: int = 300, summarize: Optional[Callable[[str, List[Dict]], str]] = None):
+        self.db = db
+        self.context_tokens = context_tokens
+        self.recent_tokens = recent_tokens
+        self.summary_tokens = summary_tokens
+        self.summarize = summarize or (lambda summary, turns: extractive_summary(summary, turns, summary_tokens))
+        self._compacting = set()
+        self._lock = threading.Lock()
+
+    def context(self, session_id: str) -> str:
+        summary, _, turns = self.db.get_conversation(session_id)
+        budget = self.context_tokens - estimate_tokens(SUMMARY_HEADER + RECENT_HEADER)
+        if summary:
+            summary = clip_tokens(summary, min(self.summary_tokens, budget))
+            budget -= estimate_tokens(summary)
+
+        recent = []
+        for turn in reversed(turns):
+            if turn['tokens'] > budget:
+                break
+            budget -= turn['tokens']
+            recent.append(format_turn(turn['role'], turn['content']))
+
+        sections = []
+        if summary:
+            sections.append(SUMMARY_HEADER + summary)
+        if recent:
+            sections.append(RECENT_HEADER + '\n'.join(reversed(recent)))
+        return '\n'.join(sections)
+
+    def record(self, session_id: str, question: str, answer: str):
+        self.db.add_conversation_turns(session_id, [
+            (role, content, estimate_tokens(format_turn(role, content)))
+            for role, content in (('student', question), ('assistant', answer))
+        ])
+
+    def compact(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id in self._compacting:
+                return False
+            self._compacting.add(session_id)
+        try:
+            summary, through, turns = self.db.get_conversation(session_id)
+            total = sum(turn['tokens'] for turn in turns)
+            if total <= self.recent_tokens:
+                return False
+            # Fold down to half the window so compaction runs every few exchanges, not every message
+            folded = []
+            while turns and total > self.recent_tokens // 2:
+                turn = turns.pop(0)
+                total -= turn['tokens']
+                folded.append(turn)
+            new_summary = clip_tokens(self.summarize(summary, folded), self.summary_tokens)
+            return self.db.save_conversation_summary(session_id, new_summary, folded[-1]['id'], through)
+        finally:
+            with self._lock:
+                self._compacting.discard(session_id)
@@ -1,16 +1,320 @@
 import sqlite3
 import json
+import queue
+import threading
+from contextlib import contextmanager
 from typing import Optional, Dict, List
 from models import UserProfile, StudySession, StudyPlan
 from config import Config
+from metrics import instrument_database
 
+# UPDATE ... RETURNING needs SQLite 3.35+
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Column order of the listing tables, used for field projection and paging
+SESSION_COLUMNS = ['id', 'user_id', 'topic', 'duration', 'materials_covered', 'questions_asked',
+                   'confidence_level', 'start_time', 'end_time']
+PLAN_COLUMNS = ['id', 'user_id', 'topic', 'total_hours', 'daily_hours', 'weekly_goals', 'resources',
+                'assessment_schedule', 'deadline', 'created_at']
+JSON_COLUMNS = {'materials_covered', 'weekly_goals', 'resources', 'assessment_schedule'}
+
+# Recomputes the progress aggregates from study_sessions
+REBUILD_PROGRESS = [
+    'DELETE FROM user_progress',
+    'DELETE FROM user_topic_progress',
+    '''INSERT INTO user_progress (user_id, total_study_time, sessions_completed, questions_asked, confidence_sum)
+        SELECT user_id, SUM(duration), COUNT(*), SUM(COALESCE(questions_asked, 0)), SUM(COALESCE(confidence_level, 0))
+        FROM study_sessions GROUP BY user_id''',
+    '''INSERT INTO user_topic_progress (user_id, topic, minutes, session_count)
+        SELECT user_id, topic, SUM(duration), COUNT(*)
+        FROM study_sessions GROUP BY user_id, topic''',
+]
+
+# Schema changes applied on top of the base tables, in order. Each entry runs
+# once per database file; the applied version is recorded in schema_version.
+MIGRATIONS = [
+    # 1: per-user indexes so listings scale with the user's own history
+    [
+        'CREATE INDEX IF NOT EXISTS idx_study_sessions_user_start ON study_sessions (user_id, start_time)',
+        'CREATE INDEX IF NOT EXISTS idx_study_plans_user_created ON study_plans (user_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_quiz_progress_user_next_review ON quiz_progress (user_id, next_review)',
+    ],
+    # 2: one progress row per user and question, so reviews can upsert
+    [
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_quiz_progress_user_question ON quiz_progress (user_id, question_id)',
+    ],
+    # 3: per-user progress aggregates kept in step with study_sessions by triggers
+    [
+        '''CREATE TABLE IF NOT EXISTS user_progress (
+            user_id TEXT PRIMARY KEY,
+            total_study_time INTEGER NOT NULL DEFAULT 0,
+            sessions_completed INTEGER NOT NULL DEFAULT 0,
+            questions_asked INTEGER NOT NULL DEFAULT 0,
+            confidence_sum INTEGER NOT NULL DEFAULT 0
+        )''',
+        '''CREATE TABLE IF NOT EXISTS user_topic_progress (
+            user_id TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            minutes INTEGER NOT NULL DEFAULT 0,
+            session_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, topic)
+        )''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_study_sessions_progress_insert AFTER INSERT ON study_sessions
+        BEGIN
+            INSERT INTO user_progress (user_id, total_study_time, sessions_completed, questions_asked, confidence_sum)
+            VALUES (NEW.user_id, NEW.duration, 1, COALESCE(NEW.questions_asked, 0), COALESCE(NEW.confidence_level, 0))
+            ON CONFLICT (user_id) DO UPDATE SET
+                total_study_time = total_study_time + excluded.total_study_time,
+                sessions_completed = sessions_completed + 1,
+                questions_asked = questions_asked + excluded.questions_asked,
+                confidence_sum = confidence_sum + excluded.confidence_sum;
+            INSERT INTO user_topic_progress (user_id, topic, minutes, session_count)
+            VALUES (NEW.user_id, NEW.topic, NEW.duration, 1)
+            ON CONFLICT (user_id, topic) DO UPDATE SET
+                minutes = minutes + excluded.minutes,
+                session_count = session_count + 1;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_study_sessions_progress_delete AFTER DELETE ON study_sessions
+        BEGIN
+            UPDATE user_progress SET
+                total_study_time = total_study_time - OLD.duration,
+                sessions_completed = sessions_completed - 1,
+                questions_asked = questions_asked - COALESCE(OLD.questions_asked, 0),
+                confidence_sum = confidence_sum - COALESCE(OLD.confidence_level, 0)
+            WHERE user_id = OLD.user_id;
+            UPDATE user_topic_progress SET
+                minutes = minutes - OLD.duration,
+                session_count = session_count - 1
+            WHERE user_id = OLD.user_id AND topic = OLD.topic;
+            DELETE FROM user_topic_progress WHERE user_id = OLD.user_id AND topic = OLD.topic AND session_count <= 0;
+        END''',
+        # The chat path only bumps questions_asked; keep that to one extra UPDATE
+        '''CREATE TRIGGER IF NOT EXISTS trg_study_sessions_progress_question AFTER UPDATE ON study_sessions
+        WHEN OLD.user_id IS NEW.user_id AND OLD.topic IS NEW.topic
+            AND OLD.duration IS NEW.duration AND OLD.confidence_level IS NEW.confidence_level
+        BEGIN
+            UPDATE user_progress SET
+                questions_asked = questions_asked + COALESCE(NEW.questions_asked, 0) - COALESCE(OLD.questions_asked, 0)
+            WHERE user_id = NEW.user_id;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_study_sessions_progress_update AFTER UPDATE ON study_sessions
+        WHEN NOT (OLD.user_id IS NEW.user_id AND OLD.topic IS NEW.topic
+            AND OLD.duration IS NEW.duration AND OLD.confidence_level IS NEW.confidence_level)
+        BEGIN
+            UPDATE user_progress SET
+                total_study_time = total_study_time - OLD.duration,
+                sessions_completed = sessions_completed - 1,
+                questions_asked = questions_asked - COALESCE(OLD.questions_asked, 0),
+                confidence_sum = confidence_sum - COALESCE(OLD.confidence_level, 0)
+            WHERE user_id = OLD.user_id;
+            UPDATE user_topic_progress SET
+                minutes = minutes - OLD.duration,
+                session_count = session_count - 1
+            WHERE user_id = OLD.user_id AND topic = OLD.topic;
+            DELETE FROM user_topic_progress WHERE user_id = OLD.user_id AND topic = OLD.topic AND session_count <= 0;
+            INSERT INTO user_progress (user_id, total_study_time, sessions_completed, questions_asked, confidence_sum)
+            VALUES (NEW.user_id, NEW.duration, 1, COALESCE(NEW.questions_asked, 0), COALESCE(NEW.confidence_level, 0))
+            ON CONFLICT (user_id) DO UPDATE SET
+                total_study_time = total_study_time + excluded.total_study_time,
+                sessions_completed = sessions_completed + 1,
+                questions_asked = questions_asked + excluded.questions_asked,
+                confidence_sum = confidence_sum + excluded.confidence_sum;
+            INSERT INTO user_topic_progress (user_id, topic, minutes, session_count)
+            VALUES (NEW.user_id, NEW.topic, NEW.duration, 1)
+            ON CONFLICT (user_id, topic) DO UPDATE SET
+                minutes = minutes + excluded.minutes,
+                session_count = session_count + 1;
+        END''',
+        *REBUILD_PROGRESS,
+    ],
+    # 4: bumped on every profile write so cached profiles can be validated cheaply
+    [
+        'ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 0',
+    ],
+    # 5: background generation jobs; a running job whose lease lapses is picked up again
+    [
+        '''CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            params TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            result TEXT,
+            error TEXT,
+            idempotency_key TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            lease_expires_at REAL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at)',
+        '''CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_user_idempotency_key
+            ON jobs (user_id, idempotency_key) WHERE idempotency_key IS NOT NULL''',
+    ],
+    # 6: chat memory per study session; turns up to summarized_through are folded into the summary
+    [
+        '''CREATE TABLE IF NOT EXISTS conversation_turns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            tokens INTEGER NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_conversation_turns_session ON conversation_turns (session_id, id)',
+        '''CREATE TABLE IF NOT EXISTS conversation_summaries (
+            session_id TEXT PRIMARY KEY,
+            summary TEXT NOT NULL,
+            summarized_through INTEGER NOT NULL,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )''',
+    ],
+    # 7: persistent model response cache (LLM_CACHE_BACKEND=sqlite), evicted by last_used
+    [
+        '''CREATE TABLE IF NOT EXISTS response_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            expires_at REAL,
+            last_used REAL NOT NULL
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_response_cache_last_used ON response_cache (last_used)',
+    ],
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+JOB_COLUMNS = ['id', 'user_id', 'kind', 'params', 'status', 'result', 'error',
+               'idempotency_key', 'attempts', 'created_at', 'updated_at']
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections for a single database file."""
+
+    def __init__(self, db_path: str, size: int):
+        self.db_path = db_path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max(size, 1))
+        self._generation = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=Config.DB_BUSY_TIMEOUT,
+            check_same_thread=False,
+            cached_statements=Config.DB_STATEMENT_CACHE_SIZE
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        # INSERT OR REPLACE must fire the delete triggers that maintain user_progress
+        conn.execute('PRAGMA recursive_triggers=ON')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        if self.size <= 0:
+            conn = self._connect()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+            return
+
+        with self._slots:
+            try:
+                conn, generation = self._idle.get_nowait()
+            except queue.Empty:
+                conn, generation = self._connect(), self._generation
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                if generation == self._generation:
+                    self._idle.put((conn, generation))
+                else:
+                    conn.close()
+
+    def reset(self):
+        # Connections checked out right now are closed when they come back
+        self._generation += 1
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path: str) -> ConnectionPool:
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None or pool.size != Config.DB_POOL_SIZE:
+            if pool is not None:
+                pool.reset()
+            pool = ConnectionPool(db_path, Config.DB_POOL_SIZE)
+            _pools[db_path] = pool
+        return pool
+
+@instrument_database
 class Database:
-    def __init__(self):
-        self.db_path = Config.DB_PATH
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or Config.DB_PATH
         self.init_db()
 
+    @property
+    def db_path(self) -> str:
+        return self._db_path
+
+    @db_path.setter
+    def db_path(self, path: str):
+        # Repointing (tests swap files underneath us) must not reuse connections
+        # that still reference the previous file.
+        self._db_path = path
+        self.pool = get_pool(path)
+        self.pool.reset()
+
+    @contextmanager
+    def connection(self):
+        with self.pool.connection() as conn:
+            yield conn
+
+    def close(self):
+        self.pool.reset()
+
     def init_db(self):
-        conn = sqlite3.connect(self.db_path)
+        with self.connection() as conn:
+            # An up-to-date file needs no DDL; schema changes must go through MIGRATIONS
+            if self._schema_is_current(conn):
+                return
+            self._create_tables(conn)
+            self._migrate(conn)
+
+    def _schema_is_current(self, conn: sqlite3.Connection) -> bool:
+        try:
+            return self.get_schema_version(conn) == SCHEMA_VERSION
+        except sqlite3.OperationalError:
+            return False
+
+    def get_schema_version(self, conn: sqlite3.Connection) -> int:
+        row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+        return row[0] or 0
+
+    def _migrate(self, conn: sqlite3.Connection):
+        current = self.get_schema_version(conn)
+        for version, statements in enumerate(MIGRATIONS[current:], start=current + 1):
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute('INSERT OR IGNORE INTO schema_version (version) VALUES (?)', (version,))
+
+    def _create_tables(self, conn: sqlite3.Connection):
         cursor = conn.cursor()
         
         # Users table
@@ -75,176 +379,444 @@ class Database:
                 FOREIGN KEY (user_id) REFERENCES users (id)
             )
         ''')
-        
-        conn.commit()
-        conn.close()
 
-    def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        # Applied migrations
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+    def _row_to_user(self, row) -> Dict:
+        return {
+            'id': row[0], 'email': row[1], 'password': row[2], 'name': row[3],
+            'learning_style': row[4], 'preferred_topics': json.loads(row[5]),
+            'difficulty_level': row[6], 'study_goals': json.loads(row[7]),
+            'version': row[9] if len(row) > 9 else 0
+        }
+
+    def _row_to_session(self, row) -> StudySession:
+        return StudySession(
+            id=row[0],
+            user_id=row[1],
+            topic=row[2],
+            duration=row[3],
+            materials_covered=json.loads(row[4]) if row[4] else [],
+            questions_asked=row[5],
+            confidence_level=row[6],
+            start_time=row[7],
+            end_time=row[8]
+        )
+
+    def _row_to_plan(self, row) -> StudyPlan:
+        return StudyPlan(
+            id=row[0],
+            user_id=row[1],
+            topic=row[2],
+            total_hours=row[3],
+            daily_hours=row[4],
+            weekly_goals=json.loads(row[5]) if row[5] else [],
+            resources=json.loads(row[6]) if row[6] else [],
+            assessment_schedule=json.loads(row[7]) if row[7] else [],
+            deadline=row[8],
+            created_at=row[9]
+        )
 
     def create_user(self, user_data: Dict) -> bool:
-        conn = self.get_connection()
-        cursor = conn.cursor()
         try:
-            cursor.execute('''
-                INSERT INTO users (id, email, password_hash, name)
-                VALUES (?, ?, ?, ?)
-            ''', (user_data['id'], user_data['email'], user_data['password'], user_data['name']))
-            conn.commit()
+            with self.connection() as conn:
+                conn.execute('''
+                    INSERT INTO users (id, email, password_hash, name)
+                    VALUES (?, ?, ?, ?)
+                ''', (user_data['id'], user_data['email'], user_data['password'], user_data['name']))
             return True
         except sqlite3.IntegrityError:
             return False
-        finally:
-            conn.close()
 
     def get_user_by_email(self, email: str) -> Optional[Dict]:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM users WHERE email = ?', (email,))
-        row = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            row = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
         if row:
-            return {
-                'id': row[0], 'email': row[1], 'password': row[2], 'name': row[3],
-                'learning_style': row[4], 'preferred_topics': json.loads(row[5]),
-                'difficulty_level': row[6], 'study_goals': json.loads(row[7])
-            }
+            return self._row_to_user(row)
         return None
 
     def get_user_by_id(self, user_id: str) -> Optional[Dict]:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
-        row = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            row = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
+        if row:
+            return self._row_to_user(row)
+        return None
+
+    def get_credentials_by_email(self, email: str) -> Optional[Dict]:
+        # Login only needs these three columns; skip the profile JSON
+        with self.connection() as conn:
+            row = conn.execute('SELECT id, password_hash, name FROM users WHERE email = ?', (email,)).fetchone()
         if row:
-            return {
-                'id': row[0], 'email': row[1], 'password': row[2], 'name': row[3],
-                'learning_style': row[4], 'preferred_topics': json.loads(row[5]),
-                'difficulty_level': row[6], 'study_goals': json.loads(row[7])
-            }
+            return {'id': row[0], 'password': row[1], 'name': row[2]}
         return None
 
+    def update_password_hash(self, user_id: str, password_hash: str):
+        with self.connection() as conn:
+            conn.execute('UPDATE users SET password_hash = ? WHERE id = ?', (password_hash, user_id))
+
+    def get_user_version(self, user_id: str) -> Optional[int]:
+        with self.connection() as conn:
+            row = conn.execute('SELECT version FROM users WHERE id = ?', (user_id,)).fetchone()
+        return row[0] if row else None
+
     def update_user_profile(self, user_id: str, profile_data: Dict):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Fetch current profile to merge
-        current = self.get_user_by_id(user_id)
-        if not current:
-            return None
-
-        # Update fields
-        learning_style = profile_data.get('learning_style', current['learning_style'])
-        preferred_topics = json.dumps(profile_data.get('preferred_topics', current['preferred_topics']))
-        difficulty_level = profile_data.get('difficulty_level', current['difficulty_level'])
-        study_goals = json.dumps(profile_data.get('study_goals', current['study_goals']))
-        
-        cursor.execute('''
+        # Fields missing from profile_data are bound as NULL and keep their current value
+        params = (
+            profile_data.get('learning_style'),
+            json.dumps(profile_data['preferred_topics']) if 'preferred_topics' in profile_data else None,
+            profile_data.get('difficulty_level'),
+            json.dumps(profile_data['study_goals']) if 'study_goals' in profile_data else None,
+            user_id
+        )
+        update = '''
             UPDATE users 
-            SET learning_style = ?, preferred_topics = ?, difficulty_level = ?, study_goals = ?
+            SET learning_style = COALESCE(?, learning_style), preferred_topics = COALESCE(?, preferred_topics),
+                difficulty_level = COALESCE(?, difficulty_level), study_goals = COALESCE(?, study_goals),
+                version = version + 1
             WHERE id = ?
-        ''', (learning_style, preferred_topics, difficulty_level, study_goals, user_id))
-        conn.commit()
-        conn.close()
-        return self.get_user_by_id(user_id)
+        '''
+        with self.connection() as conn:
+            if HAS_RETURNING:
+                row = conn.execute(update + ' RETURNING *', params).fetchone()
+            else:
+                cursor = conn.execute(update, params)
+                row = None
+                if cursor.rowcount:
+                    row = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
+        if row:
+            return self._row_to_user(row)
+        return None
 
     def save_study_session(self, session: StudySession):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO study_sessions 
+        with self.connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO study_sessions 
+                (id, user_id, topic, duration, materials_covered, questions_asked, confidence_level, start_time, end_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (session.id, session.user_id, session.topic, session.duration, json.dumps(session.materials_covered), 
+                  session.questions_asked, session.confidence_level, session.start_time, session.end_time))
+
+    def get_session_times(self, user_id: str, session_ids: List[str]) -> Dict[str, List[str]]:
+        if not session_ids:
+            return {}
+        placeholders = ','.join('?' * len(session_ids))
+        with self.connection() as conn:
+            rows = conn.execute(
+                f'SELECT id, start_time, end_time FROM study_sessions WHERE user_id = ? AND id IN ({placeholders})',
+                (user_id, *session_ids)
+            ).fetchall()
+        return {row[0]: [row[1], row[2]] for row in rows}
+
+    def apply_session_events(self, user_id: str, creates: List[StudySession], increments: Dict[str, int],
+                             ends: List[tuple]):
+        # All writes of a batch share one transaction; each kind is a single executemany
+        with self.connection() as conn:
+            conn.executemany('''
+                INSERT INTO study_sessions
+                (id, user_id, topic, duration, materials_covered, questions_asked, confidence_level, start_time, end_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [self._session_params(session) for session in creates])
+            conn.executemany(
+                'UPDATE study_sessions SET questions_asked = questions_asked + ? WHERE id = ? AND user_id = ?',
+                [(count, session_id, user_id) for session_id, count in increments.items()]
+            )
+            conn.executemany('''
+                UPDATE study_sessions SET end_time = ?, confidence_level = ?, duration = ?
+                WHERE id = ? AND user_id = ? AND (end_time IS NULL OR end_time = '')
+            ''', [(end_time, confidence_level, duration, session_id, user_id)
+                  for session_id, confidence_level, end_time, duration in ends])
+
+    def import_study_sessions(self, sessions, chunk_size: int = 10000) -> int:
+        # Bulk path for historical data: rows already present (same id) are skipped
+        inserted = 0
+        chunk = []
+        with self.connection() as conn:
+            for session in sessions:
+                chunk.append(self._session_params(session))
+                if len(chunk) >= chunk_size:
+                    inserted += self._insert_sessions(conn, chunk)
+                    chunk = []
+            if chunk:
+                inserted += self._insert_sessions(conn, chunk)
+        return inserted
+
+    def _insert_sessions(self, conn: sqlite3.Connection, params: List[tuple]) -> int:
+        cursor = conn.executemany('''
+            INSERT OR IGNORE INTO study_sessions
             (id, user_id, topic, duration, materials_covered, questions_asked, confidence_level, start_time, end_time)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (session.id, session.user_id, session.topic, session.duration, json.dumps(session.materials_covered), 
-              session.questions_asked, session.confidence_level, session.start_time, session.end_time))
-        conn.commit()
-        conn.close()
+        ''', params)
+        return cursor.rowcount
+
+    def _session_params(self, session: StudySession) -> tuple:
+        return (session.id, session.user_id, session.topic, session.duration, json.dumps(session.materials_covered),
+                session.questions_asked, session.confidence_level, session.start_time, session.end_time)
 
     def get_study_sessions(self, user_id: str) -> List[StudySession]:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM study_sessions WHERE user_id = ?', (user_id,))
-        rows = cursor.fetchall()
-        conn.close()
-        
-        sessions = []
+        with self.connection() as conn:
+            rows = conn.execute('SELECT * FROM study_sessions WHERE user_id = ?', (user_id,)).fetchall()
+        return [self._row_to_session(row) for row in rows]
+
+    def get_study_sessions_page(self, user_id: str, limit: int, cursor: Optional[tuple] = None,
+                                fields: Optional[List[str]] = None):
+        return self._fetch_page('study_sessions', SESSION_COLUMNS, 'start_time', user_id, limit, cursor, fields)
+
+    def _fetch_page(self, table: str, columns: List[str], sort_column: str, user_id: str, limit: int,
+                    cursor: Optional[tuple], fields: Optional[List[str]]):
+        # Keyset pagination, newest first: the cursor is the (sort_column, id) of the last row returned
+        if fields:
+            unknown = set(fields) - set(columns)
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+            selected = [column for column in columns if column in fields]
+        else:
+            selected = columns
+        select = list(dict.fromkeys(selected + [sort_column, 'id']))
+
+        sql = f'SELECT {", ".join(select)} FROM {table} WHERE user_id = ?'
+        params = [user_id]
+        if cursor:
+            sql += f' AND ({sort_column}, id) < (?, ?)'
+            params.extend(cursor)
+        sql += f' ORDER BY {sort_column} DESC, id DESC LIMIT ?'
+        params.append(limit + 1)
+
+        with self.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = dict(zip(select, rows[-1]))
+            next_cursor = (last[sort_column], last['id'])
+
+        items = []
         for row in rows:
-            sessions.append(StudySession(
-                id=row[0],
-                user_id=row[1],
-                topic=row[2],
-                duration=row[3],
-                materials_covered=json.loads(row[4]) if row[4] else [],
-                questions_asked=row[5],
-                confidence_level=row[6],
-                start_time=row[7],
-                end_time=row[8]
-            ))
-        return sessions
+            values = dict(zip(select, row))
+            item = {}
+            for column in selected:
+                value = values[column]
+                if column in JSON_COLUMNS:
+                    value = json.loads(value) if value else []
+                item[column] = value
+            items.append(item)
+        return items, next_cursor
 
     def get_study_session(self, session_id: str) -> Optional[StudySession]:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM study_sessions WHERE id = ?', (session_id,))
-        row = cursor.fetchone()
-        conn.close()
-        
+        with self.connection() as conn:
+            row = conn.execute('SELECT * FROM study_sessions WHERE id = ?', (session_id,)).fetchone()
         if row:
-            return StudySession(
-                id=row[0],
-                user_id=row[1],
-                topic=row[2],
-                duration=row[3],
-                materials_covered=json.loads(row[4]) if row[4] else [],
-                questions_asked=row[5],
-                confidence_level=row[6],
-                start_time=row[7],
-                end_time=row[8]
-            )
+            return self._row_to_session(row)
         return None
 
+    def increment_questions_and_get_topic(self, session_id: str, user_id: str) -> Optional[str]:
+        # Single statement on the chat hot path: bump the counter and read the topic back
+        with self.connection() as conn:
+            if HAS_RETURNING:
+                row = conn.execute('''
+                    UPDATE study_sessions SET questions_asked = questions_asked + 1
+                    WHERE id = ? AND user_id = ?
+                    RETURNING topic
+                ''', (session_id, user_id)).fetchone()
+            else:
+                cursor = conn.execute('''
+                    UPDATE study_sessions SET questions_asked = questions_asked + 1
+                    WHERE id = ? AND user_id = ?
+                ''', (session_id, user_id))
+                row = None
+                if cursor.rowcount:
+                    row = conn.execute('SELECT topic FROM study_sessions WHERE id = ?', (session_id,)).fetchone()
+        return row[0] if row else None
+
     def save_study_plan(self, plan: StudyPlan):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO study_plans 
-            (id, user_id, topic, total_hours, daily_hours, weekly_goals, resources, assessment_schedule, deadline, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (plan.id, plan.user_id, plan.topic, plan.total_hours, plan.daily_hours, 
-              json.dumps(plan.weekly_goals), json.dumps(plan.resources), json.dumps(plan.assessment_schedule), 
-              plan.deadline, plan.created_at))
-        conn.commit()
-        conn.close()
+        with self.connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO study_plans 
+                (id, user_id, topic, total_hours, daily_hours, weekly_goals, resources, assessment_schedule, deadline, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (plan.id, plan.user_id, plan.topic, plan.total_hours, plan.daily_hours, 
+                  json.dumps(plan.weekly_goals), json.dumps(plan.resources), json.dumps(plan.assessment_schedule), 
+                  plan.deadline, plan.created_at))
 
     def get_study_plans(self, user_id: str) -> List[StudyPlan]:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM study_plans WHERE user_id = ?', (user_id,))
-        rows = cursor.fetchall()
-        conn.close()
-        
-        plans = []
-        for row in rows:
-            plans.append(StudyPlan(
-                id=row[0],
-                user_id=row[1],
-                topic=row[2],
-                total_hours=row[3],
-                daily_hours=row[4],
-                weekly_goals=json.loads(row[5]) if row[5] else [],
-                resources=json.loads(row[6]) if row[6] else [],
-                assessment_schedule=json.loads(row[7]) if row[7] else [],
-                deadline=row[8],
-                created_at=row[9]
-            ))
-        return plans
+        with self.connection() as conn:
+            rows = conn.execute('SELECT * FROM study_plans WHERE user_id = ?', (user_id,)).fetchall()
+        return [self._row_to_plan(row) for row in rows]
+
+    def get_study_plans_page(self, user_id: str, limit: int, cursor: Optional[tuple] = None,
+                             fields: Optional[List[str]] = None):
+        return self._fetch_page('study_plans', PLAN_COLUMNS, 'created_at', user_id, limit, cursor, fields)
 
     def delete_study_plan(self, plan_id: str, user_id: str) -> bool:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM study_plans WHERE id = ? AND user_id = ?', (plan_id, user_id))
-        rows_affected = cursor.rowcount
-        conn.commit()
-        conn.close()
-        return rows_affected > 0
\ No newline at end of file
+        with self.connection() as conn:
+            cursor = conn.execute('DELETE FROM study_plans WHERE id = ? AND user_id = ?', (plan_id, user_id))
+            rows_affected = cursor.rowcount
+        return rows_affected > 0
+
+    def get_quiz_progress(self, user_id: str, question_ids: List[str]) -> Dict[str, Dict]:
+        if not question_ids:
+            return {}
+        placeholders = ','.join('?' * len(question_ids))
+        with self.connection() as conn:
+            rows = conn.execute(f'''
+                SELECT question_id, performance, next_review, review_count, interval_days
+                FROM quiz_progress WHERE user_id = ? AND question_id IN ({placeholders})
+            ''', (user_id, *question_ids)).fetchall()
+        return {row[0]: self._row_to_progress(row) for row in rows}
+
+    def save_quiz_progress(self, user_id: str, progress: List[Dict]):
+        with self.connection() as conn:
+            conn.executemany('''
+                INSERT INTO quiz_progress (user_id, question_id, performance, next_review, review_count, interval_days)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, question_id) DO UPDATE SET
+                    performance = excluded.performance,
+                    next_review = excluded.next_review,
+                    review_count = excluded.review_count,
+                    interval_days = excluded.interval_days
+            ''', [(user_id, p['question_id'], p['performance'], p['next_review'], p['review_count'], p['interval_days'])
+                  for p in progress])
+
+    def get_due_quiz_progress(self, user_id: str, now: str, limit: int) -> List[Dict]:
+        with self.connection() as conn:
+            rows = conn.execute('''
+                SELECT question_id, performance, next_review, review_count, interval_days
+                FROM quiz_progress WHERE user_id = ? AND next_review <= ?
+                ORDER BY next_review LIMIT ?
+            ''', (user_id, now, limit)).fetchall()
+        return [self._row_to_progress(row) for row in rows]
+
+    def _row_to_progress(self, row) -> Dict:
+        return {
+            'question_id': row[0], 'performance': row[1], 'next_review': row[2],
+            'review_count': row[3], 'interval_days': row[4]
+        }
+
+    def get_progress(self, user_id: str) -> Dict:
+        with self.connection() as conn:
+            row = conn.execute('''
+                SELECT total_study_time, sessions_completed, questions_asked, confidence_sum
+                FROM user_progress WHERE user_id = ?
+            ''', (user_id,)).fetchone()
+            topics = conn.execute(
+                'SELECT topic, minutes FROM user_topic_progress WHERE user_id = ?', (user_id,)
+            ).fetchall()
+        row = row or (0, 0, 0, 0)
+        return {
+            'total_study_time': row[0],
+            'sessions_completed': row[1],
+            'questions_asked': row[2],
+            'confidence_sum': row[3],
+            'topic_distribution': dict(topics)
+        }
+
+    def _row_to_job(self, row) -> Dict:
+        job = dict(zip(JOB_COLUMNS, row))
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        return job
+
+    def create_job(self, job: Dict):
+        # Returns (job, created); a repeated idempotency key returns the original job
+        with self.connection() as conn:
+            cursor = conn.execute('''
+                INSERT OR IGNORE INTO jobs (id, user_id, kind, params, idempotency_key, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (job['id'], job['user_id'], job['kind'], json.dumps(job['params']), job.get('idempotency_key'),
+                  job['created_at'], job['created_at']))
+            created = cursor.rowcount > 0
+            if created:
+                row = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job['id'],)).fetchone()
+            else:
+                row = conn.execute(f'''
+                    SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE user_id = ? AND idempotency_key = ?
+                ''', (job['user_id'], job.get('idempotency_key'))).fetchone()
+        return self._row_to_job(row), created
+
+    def get_job(self, job_id: str, user_id: str) -> Optional[Dict]:
+        with self.connection() as conn:
+            row = conn.execute(f'''
+                SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ? AND user_id = ?
+            ''', (job_id, user_id)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def claim_job(self, now: float, lease_seconds: float, max_attempts: int, updated_at: str) -> Optional[Dict]:
+        # Claims the oldest queued job, or a running one whose worker let its lease lapse.
+        # The conditional UPDATE makes the claim safe across threads and processes.
+        with self.connection() as conn:
+            conn.execute('''
+                UPDATE jobs SET status = 'failed', error = 'Worker stopped before the job finished', updated_at = ?
+                WHERE status = 'running' AND lease_expires_at < ? AND attempts >= ?
+            ''', (updated_at, now, max_attempts))
+            row = conn.execute(f'''
+                SELECT {', '.join(JOB_COLUMNS)} FROM jobs
+                WHERE status = 'queued' OR (status = 'running' AND lease_expires_at < ?)
+                ORDER BY created_at LIMIT 1
+            ''', (now,)).fetchone()
+            if row is None:
+                return None
+            job = self._row_to_job(row)
+            cursor = conn.execute('''
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_expires_at = ?, updated_at = ?
+                WHERE id = ? AND status = ? AND attempts = ?
+            ''', (now + lease_seconds, updated_at, job['id'], job['status'], job['attempts']))
+            if cursor.rowcount == 0:
+                return None
+        job.update(status='running', attempts=job['attempts'] + 1, updated_at=updated_at)
+        return job
+
+    def finish_job(self, job_id: str, status: str, updated_at: str, result=None, error: Optional[str] = None):
+        with self.connection() as conn:
+            conn.execute('''
+                UPDATE jobs SET status = ?, result = ?, error = ?, lease_expires_at = NULL, updated_at = ?
+                WHERE id = ?
+            ''', (status, json.dumps(result) if result is not None else None, error, updated_at, job_id))
+
+    def add_conversation_turns(self, session_id: str, turns: List[tuple]):
+        # turns are (role, content, tokens)
+        with self.connection() as conn:
+            conn.executemany(
+                'INSERT INTO conversation_turns (session_id, role, content, tokens) VALUES (?, ?, ?, ?)',
+                [(session_id, role, content, tokens) for role, content, tokens in turns]
+            )
+
+    def get_conversation(self, session_id: str):
+        # Returns (summary, summarized_through, turns not yet folded into the summary)
+        with self.connection() as conn:
+            row = conn.execute('''
+                SELECT summary, summarized_through FROM conversation_summaries WHERE session_id = ?
+            ''', (session_id,)).fetchone()
+            summary, through = row if row else ('', 0)
+            rows = conn.execute('''
+                SELECT id, role, content, tokens FROM conversation_turns
+                WHERE session_id = ? AND id > ? ORDER BY id
+            ''', (session_id, through)).fetchall()
+        turns = [{'id': r[0], 'role': r[1], 'content': r[2], 'tokens': r[3]} for r in rows]
+        return summary, through, turns
+
+    def save_conversation_summary(self, session_id: str, summary: str, through: int, expected_through: int) -> bool:
+        # Applies only if no other compaction moved summarized_through since it was read
+        with self.connection() as conn:
+            if expected_through == 0:
+                cursor = conn.execute('''
+                    INSERT OR IGNORE INTO conversation_summaries (session_id, summary, summarized_through)
+                    VALUES (?, ?, ?)
+                ''', (session_id, summary, through))
+            else:
+                cursor = conn.execute('''
+                    UPDATE conversation_summaries
+                    SET summary = ?, summarized_through = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE session_id = ? AND summarized_through = ?
+                ''', (summary, through, session_id, expected_through))
+        return cursor.rowcount > 0
+
+    def rebuild_progress(self):
+        with self.connection() as conn:
+            for statement in REBUILD_PROGRESS:
+                conn.execute(statement)
@@ -0,0 +1,108 @@
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from config import Config
+from database import Database
+from resilience import is_transient
+
+
+class JobQueue:
+    """Runs slow generation work on background threads, backed by the jobs table.
+
+    Jobs survive restarts: a claimed job holds a lease, and once the lease
+    lapses (the worker died or the process restarted) any worker picks it up
+    again, up to ``JOB_MAX_ATTEMPTS`` tries. A handler error is only retried when
+    it is transient; anything else fails the job on the spot.
+    """
+
+    def __init__(self, db: Database, handlers: Dict[str, Callable], workers: int = 2,
+                 validators: Optional[Dict[str, Callable]] = None, config=Config):
+        self.db = db
+        self.config = config
+        self.handlers = handlers
+        self.validators = validators or {}
+        self.workers = workers
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def submit(self, user_id: str, kind: str, params: Dict, idempotency_key: Optional[str] = None):
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if kind in self.validators:
+            params = self.validators[kind](params)
+        job, created = self.db.create_job({
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'kind': kind,
+            'params': params,
+            'idempotency_key': idempotency_key,
+            'created_at': datetime.now().isoformat()
+        })
+        if created:
+            self.start()
+            self._wakeup.set()
+        return job, created
+
+    def get(self, job_id: str, user_id: str) -> Optional[Dict]:
+        job = self.db.get_job(job_id, user_id)
+        if job and job['status'] in ('queued', 'running'):
+            # Polling for a job left over from a previous process starts the workers
+            self.start()
+        return job
+
+    def start(self):
+        # Workers start on first use so importing the app does not spawn threads
+        with self._lock:
+            if self._threads or self.workers <= 0:
+                return
+            self._stopping.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        self._wakeup.set()
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout)
+
+    def run_pending(self) -> int:
+        """Runs queued jobs on the calling thread until none are left; returns how many ran."""
+        ran = 0
+        while self._run_one():
+            ran += 1
+        return ran
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                if self._run_one():
+                    continue
+            except Exception as e:
+                print(f"Job worker error: {e}")
+            self._wakeup.wait(self.config.JOB_POLL_INTERVAL)
+            self._wakeup.clear()
+
+    def _run_one(self) -> bool:
+        job = self.db.claim_job(time.time(), self.config.JOB_LEASE_SECONDS, self.config.JOB_MAX_ATTEMPTS,
+                                datetime.now().isoformat())
+        if job is None:
+            return False
+        try:
+            result = self.handlers[job['kind']](job['user_id'], job['params'])
+        except Exception as e:
+            print(f"Job {job['id']} ({job['kind']}) failed: {e}")
+            retry = is_transient(e) and job['attempts'] < self.config.JOB_MAX_ATTEMPTS
+            status = 'queued' if retry else 'failed'
+            self.db.finish_job(job['id'], status, datetime.now().isoformat(), error=str(e))
+        else:
+            self.db.finish_job(job['id'], 'succeeded', datetime.now().isoformat(), result=result)
+        return True
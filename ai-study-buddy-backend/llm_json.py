@@ -0,0 +1,139 @@
+import json
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import metrics
+
+_decoder = json.JSONDecoder()
+
+MAX_CANDIDATES = 5
+
+
+def _skip_whitespace(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in ' \t\r\n':
+        pos += 1
+    return pos
+
+
+def _decode_array(text: str, start: int) -> Tuple[List, bool]:
+    """Decode the array opening at ``start`` element by element.
+
+    Returns the elements decoded so far and whether the array was cut short,
+    so a response truncated mid-element still yields its complete elements.
+    """
+    items = []
+    pos = _skip_whitespace(text, start + 1)
+    if text.startswith(']', pos):
+        return items, False
+    while True:
+        try:
+            item, pos = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            return items, True
+        items.append(item)
+        pos = _skip_whitespace(text, pos)
+        if text.startswith(',', pos):
+            pos = _skip_whitespace(text, pos + 1)
+        elif text.startswith(']', pos):
+            return items, False
+        else:
+            return items, True
+
+
+def _candidates(text: str):
+    # Start offsets of '[' and '{' in order; each find only resumes past the bracket it last returned
+    square, curly = text.find('['), text.find('{')
+    for _ in range(MAX_CANDIDATES):
+        if square == -1 and curly == -1:
+            return
+        if curly == -1 or (square != -1 and square < curly):
+            yield square
+            square = text.find('[', square + 1)
+        else:
+            yield curly
+            curly = text.find('{', curly + 1)
+
+
+def parse_list(text: str, validate: Callable[[Any], Optional[Any]], caller: str = 'unknown') -> Optional[List]:
+    """Extract the first JSON array in ``text`` whose elements pass ``validate``.
+
+    Surrounding prose and markdown fences are ignored, elements failing
+    validation are dropped, and complete elements of a truncated array are
+    kept. Outcomes are counted in ``llm_parse_total`` by caller.
+    """
+    for start in _candidates(text or ''):
+        if text[start] == '[':
+            items, truncated = _decode_array(text, start)
+        else:
+            try:
+                value, _ = _decoder.raw_decode(text, start)
+            except json.JSONDecodeError:
+                continue
+            # Some replies wrap the array, e.g. {"questions": [...]}
+            lists = [v for v in value.values() if isinstance(v, list)] if isinstance(value, dict) else []
+            if len(lists) != 1:
+                continue
+            items, truncated = lists[0], False
+
+        valid = [v for v in (validate(item) for item in items) if v is not None]
+        if valid:
+            dropped = len(items) - len(valid)
+            _record(caller, 'salvaged' if truncated or dropped else 'ok', dropped)
+            return valid
+
+    print(f"Failed to decode Gemini response for {caller}: {(text or '')[:200]!r}")
+    _record(caller, 'failed')
+    return None
+
+
+def _record(caller: str, outcome: str, dropped: int = 0):
+    if not metrics.enabled:
+        return
+    metrics.inc('llm_parse_total', caller=caller, outcome=outcome)
+    if dropped:
+        metrics.inc('llm_parse_dropped_items_total', dropped, caller=caller)
+
+
+def _strings(value) -> Optional[List[str]]:
+    if isinstance(value, list) and value and all(isinstance(v, str) for v in value):
+        return value
+    return None
+
+
+def quiz_question(item: Any, topic: str, difficulty: str) -> Optional[Dict]:
+    if not isinstance(item, dict):
+        return None
+    question, answer, options = item.get('question'), item.get('correct_answer'), _strings(item.get('options'))
+    if not isinstance(question, str) or not options or answer not in options:
+        return None
+    return {
+        'id': str(item.get('id') or uuid.uuid4()),
+        'question': question,
+        'options': options,
+        'correct_answer': answer,
+        'explanation': item.get('explanation') if isinstance(item.get('explanation'), str) else '',
+        'topic': topic,
+        'difficulty': difficulty
+    }
+
+
+def flashcard(item: Any) -> Optional[Dict]:
+    if not isinstance(item, dict):
+        return None
+    front, back = item.get('front'), item.get('back')
+    if not isinstance(front, str) or not isinstance(back, str):
+        return None
+    return {'front': front, 'back': back}
+
+
+def weekly_goal(item: Any) -> Optional[Dict]:
+    if not isinstance(item, dict):
+        return None
+    week, theme, goals = item.get('week'), item.get('theme'), _strings(item.get('goals'))
+    if isinstance(week, bool) or not isinstance(week, int) or not isinstance(theme, str) or not goals:
+        return None
+    return {'week': week, 'theme': theme, 'goals': goals}
+
+
+def resource(item: Any) -> Optional[str]:
+    return item if isinstance(item, str) and item.strip() else None
@@ -0,0 +1,172 @@
+import bisect
+import functools
+import inspect
+import threading
+import time
+from typing import Dict, Tuple
+
+from config import Config
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+DESCRIPTIONS = {
+    'http_request_duration_seconds': ('histogram', 'Time spent handling a request, by route'),
+    'db_query_duration_seconds': ('histogram', 'Time spent in Database methods'),
+    'db_rows_total': ('counter', 'Rows returned by Database methods'),
+    'llm_request_duration_seconds': ('histogram', 'Latency of model calls, by calling feature'),
+    'llm_requests_total': ('counter', 'Model calls by calling feature and outcome'),
+    'llm_tokens_total': ('counter', 'Tokens reported by the model, by calling feature'),
+    'llm_resilience_events_total': ('counter', 'Model call retries, timeouts, hedges, short circuits and breaker transitions'),
+    'llm_coalesced_total': ('counter', 'Generation requests that shared an identical in-flight model call'),
+    'llm_semantic_cache_total': ('counter', 'Chat questions answered from the semantic cache (hit) or sent on (miss)'),
+    'llm_parse_total': ('counter', 'Parsed model responses by calling feature and outcome (ok/salvaged/failed)'),
+    'llm_parse_dropped_items_total': ('counter', 'Response elements dropped for failing schema validation'),
+}
+
+
+def _labels(labels: Dict) -> Tuple:
+    return tuple(sorted(labels.items())) if len(labels) > 1 else tuple(labels.items())
+
+
+def _format_labels(labels: Tuple) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+class Metrics:
+    """Thread-safe counters and histograms rendered in the Prometheus text format.
+
+    When disabled nothing is hooked into Flask or Database, and the remaining
+    call sites only pay for an ``enabled`` check.
+    """
+
+    def __init__(self, enabled: bool = True, buckets: Tuple = LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            # Per-bucket counts; render() turns them into cumulative le= buckets
+            histogram[0][bisect.bisect_left(self.buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((name, _labels(labels)), 0)
+
+    def count(self, name: str, **labels) -> int:
+        with self._lock:
+            histogram = self._histograms.get((name, _labels(labels)))
+        return histogram[2] if histogram else 0
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, [list(h[0]), h[1], h[2]]) for key, h in self._histograms.items())
+
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described and name in DESCRIPTIONS:
+                kind, help_text = DESCRIPTIONS[name]
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                described.add(name)
+
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f'{name}{_format_labels(labels)} {value}')
+        for (name, labels), (buckets, total, count) in histograms:
+            describe(name)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, buckets):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {count}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def init_app(self, app):
+        if not self.enabled:
+            return
+
+        from flask import g, request
+
+        @app.before_request
+        def start_timer():
+            g.request_started = time.perf_counter()
+
+        @app.after_request
+        def record_request(response):
+            started = g.pop('request_started', None)
+            if started is not None:
+                route = request.url_rule.rule if request.url_rule else 'unmatched'
+                self.observe('http_request_duration_seconds', time.perf_counter() - started,
+                             method=request.method, route=route, status=response.status_code)
+            return response
+
+
+metrics = Metrics(Config.METRICS_ENABLED)
+
+
+def _row_count(result):
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        return len(result[0])
+    if isinstance(result, (bool, int, float, str)):
+        return None
+    return 1
+
+
+def _timed(func, name: str):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            metrics.observe('db_query_duration_seconds', time.perf_counter() - started, method=name)
+        rows = _row_count(result)
+        if rows is not None:
+            metrics.inc('db_rows_total', rows, method=name)
+        return result
+    return wrapper
+
+
+def instrument_database(cls):
+    """Class decorator timing every public method; a no-op when metrics are disabled."""
+    if not metrics.enabled:
+        return cls
+    for name, attr in list(vars(cls).items()):
+        if name.startswith('_') or name == 'connection' or not inspect.isfunction(attr):
+            continue
+        setattr(cls, name, _timed(attr, name))
+    return cls
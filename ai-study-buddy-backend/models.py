@@ -1,7 +1,10 @@
 from dataclasses import dataclass
 from typing import List, Optional
 
-@dataclass
+# slots=True drops the per-instance __dict__. to_json_dict builds a flat dict that
+# shares the list fields instead of deep-copying them the way dataclasses.asdict does.
+
+@dataclass(slots=True)
 class StudySession:
     id: str
     user_id: str
@@ -13,7 +16,14 @@ class StudySession:
     start_time: str
     end_time: str
 
-@dataclass
+    def to_json_dict(self) -> dict:
+        return {
+            'id': self.id, 'user_id': self.user_id, 'topic': self.topic, 'duration': self.duration,
+            'materials_covered': self.materials_covered, 'questions_asked': self.questions_asked,
+            'confidence_level': self.confidence_level, 'start_time': self.start_time, 'end_time': self.end_time
+        }
+
+@dataclass(slots=True)
 class UserProfile:
     learning_style: str
     preferred_topics: List[str]
@@ -21,7 +31,13 @@ class UserProfile:
     study_goals: List[str]
     name: str
 
-@dataclass
+    def to_json_dict(self) -> dict:
+        return {
+            'learning_style': self.learning_style, 'preferred_topics': self.preferred_topics,
+            'difficulty_level': self.difficulty_level, 'study_goals': self.study_goals, 'name': self.name
+        }
+
+@dataclass(slots=True)
 class QuizQuestion:
     id: str
     question: str
@@ -31,7 +47,14 @@ class QuizQuestion:
     topic: str
     difficulty: str
 
-@dataclass
+    def to_json_dict(self) -> dict:
+        return {
+            'id': self.id, 'question': self.question, 'options': self.options,
+            'correct_answer': self.correct_answer, 'explanation': self.explanation,
+            'topic': self.topic, 'difficulty': self.difficulty
+        }
+
+@dataclass(slots=True)
 class StudyPlan:
     id: str
     user_id: str
@@ -43,3 +66,11 @@ class StudyPlan:
     assessment_schedule: List[str]
     deadline: str
     created_at: str
+
+    def to_json_dict(self) -> dict:
+        return {
+            'id': self.id, 'user_id': self.user_id, 'topic': self.topic, 'total_hours': self.total_hours,
+            'daily_hours': self.daily_hours, 'weekly_goals': self.weekly_goals, 'resources': self.resources,
+            'assessment_schedule': self.assessment_schedule, 'deadline': self.deadline,
+            'created_at': self.created_at
+        }
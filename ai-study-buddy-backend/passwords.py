@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+
+def _hash_password(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check_password(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+class PasswordHasher:
+    """bcrypt hashing with a configurable cost, run on a bounded worker pool.
+
+    bcrypt releases the GIL while hashing, so worker threads keep other requests
+    running; the pool size caps how many cores a login storm can occupy.
+    Hashes are standard ``$2b$`` strings, compatible with those written by Flask-Bcrypt.
+    With ``workers`` set to 0 the work runs inline on the request thread.
+    """
+
+    def __init__(self, rounds: int = 12, workers: int = 0):
+        self.rounds = rounds
+        self.workers = workers
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _run(self, func, *args):
+        if self.workers <= 0:
+            return func(*args)
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+        return self._pool.submit(func, *args).result()
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash_password, password.encode('utf-8'), self.rounds).decode('utf-8')
+
+    def check(self, hashed: str, password: str) -> bool:
+        try:
+            return self._run(_check_password, password.encode('utf-8'), hashed.encode('utf-8'))
+        except ValueError:
+            return False
+
+    def needs_rehash(self, hashed: str) -> bool:
+        # $2b$<cost>$<salt+hash>
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
@@ -0,0 +1,192 @@
+import abc
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from config import Config
+
+
+@dataclass(slots=True)
+class ModelResponse:
+    text: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+
+class ModelProvider(abc.ABC):
+    """Interface for text generation backends.
+
+    ``generate`` blocks for one completion and ``stream`` yields partial
+    responses (the last one may carry token usage).
+    """
+
+    name = 'base'
+
+    @abc.abstractmethod
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> ModelResponse:
+        ...
+
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[ModelResponse]:
+        yield self.generate(prompt, timeout)
+
+
+class GeminiProvider(ModelProvider):
+    """Google Gemini through google.generativeai, or any object with the same
+    ``generate_content`` interface passed as ``model``."""
+
+    name = 'gemini'
+
+    def __init__(self, model=None, api_key: Optional[str] = None, model_name: str = 'gemini-2.5-flash'):
+        self._model = model
+        self.api_key = api_key
+        self.model_name = model_name
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        # The SDK takes about a second to import, so it is loaded on the first call
+        # rather than at startup
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> ModelResponse:
+        options = {'request_options': {'timeout': timeout}} if timeout else {}
+        return self._to_response(self.model.generate_content(prompt, **options))
+
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[ModelResponse]:
+        options = {'request_options': {'timeout': timeout}} if timeout else {}
+        for chunk in self.model.generate_content(prompt, stream=True, **options):
+            yield self._to_response(chunk)
+
+    @staticmethod
+    def _to_response(raw) -> ModelResponse:
+        usage = getattr(raw, 'usage_metadata', None)
+        prompt_tokens = getattr(usage, 'prompt_token_count', None)
+        completion_tokens = getattr(usage, 'candidates_token_count', None)
+        return ModelResponse(
+            raw.text,
+            prompt_tokens if isinstance(prompt_tokens, int) else None,
+            completion_tokens if isinstance(completion_tokens, int) else None
+        )
+
+
+class FakeProviderError(ConnectionError):
+    """Injected failure; a ConnectionError so the resilience layer treats it as transient."""
+
+
+class FakeProvider(ModelProvider):
+    """Offline stand-in that answers every prompt this backend sends with
+    well-formed content derived from the prompt.
+
+    Output depends only on the prompt. Latency (``latency`` plus up to
+    ``jitter`` seconds) and injected failures come from a generator seeded with
+    ``seed``, so a run is reproducible. Use it to measure the backend's own
+    overhead in load tests and benchmarks.
+    """
+
+    name = 'fake'
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> ModelResponse:
+        delay, fail = self._next_call()
+        time.sleep(min(delay, timeout) if timeout else delay)
+        if fail or (timeout and delay > timeout):
+            raise FakeProviderError("Injected model failure")
+        return self._respond(prompt)
+
+    def stream(self, prompt: str, timeout: Optional[float] = None) -> Iterator[ModelResponse]:
+        delay, fail = self._next_call()
+        if timeout and delay > timeout:
+            delay, fail = timeout, True
+        response = self._respond(prompt)
+        words = response.text.split(' ')
+        for i, word in enumerate(words):
+            time.sleep(delay / len(words))
+            if fail and i == len(words) // 2:
+                raise FakeProviderError("Injected model failure")
+            yield ModelResponse(word if i == 0 else ' ' + word)
+        yield ModelResponse('', response.prompt_tokens, response.completion_tokens)
+
+    def _next_call(self):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.random() * self.jitter
+            fail = self._random.random() < self.failure_rate
+        return delay, fail
+
+    def _respond(self, prompt: str) -> ModelResponse:
+        text = self._content(prompt)
+        return ModelResponse(text, len(prompt.split()), len(text.split()))
+
+    def _content(self, prompt: str) -> str:
+        digest = hashlib.sha1(prompt.encode()).hexdigest()[:8]
+        groups = [(int(g), int(n)) for g, n in re.findall(r'- group (\d+): (\d+)', prompt)]
+
+        if 'The student asks' in prompt:
+            return f'Offline test answer {digest}: this response was generated locally by the fake provider.'
+        if 'running summary' in prompt:
+            return f'Offline test summary {digest}.'
+        if 'quiz questions' in prompt:
+            if groups:
+                items = [dict(self._question(digest, f'{g}-{i}'), group=g) for g, n in groups for i in range(n)]
+            else:
+                match = re.search(r'Generate (\d+) ', prompt)
+                items = [self._question(digest, str(i)) for i in range(int(match.group(1)) if match else 5)]
+        elif 'flashcards' in prompt:
+            if groups:
+                items = [dict(self._flashcard(digest, f'{g}-{i}'), group=g) for g, n in groups for i in range(n)]
+            else:
+                match = re.search(r'Create (\d+) flashcards', prompt)
+                items = [self._flashcard(digest, str(i)) for i in range(int(match.group(1)) if match else 5)]
+        elif '-week study plan' in prompt:
+            match = re.search(r'Create a (\d+)-week', prompt)
+            items = [
+                {'week': week, 'theme': f'Theme {week} ({digest})', 'goals': [f'Goal {week}.1', f'Goal {week}.2']}
+                for week in range(1, (int(match.group(1)) if match else 1) + 1)
+            ]
+        elif 'study resources' in prompt:
+            items = [f'Resource {i} ({digest})' for i in range(1, 4)]
+        else:
+            return f'Offline test answer {digest}.'
+        return json.dumps(items)
+
+    @staticmethod
+    def _question(digest: str, suffix: str) -> dict:
+        options = [f'Option {c}' for c in 'ABCD']
+        return {
+            'id': f'fake-{digest}-{suffix}', 'question': f'Question {suffix} ({digest})?', 'options': options,
+            'correct_answer': options[0], 'explanation': 'Generated by the fake provider.'
+        }
+
+    @staticmethod
+    def _flashcard(digest: str, suffix: str) -> dict:
+        return {'front': f'Term {suffix} ({digest})', 'back': f'Definition {suffix}'}
+
+
+def create_provider(config=Config) -> Optional[ModelProvider]:
+    provider = config.LLM_PROVIDER
+    if provider == 'fake':
+        return FakeProvider(config.FAKE_MODEL_LATENCY, config.FAKE_MODEL_JITTER,
+                            config.FAKE_MODEL_FAILURE_RATE, config.FAKE_MODEL_SEED)
+    if provider == 'gemini':
+        if config.GEMINI_API_KEY:
+            return GeminiProvider(api_key=config.GEMINI_API_KEY, model_name=config.GEMINI_MODEL)
+        print("WARNING: No Gemini API key found. Using fallback logic.")
+    return None
@@ -0,0 +1,68 @@
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from models import QuizQuestion
+
+
+class QuizBank:
+    """Offline quiz questions loaded once from a JSON file and indexed by (topic, difficulty).
+
+    The file is checked for changes at most every ``reload_interval`` seconds,
+    so edits are picked up without restarting the server.
+    """
+
+    def __init__(self, path: str, reload_interval: float = 5.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._index: Dict[Tuple[str, str], List[Dict]] = {}
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            index = {}
+            for topic, difficulties in data.items():
+                for difficulty, questions in difficulties.items():
+                    # Round-trip through QuizQuestion so bad entries fail at load, not per request
+                    index[(topic, difficulty)] = [QuizQuestion(**q).to_json_dict() for q in questions]
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Failed to load quiz bank {self.path}: {e}")
+            return False
+
+        with self._lock:
+            self._index = index
+            self._mtime = mtime
+            self._checked_at = time.monotonic()
+        return True
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+
+    def questions(self, topic: str, difficulty: str) -> List[Dict]:
+        self._maybe_reload()
+        return self._index.get((topic, difficulty), [])
+
+    def sample(self, topic: str, difficulty: str, count: int, exclude_ids: Iterable[str] = ()) -> List[Dict]:
+        excluded = set(exclude_ids)
+        pool = [q for q in self.questions(topic, difficulty) if q['id'] not in excluded]
+        selected = random.sample(pool, min(max(count, 0), len(pool)))
+        return [dict(q) for q in selected]
+
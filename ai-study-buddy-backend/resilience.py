@@ -0,0 +1,262 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Iterator, Optional
+
+from metrics import metrics
+
+# Exception class names (anywhere in the MRO) treated as transient. Matching by
+# name keeps google.api_core an implicit dependency of the model SDK only.
+TRANSIENT_ERRORS = {
+    'TimeoutError', 'ConnectionError', 'DeadlineExceeded', 'ServiceUnavailable', 'ResourceExhausted',
+    'TooManyRequests', 'InternalServerError', 'GatewayTimeout', 'BadGateway',
+}
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def is_transient(error: BaseException) -> bool:
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+def _event(name: str):
+    if metrics.enabled:
+        metrics.inc('llm_resilience_events_total', event=name)
+
+
+class CircuitBreaker:
+    """Opens when the transient failure rate over the last ``window`` calls reaches
+    ``threshold``; after ``cooldown`` seconds a single trial call is let through.
+    """
+
+    def __init__(self, threshold: float = 0.5, window: int = 20, min_calls: int = 10, cooldown: float = 30):
+        self.threshold = threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.cooldown:
+                self._transition('half_open')
+            if self.state == 'half_open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def is_open(self) -> bool:
+        # True while calls are being refused and the cooldown has not yet elapsed
+        with self._lock:
+            return self.state == 'open' and time.monotonic() - self._opened_at < self.cooldown
+
+    def record(self, success: bool):
+        with self._lock:
+            if self.state == 'half_open':
+                self._trial_running = False
+                if success:
+                    self._outcomes.clear()
+                    self._transition('closed')
+                else:
+                    self._open()
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if (self.state == 'closed' and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.threshold):
+                self._open()
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._transition('open')
+
+    def _transition(self, state: str):
+        self.state = state
+        _event(f'breaker_{state}')
+
+
+class _Outstanding:
+    """Counts a call and the attempts it started; ``on_settled`` runs once all have finished."""
+
+    def __init__(self, on_settled: Optional[Callable[[], None]]):
+        self.on_settled = on_settled
+        self._count = 1
+        self._lock = threading.Lock()
+
+    def submit(self, executor: ThreadPoolExecutor, func: Callable, *args) -> Future:
+        with self._lock:
+            self._count += 1
+        try:
+            future = executor.submit(func, *args)
+        except BaseException:
+            self.done()
+            raise
+        future.add_done_callback(lambda _: self.done())
+        return future
+
+    def done(self):
+        with self._lock:
+            self._count -= 1
+            settled = self._count == 0
+        if settled and self.on_settled is not None:
+            self.on_settled()
+
+
+class ResilientCaller:
+    """Runs a model call under a deadline with jittered retries for transient
+    errors, a circuit breaker, and an optional hedged second request.
+
+    ``func`` receives the seconds left before the deadline so it can pass a
+    timeout on to the client. Attempts abandoned at the deadline keep running
+    until the client gives up, so ``on_settled`` is called only once the call
+    has returned and every attempt it started has finished; callers release
+    their concurrency slot there rather than when ``call`` returns.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, deadline: float = 20, retries: int = 2, backoff: float = 0.5,
+                 hedge_quantile: float = 0, hedge_min_samples: int = 20, workers: int = 32):
+        self.breaker = breaker
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='llm-call')
+        self._latencies = deque(maxlen=200)
+        self._lock = threading.Lock()
+
+    def call(self, func: Callable[[float], Any], on_settled: Optional[Callable[[], None]] = None) -> Any:
+        outstanding = _Outstanding(on_settled)
+        try:
+            if not self.breaker.allow():
+                _event('short_circuit')
+                raise CircuitOpenError("Model circuit breaker is open")
+            return self._call(func, outstanding)
+        finally:
+            outstanding.done()
+
+    def _call(self, func: Callable[[float], Any], outstanding: _Outstanding) -> Any:
+        healthy = False
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        raise TimeoutError("Model call deadline exceeded")
+                    result = self._attempt(func, remaining, outstanding)
+                except Exception as e:
+                    transient = is_transient(e)
+                    if isinstance(e, TimeoutError):
+                        _event('timeout')
+                    remaining = deadline - time.monotonic()
+                    if not transient or attempt >= self.retries or remaining <= 0:
+                        # Only transient failures say anything about provider health
+                        healthy = not transient
+                        raise
+                    _event('retry')
+                    time.sleep(min(random.uniform(0, self.backoff * 2 ** attempt), remaining))
+                    attempt += 1
+                    continue
+                healthy = True
+                return result
+        finally:
+            # Also reached by a BaseException, which would otherwise leave a half-open trial running forever
+            self.breaker.record(healthy)
+
+    def stream(self, func: Callable[[float], Iterator], deadline: float, idle_timeout: float,
+               on_settled: Optional[Callable[[], None]] = None) -> Iterator:
+        """Yields the chunks of ``func(timeout)`` under an overall ``deadline`` and at
+        most ``idle_timeout`` seconds of waiting for each chunk.
+
+        A stream is not retried or hedged once started. The breaker hears how it
+        ended, including when the consumer stops reading early, and ``on_settled``
+        waits for a stalled read that was abandoned.
+        """
+        outstanding = _Outstanding(on_settled)
+        try:
+            if not self.breaker.allow():
+                _event('short_circuit')
+                raise CircuitOpenError("Model circuit breaker is open")
+            yield from self._stream(func, deadline, idle_timeout, outstanding)
+        finally:
+            outstanding.done()
+
+    def _stream(self, func: Callable[[float], Iterator], deadline: float, idle_timeout: float,
+                outstanding: _Outstanding) -> Iterator:
+        healthy = False
+        ends_at = time.monotonic() + deadline
+        try:
+            chunks = self._read(outstanding, ends_at, idle_timeout, lambda: iter(func(deadline)))
+            while True:
+                chunk = self._read(outstanding, ends_at, idle_timeout, next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+            healthy = True
+        except GeneratorExit:
+            # The consumer went away, which says nothing about the provider
+            healthy = True
+            raise
+        except Exception as e:
+            healthy = not is_transient(e)
+            raise
+        finally:
+            self.breaker.record(healthy)
+
+    def _read(self, outstanding: _Outstanding, ends_at: float, idle_timeout: float, func: Callable, *args) -> Any:
+        future = outstanding.submit(self.executor, func, *args)
+        try:
+            return future.result(timeout=max(min(idle_timeout, ends_at - time.monotonic()), 0))
+        except FutureTimeoutError:
+            _event('timeout')
+            raise TimeoutError("Model stream stalled") from None
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge_quantile:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(int(len(ordered) * self.hedge_quantile), len(ordered) - 1)]
+
+    def _attempt(self, func: Callable[[float], Any], remaining: float, outstanding: _Outstanding) -> Any:
+        started = time.monotonic()
+        futures = [outstanding.submit(self.executor, func, remaining)]
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is not None and hedge_delay < remaining:
+            done, _ = wait(futures, timeout=hedge_delay)
+            if not done:
+                _event('hedge')
+                futures.append(outstanding.submit(self.executor, func, remaining - hedge_delay))
+
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(started + remaining - time.monotonic(), 0),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        _event('hedge_won')
+                    with self._lock:
+                        self._latencies.append(time.monotonic() - started)
+                    return future.result()
+                error = future.exception()
+        # Attempts still running are abandoned; the client-side timeout ends them and
+        # on_settled waits for that
+        raise error or TimeoutError("Model call deadline exceeded")
@@ -1,41 +1,230 @@
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterator
 import uuid
 from datetime import datetime, timedelta
 import random
-from dataclasses import asdict
-from models import UserProfile, StudySession, StudyPlan, QuizQuestion
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from models import UserProfile, StudySession, StudyPlan
 from database import Database
-import google.generativeai as genai
+from cache import ProfileCache, SemanticCache, SingleFlight, create_response_cache
+from conversation import ConversationMemory, extractive_summary, format_turn
+from quiz_bank import QuizBank
+from jobs import JobQueue
+from spaced_repetition import SpacedRepetitionScheduler
+from metrics import metrics
+from resilience import CircuitBreaker, CircuitOpenError, ResilientCaller
+from providers import create_provider
+import llm_json
 import os
-import json
 from config import Config
 
+# Rough output tokens per generated item, used to pack batch prompts
+QUIZ_ITEM_TOKENS = 150
+FLASHCARD_ITEM_TOKENS = 50
+
+
 class AIStudyBuddyBackend:
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db: Optional[Database] = None, config=Config):
+        self.config = config
+        self.db = db or Database(config.DB_PATH)
         self.knowledge_base = self._initialize_knowledge_base()
-        self._setup_gemini()
-
-    def _setup_gemini(self):
-        api_key = Config.GEMINI_API_KEY
-        if api_key:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-2.5-flash')
-            self.has_gemini = True
-        else:
-            self.has_gemini = False
-            print("WARNING: No Gemini API key found. Using fallback logic.")
+        self.cache = create_response_cache(config)
+        self.inflight = SingleFlight()
+        self.answers = SemanticCache(
+            self.config.SEMANTIC_CACHE_THRESHOLD, self.config.SEMANTIC_CACHE_TOPIC_SIZE,
+            self.config.SEMANTIC_CACHE_MAX_TOPICS, self.config.SEMANTIC_CACHE_TTL
+        ) if self.config.SEMANTIC_CACHE_ENABLED else None
+        self.profiles = ProfileCache(
+            self.config.PROFILE_CACHE_SIZE, self.config.PROFILE_CACHE_TTL,
+            self.db.get_user_version if self.config.PROFILE_CACHE_VALIDATE else None
+        )
+        self.quiz_bank = QuizBank(self.config.QUIZ_BANK_PATH, self.config.QUIZ_BANK_RELOAD_INTERVAL)
+        self.scheduler = SpacedRepetitionScheduler(self.db)
+        self.executor = ThreadPoolExecutor(max_workers=self.config.LLM_MAX_WORKERS, thread_name_prefix='llm')
+        # Caps outbound model calls across all request threads
+        self.model_slots = threading.BoundedSemaphore(self.config.LLM_MAX_CONCURRENCY)
+        self.breaker = CircuitBreaker(
+            self.config.LLM_BREAKER_THRESHOLD, self.config.LLM_BREAKER_WINDOW,
+            self.config.LLM_BREAKER_MIN_CALLS, self.config.LLM_BREAKER_COOLDOWN
+        )
+        self.resilient = ResilientCaller(
+            self.breaker, self.config.LLM_CALL_DEADLINE, self.config.LLM_RETRIES, self.config.LLM_RETRY_BACKOFF,
+            self.config.LLM_HEDGE_QUANTILE, workers=self.config.LLM_MAX_CONCURRENCY * 2
+        )
+        self.jobs = JobQueue(self.db, self._job_handlers(), self.config.JOB_WORKERS, self._job_validators(), self.config)
+        self.memory = ConversationMemory(
+            self.db, self.config.CHAT_CONTEXT_TOKENS, self.config.CHAT_RECENT_TOKENS, self.config.CHAT_SUMMARY_TOKENS,
+            self._summarize_conversation
+        )
+        self._setup_provider()
+
+    def close(self):
+        # Stops the job workers and model call threads and drops pooled connections
+        self.jobs.stop()
+        self.executor.shutdown(wait=False)
+        self.resilient.executor.shutdown(wait=False)
+        self.db.close()
+
+    def _setup_provider(self):
+        # LLM_PROVIDER picks the backend; has_gemini means "a model is available" whatever the provider
+        self.provider = create_provider(self.config)
+        self.has_gemini = self.provider is not None
 
-    def _call_gemini(self, prompt: str) -> str:
+    def _call_gemini(self, prompt: str, caller: str = 'unknown') -> str:
         if not self.has_gemini:
             return None
+        if self.breaker.is_open():
+            # Provider is failing; go straight to the offline fallback without queueing
+            self._record_llm_call(caller, 'short_circuit')
+            return None
+        if not self.model_slots.acquire(timeout=self.config.LLM_QUEUE_TIMEOUT):
+            print("Gemini concurrency limit reached. Using fallback logic.")
+            self._record_llm_call(caller, 'rejected')
+            return None
+        started = time.perf_counter()
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
+            # The slot is released once every attempt has finished, including ones abandoned at the deadline
+            response = self.resilient.call(
+                lambda timeout: self.provider.generate(prompt, timeout), on_settled=self.model_slots.release
+            )
+            text = response.text
+            self._record_llm_call(caller, 'ok', started, response)
+            return text
+        except CircuitOpenError:
+            self._record_llm_call(caller, 'short_circuit')
+            return None
         except Exception as e:
             print(f"Gemini API Error: {e}")
+            self._record_llm_call(caller, 'error', started)
             return None
 
+    def _call_gemini_stream(self, prompt: str, caller: str = 'unknown') -> Iterator[str]:
+        if not self.has_gemini:
+            return
+        if self.breaker.is_open():
+            self._record_llm_call(caller, 'short_circuit')
+            return
+        if not self.model_slots.acquire(timeout=self.config.LLM_QUEUE_TIMEOUT):
+            print("Gemini concurrency limit reached. Using fallback logic.")
+            self._record_llm_call(caller, 'rejected')
+            return
+        started = time.perf_counter()
+        chunk = None
+        # Same slot and breaker rules as _call_gemini; a stalled read keeps the slot until it ends
+        chunks = self.resilient.stream(
+            lambda timeout: self.provider.stream(prompt, timeout),
+            self.config.LLM_STREAM_DEADLINE, self.config.LLM_STREAM_IDLE_TIMEOUT, on_settled=self.model_slots.release
+        )
+        try:
+            for chunk in chunks:
+                if chunk.text:
+                    yield chunk.text
+            self._record_llm_call(caller, 'ok', started, chunk)
+        except CircuitOpenError:
+            self._record_llm_call(caller, 'short_circuit')
+        except Exception as e:
+            print(f"Gemini API Error: {e}")
+            self._record_llm_call(caller, 'error', started)
+        finally:
+            chunks.close()
+
+    def _record_llm_call(self, caller: str, outcome: str, started: Optional[float] = None, response=None):
+        if not metrics.enabled:
+            return
+        metrics.inc('llm_requests_total', caller=caller, outcome=outcome)
+        if started is not None:
+            metrics.observe('llm_request_duration_seconds', time.perf_counter() - started, caller=caller)
+        # Streamed responses report usage on the final chunk
+        if response is not None:
+            for kind, tokens in (('prompt', response.prompt_tokens), ('completion', response.completion_tokens)):
+                if tokens is not None:
+                    metrics.inc('llm_tokens_total', tokens, caller=caller, kind=kind)
+
+    def _cached_generation(self, kind: str, params: Dict, generate) -> Optional[Any]:
+        # Only successful model output is cached; offline fallbacks are cheap to rebuild.
+        # Identical requests that miss at the same time share one model call.
+        key = self.cache.make_key(kind, **params)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        def generate_and_store():
+            result = generate()
+            if result is not None:
+                self.cache.set(key, result)
+            return result
+
+        result, shared = self.inflight.do(key, generate_and_store, self.config.LLM_STEP_TIMEOUT)
+        if shared and metrics.enabled:
+            metrics.inc('llm_coalesced_total', kind=kind)
+        return result
+
+    def _job_validators(self) -> Dict:
+        # kind -> validator(params) returning the params to store; a ValueError rejects the job
+        # at submit time instead of letting it fail on a worker
+        return {
+            'study_plan': self._study_plan_job_params,
+            'quiz': self._quiz_job_params,
+            'flashcards': self._flashcards_job_params,
+        }
+
+    def _study_plan_job_params(self, params: Dict) -> Dict:
+        params = dict(params)
+        params['topic'] = self._job_text(params, 'topic', 'General Studies')
+        if params.get('target_days'):
+            params['target_days'] = self._int_field(params, 'target_days', None)
+        else:
+            params['deadline'] = self._time_field(params, 'deadline', None)
+        if params.get('daily_hours'):
+            try:
+                params['daily_hours'] = float(params['daily_hours'])
+            except (TypeError, ValueError):
+                raise ValueError('daily_hours must be a number') from None
+        return params
+
+    def _quiz_job_params(self, params: Dict) -> Dict:
+        params = dict(params)
+        params['topic'] = self._job_text(params, 'topic', 'python')
+        params['difficulty'] = self._job_text(params, 'difficulty', 'easy')
+        params['num_questions'] = self._job_count(params, 'num_questions')
+        exclude_ids = params.get('exclude_ids', [])
+        if not isinstance(exclude_ids, list) or not all(isinstance(item, str) for item in exclude_ids):
+            raise ValueError('exclude_ids must be a list of strings')
+        return params
+
+    def _flashcards_job_params(self, params: Dict) -> Dict:
+        params = dict(params)
+        params['topic'] = self._job_text(params, 'topic', None)
+        params['count'] = self._job_count(params, 'count')
+        return params
+
+    @staticmethod
+    def _job_text(params: Dict, field: str, default: Optional[str]) -> str:
+        value = params.get(field, default)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f'{field} must be a non-empty string')
+        return value
+
+    def _job_count(self, params: Dict, field: str) -> int:
+        count = self._int_field(params, field, 5)
+        if not 1 <= count <= self.config.GENERATION_COUNT_MAX:
+            raise ValueError(f"{field} must be between 1 and {self.config.GENERATION_COUNT_MAX}")
+        return count
+
+    def _job_handlers(self) -> Dict:
+        # kind -> handler(user_id, params) returning a JSON-serializable result
+        return {
+            'study_plan': lambda user_id, params: self.create_study_plan(user_id, params).to_json_dict(),
+            'quiz': lambda user_id, params: self.generate_quiz(
+                params.get('topic', 'python'), params.get('difficulty', 'easy'),
+                int(params.get('num_questions', 5)), params.get('exclude_ids', [])
+            ),
+            'flashcards': lambda user_id, params: self.generate_flashcards(
+                params.get('topic'), int(params.get('count', 5))
+            ),
+        }
+
     def _initialize_knowledge_base(self) -> Dict:
         return {
             "programming": {
@@ -56,22 +245,31 @@ class AIStudyBuddyBackend:
         }
 
     def get_user_profile(self, user_id: str) -> Optional[UserProfile]:
+        profile = self.profiles.get(user_id)
+        if profile:
+            return profile
         data = self.db.get_user_by_id(user_id)
         if data:
-            # Filter keys that match UserProfile fields
-            valid_keys = UserProfile.__annotations__.keys()
-            filtered_data = {k: v for k, v in data.items() if k in valid_keys}
-            return UserProfile(**filtered_data)
+            profile = self._to_profile(data)
+            self.profiles.put(user_id, profile, data['version'])
+            return profile
         return None
 
     def update_user_profile(self, user_id: str, profile_data: Dict) -> Optional[UserProfile]:
         data = self.db.update_user_profile(user_id, profile_data)
         if data:
-            valid_keys = UserProfile.__annotations__.keys()
-            filtered_data = {k: v for k, v in data.items() if k in valid_keys}
-            return UserProfile(**filtered_data)
+            # Write-through: the row returned by the update is the new cached value
+            profile = self._to_profile(data)
+            self.profiles.put(user_id, profile, data['version'])
+            return profile
+        self.profiles.invalidate(user_id)
         return None
 
+    def _to_profile(self, data: Dict) -> UserProfile:
+        # Filter keys that match UserProfile fields
+        valid_keys = UserProfile.__annotations__.keys()
+        return UserProfile(**{k: v for k, v in data.items() if k in valid_keys})
+
     def create_study_session(self, user_id: str, session_data: Dict) -> StudySession:
         session = StudySession(
             id=str(uuid.uuid4()),
@@ -93,49 +291,229 @@ class AIStudyBuddyBackend:
             session.end_time = datetime.now().isoformat()
             session.confidence_level = confidence_level
             
-            # Calculate duration in minutes
-            start_time = datetime.fromisoformat(session.start_time)
-            end_time = datetime.fromisoformat(session.end_time)
-            session.duration = int((end_time - start_time).total_seconds() / 60)
+            session.duration = self._duration_minutes(session.start_time, session.end_time)
             
             self.db.save_study_session(session)
             return session
         return None
 
+    def _duration_minutes(self, start_time: str, end_time: str) -> int:
+        start = self._local_time(start_time)
+        end = self._local_time(end_time)
+        return int((end - start).total_seconds() / 60)
+
+    @staticmethod
+    def _local_time(value: str) -> datetime:
+        # Session times are naive local time, like datetime.now(); offsets are converted
+        parsed = datetime.fromisoformat(value)
+        return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+
+    @staticmethod
+    def _int_field(data: Dict, field: str, default: int) -> int:
+        value = data.get(field, default)
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError(f'{field} must be an integer')
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f'{field} must be an integer') from None
+
+    @classmethod
+    def _time_field(cls, data: Dict, field: str, default: str) -> str:
+        value = data.get(field) or default
+        try:
+            return cls._local_time(value).isoformat()
+        except (TypeError, ValueError):
+            raise ValueError(f'{field} must be an ISO 8601 timestamp') from None
+
+    @staticmethod
+    def _str_field(data: Dict, field: str, default: Optional[str]) -> Optional[str]:
+        value = data.get(field, default)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f'{field} must be a string')
+        return value
+
+    def apply_session_events(self, user_id: str, events: List[Dict]) -> List[Dict]:
+        """Apply create/question/end events in one transaction and report each event's outcome.
+
+        A create event may carry a ``ref`` that later events in the same batch use as their
+        ``session_id``, so offline clients can replay a whole session in one request.
+        """
+        now = datetime.now().isoformat()
+        referenced = [e['session_id'] for e in events if isinstance(e, dict) and isinstance(e.get('session_id'), str)]
+        known = self.db.get_session_times(user_id, referenced)
+        refs = {}
+        creates, increments, ends, results = [], {}, [], []
+
+        for index, event in enumerate(events):
+            kind = event.get('type') if isinstance(event, dict) else None
+            if kind == 'create':
+                try:
+                    topic = self._str_field(event, 'topic', None) or 'general'
+                    ref = self._str_field(event, 'ref', None)
+                    start_time = self._time_field(event, 'start_time', now)
+                except ValueError as e:
+                    results.append({'index': index, 'ok': False, 'error': str(e)})
+                    continue
+                session = StudySession(
+                    id=str(uuid.uuid4()),
+                    user_id=user_id,
+                    topic=topic,
+                    duration=0,
+                    materials_covered=[],
+                    questions_asked=0,
+                    confidence_level=0,
+                    start_time=start_time,
+                    end_time=""
+                )
+                creates.append(session)
+                known[session.id] = [session.start_time, ""]
+                if ref:
+                    refs[ref] = session.id
+                results.append({'index': index, 'ok': True, 'session_id': session.id})
+                continue
+
+            try:
+                if kind not in ('question', 'end'):
+                    raise ValueError('Unknown event type')
+                session_id = self._str_field(event, 'session_id', None)
+                session_id = refs.get(session_id, session_id)
+                if session_id not in known:
+                    raise ValueError('Session not found')
+                if kind == 'question':
+                    count = self._int_field(event, 'count', 1)
+                    if count < 1:
+                        raise ValueError('count must be at least 1')
+                    increments[session_id] = increments.get(session_id, 0) + count
+                else:
+                    if known[session_id][1]:
+                        raise ValueError('Session already ended')
+                    confidence_level = self._int_field(event, 'confidence_level', 5)
+                    end_time = self._time_field(event, 'end_time', now)
+                    duration = self._duration_minutes(known[session_id][0], end_time)
+                    known[session_id][1] = end_time
+                    ends.append((session_id, confidence_level, end_time, duration))
+            except ValueError as e:
+                results.append({'index': index, 'ok': False, 'error': str(e)})
+            else:
+                results.append({'index': index, 'ok': True, 'session_id': session_id})
+
+        self.db.apply_session_events(user_id, creates, increments, ends)
+        return results
+
     def add_session_question(self, user_id: str, session_id: str) -> bool:
-        session = self.db.get_study_session(session_id)
-        if session and session.user_id == user_id:
-            session.questions_asked += 1
-            self.db.save_study_session(session)
-            return True
-        return False
+        return self.db.increment_questions_and_get_topic(session_id, user_id) is not None
 
     def ask_ai(self, user_id: str, session_id: str, question: str) -> str:
-        # First, increment the question count
-        self.add_session_question(user_id, session_id)
+        # Increment the question count and fetch the topic in one statement; None means
+        # the session is not this user's, so it gets no conversation memory either
+        topic = self.db.increment_questions_and_get_topic(session_id, user_id)
         
-        session = self.db.get_study_session(session_id)
-        topic = session.topic if session else "general knowledge"
+        if self.has_gemini:
+            subject = topic or "general knowledge"
+            history = self.memory.context(session_id) if topic else ''
+            response = self._cached_answer(subject, question, history)
+            if response is None:
+                response = self._call_gemini(self._chat_prompt(subject, question, history), 'ask_ai')
+                if response and not history and self.answers:
+                    self.answers.put(subject, question, response)
+            if response:
+                if topic:
+                    self._remember(session_id, question, response)
+                return response
         
+        return self._offline_answer(topic or "general knowledge")
+
+    def ask_ai_stream(self, user_id: str, session_id: str, question: str) -> Iterator[str]:
+        # The question is counted up front, even if the client disconnects mid-stream
+        topic = self.db.increment_questions_and_get_topic(session_id, user_id)
+        return self._stream_answer(session_id if topic else None, topic or "general knowledge", question)
+
+    def _stream_answer(self, session_id: Optional[str], topic: str, question: str) -> Iterator[str]:
+        chunks = []
         if self.has_gemini:
-            prompt = f"""
-            You are an AI Study Buddy helping a student learn {topic}.
+            history = self.memory.context(session_id) if session_id else ''
+            cached = self._cached_answer(topic, question, history)
+            if cached is not None:
+                chunks.append(cached)
+                yield cached
+            else:
+                for text in self._call_gemini_stream(self._chat_prompt(topic, question, history), 'ask_ai_stream'):
+                    chunks.append(text)
+                    yield text
+                if chunks and not history and self.answers:
+                    self.answers.put(topic, question, ''.join(chunks))
+        if not chunks:
+            yield self._offline_answer(topic)
+        elif session_id:
+            self._remember(session_id, question, ''.join(chunks))
+
+    def _cached_answer(self, topic: str, question: str, history: str) -> Optional[str]:
+        # Only context-free questions are shared; a follow-up depends on its own conversation
+        if self.answers is None or history:
+            return None
+        answer = self.answers.get(topic, question)
+        if metrics.enabled:
+            metrics.inc('llm_semantic_cache_total', outcome='miss' if answer is None else 'hit')
+        return answer
+
+    def _chat_prompt(self, topic: str, question: str, history: str = '') -> str:
+        history = f"\n{history}\n" if history else ''
+        return f"""
+            You are an AI Study Buddy helping a student learn {topic}.{history}
             The student asks: "{question}"
             Provide a clear, concise, and helpful explanation suitable for a student.
             """
-            response = self._call_gemini(prompt)
+
+    def _remember(self, session_id: str, question: str, answer: str):
+        self.memory.record(session_id, question, answer)
+        # Folding old turns into the summary may call the model, so keep it off the request path
+        self.executor.submit(self._compact_conversation, session_id)
+
+    def _compact_conversation(self, session_id: str):
+        try:
+            self.memory.compact(session_id)
+        except Exception as e:
+            print(f"Conversation compaction failed for {session_id}: {e}")
+
+    def _summarize_conversation(self, summary: str, turns: List[Dict]) -> str:
+        if self.has_gemini:
+            exchanges = '\n'.join(format_turn(turn['role'], turn['content']) for turn in turns)
+            prompt = f"""
+            Update the running summary of a tutoring conversation with the exchanges below.
+            Keep the topics covered, what the student understood, and open questions or misconceptions.
+            Reply with the updated summary only, in at most {self.config.CHAT_SUMMARY_TOKENS * 3 // 4} words.
+            Current summary: {summary or '(none)'}
+            New exchanges:
+            {exchanges}
+            """
+            response = self._call_gemini(prompt, 'summarize_conversation')
             if response:
-                return response
-        
-        # Fallback response
+                return response.strip()
+        return extractive_summary(summary, turns, self.config.CHAT_SUMMARY_TOKENS)
+
+    def _offline_answer(self, topic: str) -> str:
         return f"I'm currently in offline mode, but that's a great question about {topic}! Try looking it up in the recommended resources."
 
     def get_study_sessions(self, user_id: str) -> List[StudySession]:
         return self.db.get_study_sessions(user_id)
 
-    def generate_quiz(self, topic: str, difficulty: str, num_questions: int = 5) -> List[Dict]:
+    def get_study_sessions_page(self, user_id: str, limit: int, cursor: Optional[tuple] = None,
+                                fields: Optional[List[str]] = None):
+        return self.db.get_study_sessions_page(user_id, limit, cursor, fields)
+
+    def generate_quiz(self, topic: str, difficulty: str, num_questions: int = 5, exclude_ids: List[str] = ()) -> List[Dict]:
         if self.has_gemini:
-            prompt = f"""
+            params = {'topic': topic, 'difficulty': difficulty, 'num_questions': num_questions}
+            questions_data = self._cached_generation('quiz', params, lambda: self._generate_quiz_with_ai(topic, difficulty, num_questions))
+            if questions_data:
+                return questions_data
+        
+        # Fallback to the offline question bank
+        return self.quiz_bank.sample(topic, difficulty, num_questions, exclude_ids)
+
+    def _generate_quiz_with_ai(self, topic: str, difficulty: str, num_questions: int) -> Optional[List[Dict]]:
+        prompt = f"""
             Generate {num_questions} {difficulty} level quiz questions about {topic}.
             Return ONLY a valid JSON array of objects. Each object must have:
             - id: a unique string
@@ -146,96 +524,12 @@ class AIStudyBuddyBackend:
             - topic: "{topic}"
             - difficulty: "{difficulty}"
             """
-            response = self._call_gemini(prompt)
-
-            if response:
-                questions_data = self._parse_gemini_json(response)
-                if questions_data:
-                    return questions_data
-        
-        # Fallback to hardcoded
-        all_quizzes = self._generate_comprehensive_quizzes()
-        topic_quizzes = all_quizzes.get(topic, {})
-        difficulty_quizzes = topic_quizzes.get(difficulty, [])
-        
-        selected_questions = difficulty_quizzes[:num_questions]
-        return [asdict(q) for q in selected_questions]
-
-    def _generate_comprehensive_quizzes(self):
-        # ... (Keeping the hardcoded quizzes for now as per original app.py)
-        # In a real app, these should probably be in the DB too
-        return {
-            "python": {
-                "easy": [
-                    QuizQuestion(
-                        id="py_easy_1",
-                        question="What is the output of print(2 + 3 * 4)?",
-                        options=["20", "14", "24", "Error"],
-                        correct_answer="14",
-                        explanation="Python follows PEMDAS order of operations: multiplication before addition.",
-                        topic="python",
-                        difficulty="easy"
-                    ),
-                    QuizQuestion(
-                        id="py_easy_2",
-                        question="What keyword is used to define a function in Python?",
-                        options=["function", "def", "define", "func"],
-                        correct_answer="def",
-                        explanation="The 'def' keyword is used to define functions in Python.",
-                        topic="python",
-                        difficulty="easy"
-                    )
-                ],
-                "medium": [
-                    QuizQuestion(
-                        id="py_medium_1",
-                        question="What does the 'self' parameter represent in Python class methods?",
-                        options=["The class itself", "The instance of the class", "A reference to the parent class", "A static method indicator"],
-                        correct_answer="The instance of the class",
-                        explanation="The 'self' parameter refers to the instance of the class.",
-                        topic="python",
-                        difficulty="medium"
-                    )
-                ],
-                "hard": [
-                    QuizQuestion(
-                        id="py_hard_1",
-                        question="What is the time complexity of searching in a Python dictionary?",
-                        options=["O(1)", "O(n)", "O(log n)", "O(n²)"],
-                        correct_answer="O(1)",
-                        explanation="Python dictionaries use hash tables, providing average O(1) time complexity for lookups.",
-                        topic="python",
-                        difficulty="hard"
-                    )
-                ]
-            },
-            "javascript": {
-                "easy": [
-                    QuizQuestion(
-                        id="js_easy_1",
-                        question="Which keyword is used to declare a variable in modern JavaScript?",
-                        options=["var", "let", "const", "all of the above"],
-                        correct_answer="all of the above",
-                        explanation="JavaScript has three variable declaration keywords: var, let, and const.",
-                        topic="javascript",
-                        difficulty="easy"
-                    )
-                ]
-            },
-            "react": {
-                "easy": [
-                    QuizQuestion(
-                        id="react_easy_1",
-                        question="What is JSX in React?",
-                        options=["A JavaScript library", "A syntax extension for JavaScript", "A CSS framework", "A database query language"],
-                        correct_answer="A syntax extension for JavaScript",
-                        explanation="JSX is a syntax extension that allows writing HTML-like code in JavaScript.",
-                        topic="react",
-                        difficulty="easy"
-                    )
-                ]
-            }
-        }
+        response = self._call_gemini(prompt, 'generate_quiz')
+        if response:
+            validate = lambda item: llm_json.quiz_question(item, topic, difficulty)
+            questions = llm_json.parse_list(response, validate, 'generate_quiz')
+            return questions[:num_questions] if questions else None
+        return None
 
     def submit_quiz_answers(self, questions: List[Dict], answers: Dict) -> Dict:
         score = 0
@@ -267,7 +561,25 @@ class AIStudyBuddyBackend:
             'results': results
         }
 
+    def record_reviews(self, user_id: str, reviews: List[Dict]) -> List[Dict]:
+        return self.scheduler.record_reviews(user_id, reviews)
+
+    def get_due_reviews(self, user_id: str, limit: int = 50) -> List[Dict]:
+        return self.scheduler.due_reviews(user_id, limit)
+
     def create_study_plan(self, user_id: str, plan_data: Dict) -> StudyPlan:
+        plan, days_available = self._new_study_plan(user_id, plan_data)
+        steps = self._study_plan_steps(plan.topic, days_available)
+        if self.has_gemini:
+            # Goals and resources are independent model calls; run them side by side
+            plan.weekly_goals, plan.resources = self._run_parallel(steps)
+        else:
+            plan.weekly_goals, plan.resources = [generate() for generate, _ in steps]
+
+        self.db.save_study_plan(plan)
+        return plan
+
+    def _new_study_plan(self, user_id: str, plan_data: Dict):
         topic = plan_data.get('topic', 'General Studies')
         
         target_days = plan_data.get('target_days')
@@ -294,44 +606,51 @@ class AIStudyBuddyBackend:
             topic=topic,
             total_hours=total_hours,
             daily_hours=round(daily_hours, 1),
-            weekly_goals=self._generate_weekly_goals(topic, days_available),
-            resources=self._get_recommended_resources(topic),
+            weekly_goals=[],
+            resources=[],
             assessment_schedule=self._generate_assessment_schedule(days_available),
             deadline=deadline,
             created_at=datetime.now().isoformat()
         )
-        
-        self.db.save_study_plan(plan)
-        return plan
+        return plan, days_available
 
-    def _parse_gemini_json(self, response_text: str) -> Optional[Any]:
-        try:
-            # Remove markdown code blocks
-            cleaned_text = response_text.replace('```json', '').replace('```', '').strip()
-            return json.loads(cleaned_text)
-        except json.JSONDecodeError:
-            print(f"Failed to decode Gemini response: {response_text}")
-            return None
+    def _study_plan_steps(self, topic: str, days_available: int) -> List:
+        return [
+            (lambda: self._generate_weekly_goals(topic, days_available),
+             lambda: self._fallback_weekly_goals(topic, days_available)),
+            (lambda: self._get_recommended_resources(topic),
+             lambda: self._fallback_resources(topic)),
+        ]
+
+    def _run_parallel(self, steps: List) -> List[Any]:
+        # steps are (generate, fallback) pairs sharing one deadline; a step that
+        # times out or raises gets its fallback while the others keep their results.
+        deadline = time.monotonic() + self.config.LLM_STEP_TIMEOUT
+        futures = [self.executor.submit(generate) for generate, _ in steps]
+        results = []
+        for future, (_, fallback) in zip(futures, steps):
+            try:
+                results.append(future.result(timeout=max(deadline - time.monotonic(), 0)))
+            except FutureTimeoutError:
+                print("Generation step timed out. Using fallback logic.")
+                results.append(fallback())
+            except Exception as e:
+                print(f"Generation step failed: {e}")
+                results.append(fallback())
+        return results
 
     def _generate_weekly_goals(self, topic: str, total_days: int) -> List[Dict]:
         weeks = max(1, min(total_days // 7, 12))
         
         if self.has_gemini:
-            prompt = f"""
-            Create a {weeks}-week study plan for {topic}.
-            Return ONLY a valid JSON array of objects. Each object must have:
-            - week: integer (1, 2, etc.)
-            - theme: string (Main topic for the week)
-            - goals: array of strings (Specific learning objectives)
-            Example: [{{"week": 1, "theme": "Basics", "goals": ["Learn syntax", "Variables"]}}]
-            """
-            response = self._call_gemini(prompt)
-            if response:
-                goals = self._parse_gemini_json(response)
-                if isinstance(goals, list) and len(goals) > 0:
-                    return goals[:weeks]
+            goals = self._cached_generation('weekly_goals', {'topic': topic, 'weeks': weeks}, lambda: self._generate_weekly_goals_with_ai(topic, weeks))
+            if goals:
+                return goals
+
+        return self._fallback_weekly_goals(topic, total_days)
 
-        # Fallback
+    def _fallback_weekly_goals(self, topic: str, total_days: int) -> List[Dict]:
+        weeks = max(1, min(total_days // 7, 12))
         goals = []
         topic_goals = {
             "python": [
@@ -375,40 +694,194 @@ class AIStudyBuddyBackend:
         
         return goals
 
+    def _generate_weekly_goals_with_ai(self, topic: str, weeks: int) -> Optional[List[Dict]]:
+        prompt = f"""
+            Create a {weeks}-week study plan for {topic}.
+            Return ONLY a valid JSON array of objects. Each object must have:
+            - week: integer (1, 2, etc.)
+            - theme: string (Main topic for the week)
+            - goals: array of strings (Specific learning objectives)
+            Example: [{{"week": 1, "theme": "Basics", "goals": ["Learn syntax", "Variables"]}}]
+            """
+        response = self._call_gemini(prompt, 'weekly_goals')
+        if response:
+            goals = llm_json.parse_list(response, llm_json.weekly_goal, 'weekly_goals')
+            if goals:
+                return goals[:weeks]
+        return None
+
     def _get_recommended_resources(self, topic: str) -> List[str]:
         if self.has_gemini:
-            prompt = f"""
+            resources = self._cached_generation('resources', {'topic': topic}, lambda: self._get_recommended_resources_with_ai(topic))
+            if resources:
+                return resources
+        
+        return self._fallback_resources(topic)
+
+    def _fallback_resources(self, topic: str) -> List[str]:
+        return [f"{topic} Official Documentation", f"{topic} for Beginners", f"Advanced {topic} Concepts"]
+
+    def _get_recommended_resources_with_ai(self, topic: str) -> Optional[List[str]]:
+        prompt = f"""
             Suggest 3-5 high-quality study resources for {topic}.
             Return ONLY a valid JSON array of strings.
             Example: ["Resource 1", "Resource 2"]
             """
-            response = self._call_gemini(prompt)
-            if response:
-                resources = self._parse_gemini_json(response)
-                if resources and isinstance(resources, list):
-                    return resources
-        
-        return [f"{topic} Official Documentation", f"{topic} for Beginners", f"Advanced {topic} Concepts"]
+        response = self._call_gemini(prompt, 'recommended_resources')
+        if response:
+            resources = llm_json.parse_list(response, llm_json.resource, 'recommended_resources')
+            if resources:
+                return resources
+        return None
 
     def generate_flashcards(self, topic: str, count: int = 5) -> List[Dict]:
         if self.has_gemini:
-            prompt = f"""
+            flashcards = self._cached_generation('flashcards', {'topic': topic, 'count': count}, lambda: self._generate_flashcards_with_ai(topic, count))
+            if flashcards:
+                return flashcards
+        
+        return self._fallback_flashcards(topic)
+
+    def _fallback_flashcards(self, topic: str) -> List[Dict]:
+        return [
+            {"front": f"What is {topic}?", "back": f"A key concept in {topic}."},
+            {"front": "Key Term 1", "back": "Definition of key term 1."},
+            {"front": "Key Term 2", "back": "Definition of key term 2."}
+        ]
+
+    def _generate_flashcards_with_ai(self, topic: str, count: int) -> Optional[List[Dict]]:
+        prompt = f"""
             Create {count} flashcards for the topic "{topic}".
             Return ONLY a valid JSON array of objects. Each object must have:
             - front: string (the question or term)
             - back: string (the answer or definition)
             Example: [{{"front": "Term", "back": "Definition"}}]
             """
-            response = self._call_gemini(prompt)
-            if response:
-                return self._parse_gemini_json(response)
-        
-        # Fallback
-        return [
-            {"front": f"What is {topic}?", "back": f"A key concept in {topic}."},
-            {"front": "Key Term 1", "back": "Definition of key term 1."},
-            {"front": "Key Term 2", "back": "Definition of key term 2."}
+        response = self._call_gemini(prompt, 'generate_flashcards')
+        if response:
+            flashcards = llm_json.parse_list(response, llm_json.flashcard, 'generate_flashcards')
+            return flashcards[:count] if flashcards else None
+        return None
+
+    def generate_quiz_batch(self, specs: List[Dict]) -> List[List[Dict]]:
+        # specs are dicts with topic, difficulty and count; results line up with specs
+        results, steps = self._batch_steps('quiz', specs)
+        self._merge_batch('quiz', specs, results, self._run_parallel(steps))
+        return self._batch_fallbacks('quiz', specs, results)
+
+    def generate_flashcards_batch(self, specs: List[Dict]) -> List[List[Dict]]:
+        # specs are dicts with topic and count; results line up with specs
+        results, steps = self._batch_steps('flashcards', specs)
+        self._merge_batch('flashcards', specs, results, self._run_parallel(steps))
+        return self._batch_fallbacks('flashcards', specs, results)
+
+    def _batch_cache_key(self, kind: str, spec: Dict) -> str:
+        if kind == 'quiz':
+            return self.cache.make_key(kind, topic=spec['topic'], difficulty=spec['difficulty'], num_questions=spec['count'])
+        return self.cache.make_key(kind, topic=spec['topic'], count=spec['count'])
+
+    def _batch_steps(self, kind: str, specs: List[Dict]):
+        # Cached specs are served directly; the rest are packed into as few prompts as
+        # the output budget allows. Returns (results, steps) for _run_parallel.
+        results = [None] * len(specs)
+        if not self.has_gemini:
+            return results, []
+
+        pending = []
+        for i, spec in enumerate(specs):
+            results[i] = self.cache.get(self._batch_cache_key(kind, spec))
+            if not results[i]:
+                pending.append(i)
+
+        if kind == 'quiz':
+            item_tokens, build_prompt, caller = QUIZ_ITEM_TOKENS, self._quiz_batch_prompt, 'generate_quiz_batch'
+            validate = lambda item, spec: llm_json.quiz_question(item, spec['topic'], spec['difficulty'])
+        else:
+            item_tokens, build_prompt, caller = FLASHCARD_ITEM_TOKENS, self._flashcard_batch_prompt, 'generate_flashcards_batch'
+            validate = lambda item, spec: llm_json.flashcard(item)
+        steps = [
+            (lambda pack=pack: self._generate_pack(pack, specs, build_prompt, validate, caller), dict)
+            for pack in self._pack_specs(pending, specs, item_tokens)
         ]
+        return results, steps
+
+    def _merge_batch(self, kind: str, specs: List[Dict], results: List[Optional[List]], generated_packs: List[Dict]):
+        for generated in generated_packs:
+            for i, items in generated.items():
+                results[i] = items[:specs[i]['count']]
+                # A short answer is still returned, but caching it would serve it until the TTL
+                if len(items) >= specs[i]['count']:
+                    self.cache.set(self._batch_cache_key(kind, specs[i]), results[i])
+
+    def _batch_fallbacks(self, kind: str, specs: List[Dict], results: List[Optional[List]]) -> List[List[Dict]]:
+        if kind == 'quiz':
+            return [
+                questions or self.quiz_bank.sample(spec['topic'], spec['difficulty'], spec['count'])
+                for questions, spec in zip(results, specs)
+            ]
+        return [cards or self._fallback_flashcards(spec['topic']) for cards, spec in zip(results, specs)]
+
+    def _pack_specs(self, indexes: List[int], specs: List[Dict], item_tokens: int) -> List[List[int]]:
+        packs, pack, used = [], [], 0
+        for i in indexes:
+            cost = specs[i]['count'] * item_tokens
+            if pack and used + cost > self.config.LLM_BATCH_TOKEN_BUDGET:
+                packs.append(pack)
+                pack, used = [], 0
+            pack.append(i)
+            used += cost
+        if pack:
+            packs.append(pack)
+        return packs
+
+    def _generate_pack(self, pack: List[int], specs: List[Dict], build_prompt, validate, caller: str) -> Dict[int, List]:
+        response = self._call_gemini(build_prompt([specs[i] for i in pack]), caller)
+        if not response:
+            return {}
+
+        def grouped(item):
+            group = item.get('group') if isinstance(item, dict) else None
+            if isinstance(group, bool) or not isinstance(group, int) or not 0 <= group < len(pack):
+                return None
+            value = validate(item, specs[pack[group]])
+            return (pack[group], value) if value is not None else None
+
+        generated = {}
+        for i, value in llm_json.parse_list(response, grouped, caller) or []:
+            generated.setdefault(i, []).append(value)
+        return generated
+
+    def _quiz_batch_prompt(self, specs: List[Dict]) -> str:
+        groups = '\n'.join(
+            f"            - group {n}: {spec['count']} {spec['difficulty']} level questions about {spec['topic']}"
+            for n, spec in enumerate(specs)
+        )
+        return f"""
+            Generate quiz questions for each of these groups:
+{groups}
+            Return ONLY a valid JSON array of objects covering every group. Each object must have:
+            - group: integer (the group number the question belongs to)
+            - id: a unique string
+            - question: string
+            - options: array of 4 strings
+            - correct_answer: string (must be one of the options)
+            - explanation: string
+            """
+
+    def _flashcard_batch_prompt(self, specs: List[Dict]) -> str:
+        groups = '\n'.join(
+            f"            - group {n}: {spec['count']} flashcards for the topic \"{spec['topic']}\""
+            for n, spec in enumerate(specs)
+        )
+        return f"""
+            Create flashcards for each of these groups:
+{groups}
+            Return ONLY a valid JSON array of objects covering every group. Each object must have:
+            - group: integer (the group number the flashcard belongs to)
+            - front: string (the question or term)
+            - back: string (the answer or definition)
+            Example: [{{"group": 0, "front": "Term", "back": "Definition"}}]
+            """
 
     def _generate_assessment_schedule(self, total_days: int) -> List[str]:
         weeks = total_days // 7
@@ -428,28 +901,25 @@ class AIStudyBuddyBackend:
     def get_study_plans(self, user_id: str) -> List[StudyPlan]:
         return self.db.get_study_plans(user_id)
 
+    def get_study_plans_page(self, user_id: str, limit: int, cursor: Optional[tuple] = None,
+                             fields: Optional[List[str]] = None):
+        return self.db.get_study_plans_page(user_id, limit, cursor, fields)
+
     def delete_study_plan(self, user_id: str, plan_id: str) -> bool:
         return self.db.delete_study_plan(plan_id, user_id)
 
     def get_progress_stats(self, user_id: str) -> Dict:
-        sessions = self.db.get_study_sessions(user_id)
-        
-        total_study_time = sum(session.duration for session in sessions)
-        sessions_completed = len(sessions)
-        questions_asked = sum(session.questions_asked for session in sessions)
-        average_confidence = sum(session.confidence_level for session in sessions) / sessions_completed if sessions_completed > 0 else 0
-        
-        topic_distribution = {}
-        for session in sessions:
-            topic = session.topic
-            topic_distribution[topic] = topic_distribution.get(topic, 0) + session.duration
+        # Read from the aggregates maintained alongside study_sessions, not a rescan
+        progress = self.db.get_progress(user_id)
+        sessions_completed = progress['sessions_completed']
+        average_confidence = progress['confidence_sum'] / sessions_completed if sessions_completed > 0 else 0
         
         return {
-            'total_study_time': total_study_time,
+            'total_study_time': progress['total_study_time'],
             'sessions_completed': sessions_completed,
-            'questions_asked': questions_asked,
+            'questions_asked': progress['questions_asked'],
             'average_confidence': round(average_confidence, 1),
-            'topic_distribution': topic_distribution
+            'topic_distribution': progress['topic_distribution']
         }
 
     def get_motivational_message(self) -> str:
@@ -466,3 +936,4 @@ class AIStudyBuddyBackend:
             "Your brain is getting stronger with every study session! 🧠"
         ]
         return random.choice(messages)
+
@@ -0,0 +1,33 @@
+import csv
+import json
+from typing import Dict, Iterator
+
+from models import StudySession
+
+
+def _to_session(record: Dict) -> StudySession:
+    materials = record.get('materials_covered') or []
+    if isinstance(materials, str):
+        materials = json.loads(materials)
+    return StudySession(
+        id=record['id'],
+        user_id=record['user_id'],
+        topic=record['topic'],
+        duration=int(record.get('duration') or 0),
+        materials_covered=materials,
+        questions_asked=int(record.get('questions_asked') or 0),
+        confidence_level=int(record.get('confidence_level') or 0),
+        start_time=record.get('start_time') or '',
+        end_time=record.get('end_time') or ''
+    )
+
+
+def read_sessions(path: str) -> Iterator[StudySession]:
+    """Stream StudySession rows from a .csv (header row required) or .jsonl export."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            records = csv.DictReader(f)
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+        for record in records:
+            yield _to_session(record)
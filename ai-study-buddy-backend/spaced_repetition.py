@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from database import Database
+
+# Mirrors SpacedRepetitionSystem in the frontend's spacedRepetition.js
+INTERVALS = [1, 3, 7, 14, 30, 60]
+MULTIPLIERS = {'easy': 2.5, 'medium': 1.5, 'hard': 0.8}
+
+
+def next_interval(performance: str, current_interval: int = 1) -> int:
+    if performance not in MULTIPLIERS:
+        raise ValueError(f"Unknown performance '{performance}', expected one of {sorted(MULTIPLIERS)}")
+    new_interval = current_interval * MULTIPLIERS[performance]
+    if performance == 'hard':
+        new_interval = max(1, new_interval)
+    return next((interval for interval in INTERVALS if interval >= new_interval), INTERVALS[-1])
+
+
+class SpacedRepetitionScheduler:
+    """Records quiz review outcomes in quiz_progress and serves due-now queues."""
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    def record_reviews(self, user_id: str, reviews: List[Dict], now: Optional[datetime] = None) -> List[Dict]:
+        now = now or datetime.now()
+        for review in reviews:
+            if not isinstance(review, dict) or not isinstance(review.get('question_id'), str) or not review['question_id']:
+                raise ValueError("Each review needs a question_id")
+            if not isinstance(review.get('performance'), str):
+                raise ValueError(f"performance must be one of {sorted(MULTIPLIERS)}")
+            next_interval(review['performance'])
+
+        current = self.db.get_quiz_progress(user_id, list({r['question_id'] for r in reviews}))
+        results = []
+        for review in reviews:
+            previous = current.get(review['question_id'])
+            interval = next_interval(review['performance'], previous['interval_days'] if previous else 1)
+            progress = {
+                'question_id': review['question_id'],
+                'performance': review['performance'],
+                'interval_days': interval,
+                'next_review': (now + timedelta(days=interval)).isoformat(),
+                'review_count': (previous['review_count'] if previous else 0) + 1
+            }
+            # Later reviews of the same card in one batch build on the earlier ones
+            current[review['question_id']] = progress
+            results.append(progress)
+
+        # One executemany in one transaction, however many cards were reviewed
+        self.db.save_quiz_progress(user_id, list(current.values()))
+        return results
+
+    def due_reviews(self, user_id: str, limit: int = 50, now: Optional[datetime] = None) -> List[Dict]:
+        now = now or datetime.now()
+        return self.db.get_due_quiz_progress(user_id, now.isoformat(), limit)
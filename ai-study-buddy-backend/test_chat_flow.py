@@ -1,6 +1,7 @@
 import pytest
 import json
-from app import app, db, study_buddy
+from app import create_app
+from config import Config
 from unittest.mock import MagicMock
 import sys
 
@@ -14,15 +15,17 @@ import sys
 
 def test_ask_ai_flow():
     # Setup
-    app.config['TESTING'] = True
     # Use in-memory or temp db
     import tempfile
     import os
     db_fd, db_path = tempfile.mkstemp()
-    app.config['DB_PATH'] = db_path
-    db.db_path = db_path
-    db.init_db()
-    study_buddy.db.db_path = db_path
+
+    class ChatFlowConfig(Config):
+        TESTING = True
+        DB_PATH = db_path
+
+    app = create_app(ChatFlowConfig)
+    study_buddy = app.extensions['study_buddy']
     
     # Mock the Gemini call to avoid using quota or network in this automated test
     # We want to verify the route and service logic, not Google's API uptime.
@@ -64,6 +67,7 @@ def test_ask_ai_flow():
 
     # Cleanup
     study_buddy._call_gemini = original_call_gemini
+    study_buddy.close()
     os.close(db_fd)
     os.unlink(db_path)
 
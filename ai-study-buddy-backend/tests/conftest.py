@@ -0,0 +1,38 @@
+import pytest
+
+from app import create_app
+from config import Config
+
+
+@pytest.fixture
+def app(tmp_path):
+    # Subclassing keeps monkeypatched Config values visible to the app under test;
+    # the offline fake provider stands in for Gemini
+    class TestConfig(Config):
+        TESTING = True
+        DB_PATH = str(tmp_path / 'test.db')
+        LLM_PROVIDER = 'fake'
+        FAKE_MODEL_LATENCY = 0
+        FAKE_MODEL_JITTER = 0
+        FAKE_MODEL_FAILURE_RATE = 0
+
+    app = create_app(TestConfig)
+    yield app
+    app.extensions['study_buddy'].close()
+
+
+@pytest.fixture
+def study_buddy(app):
+    return app.extensions['study_buddy']
+
+
+@pytest.fixture
+def db(study_buddy):
+    # The routes and the service layer share this Database
+    return study_buddy.db
+
+
+@pytest.fixture
+def client(app):
+    with app.test_client() as client:
+        yield client
@@ -1,43 +1,11 @@
-import sys
-from unittest.mock import MagicMock
 import pytest
 import json
 
-# Mock google.generativeai before importing app
-mock_genai = MagicMock()
-sys.modules['google.generativeai'] = mock_genai
-
-from app import app, db, study_buddy
+from app import create_app
+from config import Config
 from models import UserProfile
 
 import tempfile
-import os
-
-@pytest.fixture
-def client():
-    # Use a fixed file for testing to debug
-    db_path = 'test_debug.db'
-    if os.path.exists(db_path):
-        os.remove(db_path)
-    
-    app.config['TESTING'] = True
-    app.config['DB_PATH'] = db_path
-    
-    # Re-init db for testing
-    db.db_path = db_path
-    db.init_db()
-    
-    # Patch study_buddy service db
-    study_buddy.db.db_path = db_path
-    # No need to init_db again as it uses the same file, but we can to be safe or just update path
-    # The tables are already created by db.init_db()
-    
-    with app.test_client() as client:
-        yield client
-    
-    # Cleanup
-    if os.path.exists(db_path):
-        os.remove(db_path)
 
 def test_health_check(client):
     response = client.get('/api/health')
@@ -87,3 +55,17 @@ def test_quiz_generation(client):
     assert response.status_code == 200
     assert len(response.json) > 0
     assert 'question' in response.json[0]
+
+def test_each_app_has_its_own_services(app, client, tmp_path):
+    class OtherConfig(Config):
+        DB_PATH = str(tmp_path / 'other.db')
+
+    other = create_app(OtherConfig)
+    backend = other.extensions['study_buddy']
+    assert backend is not app.extensions['study_buddy']
+    assert backend.config is OtherConfig and backend.db.db_path == OtherConfig.DB_PATH
+    register_and_login(client)
+    assert other.test_client().post('/api/auth/login', json={
+        'email': 'test@example.com', 'password': 'password123'
+    }).status_code == 401
+    backend.close()
@@ -0,0 +1,44 @@
+import pytest
+
+from passwords import PasswordHasher
+
+
+@pytest.fixture
+def client(client, app, monkeypatch):
+    monkeypatch.setitem(app.extensions, 'passwords', PasswordHasher(rounds=4, workers=0))
+    return client
+
+
+def register(client, email='cost@example.com', password='secret'):
+    client.post('/api/auth/register', json={'email': email, 'password': password, 'name': 'Cost'})
+
+
+def test_login_rehashes_when_cost_changes(client, app, db, monkeypatch):
+    register(client)
+    assert db.get_credentials_by_email('cost@example.com')['password'].startswith('$2b$04$')
+
+    monkeypatch.setattr(app.extensions['passwords'], 'rounds', 5)
+    response = client.post('/api/auth/login', json={'email': 'cost@example.com', 'password': 'secret'})
+
+    assert response.status_code == 200
+    assert response.json['user']['email'] == 'cost@example.com'
+    assert db.get_credentials_by_email('cost@example.com')['password'].startswith('$2b$05$')
+    assert client.post('/api/auth/login', json={'email': 'cost@example.com', 'password': 'secret'}).status_code == 200
+
+
+def test_wrong_password_is_rejected(client):
+    register(client)
+    response = client.post('/api/auth/login', json={'email': 'cost@example.com', 'password': 'nope'})
+    assert response.status_code == 401
+
+
+def test_pooled_hashes_are_interchangeable():
+    pooled = PasswordHasher(rounds=4, workers=1)
+    try:
+        hashed = pooled.hash('secret')
+        assert PasswordHasher(rounds=4).check(hashed, 'secret')
+        assert pooled.check(hashed, 'secret')
+        assert not pooled.check(hashed, 'wrong')
+        assert not pooled.check('not-a-hash', 'secret')
+    finally:
+        pooled.close()
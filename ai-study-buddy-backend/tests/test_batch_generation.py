@@ -0,0 +1,126 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from cache import MemoryCache
+from config import Config
+from providers import GeminiProvider
+
+
+def question(group, n):
+    return {'group': group, 'id': f'g{group}-{n}', 'question': f'Q{n}?', 'options': ['a', 'b', 'c', 'd'],
+            'correct_answer': 'a', 'explanation': 'Because'}
+
+
+class GroupedFakeModel:
+    """Answers every group in the prompt except those listed in ``skip``."""
+
+    def __init__(self, skip=()):
+        self.prompts = []
+        self.skip = skip
+
+    def generate_content(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        groups = prompt.count('- group ')
+        items = [question(g, n) for g in range(groups) if g not in self.skip for n in range(3)]
+        return SimpleNamespace(text='Here you go:\n' + json.dumps(items))
+
+
+@pytest.fixture
+def model(study_buddy, monkeypatch):
+    model = GroupedFakeModel()
+    monkeypatch.setattr(study_buddy, 'has_gemini', True)
+    monkeypatch.setattr(study_buddy, 'provider', GeminiProvider(model))
+    monkeypatch.setattr(study_buddy, 'cache', MemoryCache())
+    return model
+
+
+def test_specs_share_one_prompt_and_split_per_topic(app, model):
+    specs = [{'topic': topic, 'difficulty': 'easy', 'count': 2} for topic in ('python', 'java', 'calculus')]
+    with app.test_client() as client:
+        results = client.post('/api/quiz/generate-batch', json={'specs': specs}).json['results']
+
+    assert len(model.prompts) == 1
+    assert [r['topic'] for r in results] == ['python', 'java', 'calculus']
+    assert [q['id'] for q in results[1]['questions']] == ['g1-0', 'g1-1']
+    assert results[2]['questions'][0]['topic'] == 'calculus'
+
+
+def test_packs_split_by_token_budget_and_reuse_cache(study_buddy, model, monkeypatch):
+    monkeypatch.setattr(Config, 'LLM_BATCH_TOKEN_BUDGET', 2 * 150 * 2)
+    specs = [{'topic': f't{i}', 'difficulty': 'easy', 'count': 2} for i in range(5)]
+
+    study_buddy.generate_quiz_batch(specs)
+    assert len(model.prompts) == 3
+
+    study_buddy.generate_quiz_batch(specs)
+    assert len(model.prompts) == 3
+
+
+def test_missing_topics_fall_back_individually(study_buddy, model):
+    model.skip = (1,)
+    results = study_buddy.generate_quiz_batch([
+        {'topic': 'java', 'difficulty': 'easy', 'count': 2},
+        {'topic': 'python', 'difficulty': 'easy', 'count': 2},
+    ])
+
+    assert [q['id'] for q in results[0]] == ['g0-0', 'g0-1']
+    bank_ids = {q['id'] for q in study_buddy.quiz_bank.questions('python', 'easy')}
+    assert results[1] and {q['id'] for q in results[1]} <= bank_ids
+
+
+def test_short_results_are_returned_but_not_cached(study_buddy, model):
+    specs = [{'topic': 'java', 'difficulty': 'easy', 'count': 5}]
+
+    assert len(study_buddy.generate_quiz_batch(specs)[0]) == 3
+    study_buddy.generate_quiz_batch(specs)
+    assert len(model.prompts) == 2
+
+
+def test_flashcard_batch_falls_back_without_model(app, study_buddy, monkeypatch):
+    monkeypatch.setattr(study_buddy, 'has_gemini', False)
+    with app.test_client() as client:
+        results = client.post('/api/generate-flashcards/batch',
+                              json={'specs': [{'topic': 'chemistry', 'count': 3}]}).json['results']
+    assert results[0]['flashcards'][0]['front'] == 'What is chemistry?'
+
+
+def test_invalid_specs_are_rejected(app):
+    with app.test_client() as client:
+        assert client.post('/api/quiz/generate-batch', json={'specs': []}).status_code == 400
+        assert client.post('/api/quiz/generate-batch', json={'specs': [{'count': 2}]}).status_code == 400
+        assert client.post('/api/generate-flashcards/batch',
+                           json={'specs': [{'topic': 'x', 'count': 0}]}).status_code == 400
+        assert client.post('/api/quiz/generate-batch', json={
+            'specs': [{'topic': 'x', 'count': Config.GENERATION_COUNT_MAX + 1}]
+        }).status_code == 400
+
+
+def test_batch_packs_do_not_wait_behind_their_own_request(app, study_buddy, monkeypatch):
+    # With one executor worker, a request that blocked a worker on its own packs never finished
+    model = GroupedFakeModel()
+    monkeypatch.setattr(study_buddy, 'has_gemini', True)
+    monkeypatch.setattr(study_buddy, 'provider', GeminiProvider(model))
+    monkeypatch.setattr(study_buddy, 'cache', MemoryCache())
+    monkeypatch.setattr(study_buddy, 'executor', ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(Config, 'LLM_STEP_TIMEOUT', 1)
+    specs = [{'topic': 'java', 'difficulty': 'easy', 'count': 1}]
+
+    start = time.perf_counter()
+    with app.test_client() as client:
+        results = client.post('/api/quiz/generate-batch', json={'specs': specs}).json['results']
+
+    assert len(model.prompts) == 1
+    assert results[0]['questions'][0]['id'] == 'g0-0'
+    assert time.perf_counter() - start < 0.5
+
+
+def test_single_generation_counts_are_validated(app, model):
+    with app.test_client() as client:
+        assert client.get('/api/quiz/generate?numQuestions=abc').status_code == 400
+        assert client.get(f'/api/quiz/generate?numQuestions={Config.GENERATION_COUNT_MAX + 1}').status_code == 400
+        assert client.post('/api/generate-flashcards', json={'topic': 'x', 'count': 'many'}).status_code == 400
+        assert len(client.get('/api/quiz/generate?topic=python&numQuestions=2').json) == 2
@@ -0,0 +1,159 @@
+import sqlite3
+from unittest.mock import MagicMock
+
+import pytest
+
+import cache as cache_module
+from cache import MemoryCache, ResponseCache, SemanticCache, SQLiteCache
+from database import SCHEMA_VERSION
+from metrics import metrics
+
+
+def test_keys_are_normalized():
+    assert ResponseCache.make_key('quiz', topic=' Python ', difficulty='EASY', num_questions=5) == \
+        ResponseCache.make_key('quiz', num_questions=5, difficulty='easy', topic='python')
+    assert ResponseCache.make_key('quiz', topic='python', num_questions=5) != \
+        ResponseCache.make_key('quiz', topic='python', num_questions=6)
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set('a', [1])
+    cache.set('b', [2])
+    cache.get('a')
+    cache.set('c', [3])
+
+    assert cache.get('b') is None
+    assert cache.get('a') == [1]
+    assert cache.get('c') == [3]
+    assert cache.evictions == 1
+
+
+def test_memory_cache_expires_entries(monkeypatch):
+    cache = MemoryCache(ttl=10)
+    monkeypatch.setattr('cache.time.time', lambda: 1000.0)
+    cache.set('a', {'x': 1})
+    monkeypatch.setattr('cache.time.time', lambda: 1011.0)
+
+    assert cache.get('a') is None
+    assert cache.stats()['misses'] == 1
+
+
+def test_cached_values_are_copies():
+    cache = MemoryCache()
+    cache.set('a', [{'front': 'x'}])
+    cache.get('a')[0]['front'] = 'changed'
+    assert cache.get('a') == [{'front': 'x'}]
+
+
+def test_sqlite_cache_survives_restart(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    SQLiteCache(path).set('quiz:python', [{'id': 'q1'}])
+
+    cache = SQLiteCache(path, max_entries=1)
+    assert cache.get('quiz:python') == [{'id': 'q1'}]
+    cache.set('quiz:java', [{'id': 'q2'}])
+    assert cache.size() == 1
+    assert cache.get('quiz:python') is None
+
+
+def test_sqlite_cache_table_comes_from_migrations(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    SQLiteCache(path)
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT MAX(version) FROM schema_version').fetchone()[0] == SCHEMA_VERSION
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'response_cache'").fetchone()[0] == 1
+
+
+@pytest.fixture
+def gemini(study_buddy, monkeypatch):
+    calls = MagicMock(return_value='[{"front": "Term", "back": "Definition"}]')
+    monkeypatch.setattr(study_buddy, 'has_gemini', True)
+    monkeypatch.setattr(study_buddy, '_call_gemini', calls)
+    monkeypatch.setattr(study_buddy, 'cache', MemoryCache())
+    return calls
+
+
+def test_generation_hits_cache_and_reports_stats(app, gemini):
+    with app.test_client() as client:
+        for topic in ('python', 'Python ', 'python'):
+            response = client.post('/api/generate-flashcards', json={'topic': topic, 'count': 1})
+            assert response.json == [{'front': 'Term', 'back': 'Definition'}]
+        stats = client.get('/api/cache/stats').json
+
+    assert gemini.call_count == 1
+    assert stats['hits'] == 2
+    assert stats['misses'] == 1
+
+
+def test_failed_generation_is_not_cached(study_buddy, gemini):
+    gemini.return_value = None
+    study_buddy.generate_flashcards('python', 1)
+    study_buddy.generate_flashcards('python', 1)
+
+    assert gemini.call_count == 2
+    assert study_buddy.cache.size() == 0
+
+
+@pytest.mark.parametrize('vectorized', [True, False])
+def test_semantic_cache_matches_paraphrases_within_topic(monkeypatch, vectorized):
+    if not vectorized:
+        monkeypatch.setattr(cache_module, 'np', None)
+    elif cache_module.np is None:
+        pytest.skip('numpy is not installed')
+    answers = SemanticCache(threshold=0.85)
+    answers.put('python', 'What is a list in Python?', 'An ordered, mutable sequence.')
+
+    assert answers.get('Python', "What's a python list") == 'An ordered, mutable sequence.'
+    assert answers.get('python', 'What is a dict?') is None
+    assert answers.get('python', 'What is not a list?') is None
+    assert answers.get('java', 'What is a list in Python?') is None
+    assert answers.stats()['hit_rate'] == 0.25
+
+
+@pytest.mark.parametrize('vectorized', [True, False])
+def test_semantic_cache_keeps_negated_questions_apart(monkeypatch, vectorized):
+    if not vectorized:
+        monkeypatch.setattr(cache_module, 'np', None)
+    elif cache_module.np is None:
+        pytest.skip('numpy is not installed')
+    answers = SemanticCache(threshold=0.85)
+    answers.put('python', 'When should I use a list?', 'When order matters.')
+    answers.put('python', "When shouldn't I use a tuple?", 'When you need to change it.')
+
+    assert answers.get('python', 'When should I not use a list?') is None
+    assert answers.get('python', 'When should I use a tuple?') is None
+    assert answers.get('python', 'When should I not use tuples?') == 'When you need to change it.'
+    assert answers.get('python', 'When would I use lists?') == 'When order matters.'
+
+
+def test_semantic_cache_caps_entries_and_topics(monkeypatch):
+    answers = SemanticCache(max_entries=2, max_topics=2, ttl=10)
+    for question in ('lists', 'tuples', 'sets'):
+        answers.put('python', f'What are {question}?', question)
+    answers.put('java', 'What are classes?', 'classes')
+    answers.put('rust', 'What is ownership?', 'ownership')
+
+    assert answers.get('python', 'What are lists?') is None
+    assert answers.get('rust', 'What is ownership?') == 'ownership'
+    assert answers.evictions == 3
+
+    now = cache_module.time.monotonic()
+    monkeypatch.setattr('cache.time.monotonic', lambda: now + 11)
+    assert answers.get('rust', 'What is ownership?') is None
+
+
+def test_ask_ai_reuses_answers_for_rephrased_questions(study_buddy, gemini, monkeypatch, tmp_path):
+    monkeypatch.setattr(study_buddy.db, 'db_path', str(tmp_path / 'semantic.db'))
+    study_buddy.db.init_db()
+    gemini.return_value = 'A list is an ordered collection.'
+    monkeypatch.setattr(study_buddy, 'answers', SemanticCache())
+    metrics.reset()
+
+    assert study_buddy.ask_ai('learner', 'global-chat', 'what is a list in python?') == 'A list is an ordered collection.'
+    assert study_buddy.ask_ai('other', 'global-chat', "What's a Python list") == 'A list is an ordered collection.'
+
+    assert gemini.call_count == 1
+    assert metrics.value('llm_semantic_cache_total', outcome='hit') == 1
+    assert metrics.value('llm_semantic_cache_total', outcome='miss') == 1
@@ -0,0 +1,71 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from cache import ResponseCache
+from config import Config
+from providers import GeminiProvider
+
+FAKE_QUESTION = {
+    'id': 'q1', 'question': 'Fake?', 'options': ['a', 'b', 'c', 'd'], 'correct_answer': 'a',
+    'explanation': 'Because', 'topic': 'python', 'difficulty': 'easy'
+}
+
+class CountingFakeModel:
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return SimpleNamespace(text=json.dumps([FAKE_QUESTION]))
+
+
+def run_load(app, monkeypatch, limit, requests=16, delay=0.1):
+    model = CountingFakeModel(delay)
+    study_buddy = app.extensions['study_buddy']
+    monkeypatch.setattr(study_buddy, 'has_gemini', True)
+    monkeypatch.setattr(study_buddy, 'provider', GeminiProvider(model))
+    monkeypatch.setattr(study_buddy, 'cache', ResponseCache())
+    monkeypatch.setattr(study_buddy, 'model_slots', threading.BoundedSemaphore(limit))
+
+    def fetch(i):
+        # Distinct request sizes so identical-request coalescing does not kick in
+        with app.test_client() as client:
+            return client.get(f'/api/quiz/generate?topic=python&difficulty=easy&numQuestions={i + 1}').json
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=requests) as pool:
+        results = list(pool.map(fetch, range(requests)))
+    return model, results, time.perf_counter() - start
+
+
+def test_model_calls_never_exceed_limit(app, monkeypatch):
+    model, results, _ = run_load(app, monkeypatch, limit=4)
+
+    assert all(result == [FAKE_QUESTION] for result in results)
+    assert model.peak == 4
+
+
+def test_throughput_scales_with_concurrency_limit(app, monkeypatch):
+    _, _, serial = run_load(app, monkeypatch, limit=1)
+    _, _, concurrent = run_load(app, monkeypatch, limit=Config.LLM_MAX_CONCURRENCY)
+
+    assert concurrent * 3 < serial
+
+
+def test_calls_fall_back_when_no_slot_frees_up(app, study_buddy, monkeypatch):
+    monkeypatch.setattr(Config, 'LLM_QUEUE_TIMEOUT', 0.01)
+    _, results, _ = run_load(app, monkeypatch, limit=1, requests=4, delay=0.2)
+
+    fallback_ids = {q['id'] for q in study_buddy.quiz_bank.questions('python', 'easy')}
+    assert any(result[0]['id'] in fallback_ids for result in results)
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pytest
+
+from config import Config
+from conversation import ConversationMemory, estimate_tokens
+from database import Database
+from models import StudySession
+from providers import FakeProvider
+from services import AIStudyBuddyBackend
+
+
+class RecordingProvider(FakeProvider):
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def generate(self, prompt, timeout=None):
+        self.prompts.append(prompt)
+        return super().generate(prompt, timeout)
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'DB_PATH', str(tmp_path / 'conversation.db'))
+    database = Database()
+    yield database
+    database.close()
+
+
+def test_context_stays_within_budget_as_session_grows(database):
+    summarized = []
+
+    def summarize(summary, turns):
+        summarized.append(len(turns))
+        return summary + ' ' + ' '.join(turn['content'][:20] for turn in turns)
+
+    memory = ConversationMemory(database, context_tokens=200, recent_tokens=120, summary_tokens=60,
+                                summarize=summarize)
+    for i in range(100):
+        memory.record('s1', f'Question {i} about lists?', f'Answer {i}: ' + 'lists hold items. ' * 5)
+        memory.compact('s1')
+
+    context = memory.context('s1')
+    assert estimate_tokens(context) <= 200
+    assert 'Summary of the earlier conversation' in context
+    assert 'Question 99 about lists?' in context
+    # Each compaction only folds the overflow, never the whole history
+    assert max(summarized) <= 6
+
+
+def test_stale_compaction_does_not_overwrite_summary(database):
+    assert database.save_conversation_summary('s1', 'first', 4, 0)
+    assert not database.save_conversation_summary('s1', 'stale', 6, 0)
+    assert database.get_conversation('s1')[:2] == ('first', 4)
+
+
+def test_follow_up_questions_see_earlier_turns(database, monkeypatch):
+    monkeypatch.setattr(Config, 'LLM_PROVIDER', 'none')
+    backend = AIStudyBuddyBackend(database)
+    backend.provider, backend.has_gemini = RecordingProvider(), True
+    database.save_study_session(StudySession(
+        id='s1', user_id='user-1', topic='python', duration=0, materials_covered=[],
+        questions_asked=0, confidence_level=0, start_time=datetime.now().isoformat(), end_time=None
+    ))
+
+    backend.ask_ai('user-1', 's1', 'What is a list?')
+    backend.ask_ai('user-1', 's1', 'How do I sort it?')
+    backend.ask_ai('user-2', 's1', 'Can I see their chat?')
+
+    first, follow_up, other_user = backend.provider.prompts
+    assert 'Recent conversation' not in first
+    assert 'Student: What is a list?' in follow_up
+    assert 'What is a list?' not in other_user
@@ -0,0 +1,112 @@
+import threading
+
+import pytest
+
+from config import Config
+from database import Database, SCHEMA_VERSION
+from models import StudySession
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'DB_PATH', str(tmp_path / 'pool.db'))
+    database = Database()
+    yield database
+    database.close()
+
+
+def make_session(session_id, user_id='user-1'):
+    return StudySession(
+        id=session_id, user_id=user_id, topic='python', duration=0, materials_covered=[],
+        questions_asked=0, confidence_level=0, start_time='2024-01-01T10:00:00', end_time=''
+    )
+
+
+def test_connections_are_reused(database):
+    with database.connection() as first:
+        pass
+    with database.connection() as second:
+        pass
+    assert first is second
+
+
+def test_wal_mode_and_synchronous_normal(database):
+    with database.connection() as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1
+
+
+def test_failed_transaction_is_rolled_back(database):
+    with pytest.raises(RuntimeError):
+        with database.connection() as conn:
+            conn.execute("INSERT INTO users (id, email, password_hash, name) VALUES ('u', 'e', 'p', 'n')")
+            raise RuntimeError('boom')
+    assert database.get_user_by_id('u') is None
+
+
+def test_concurrent_writers_share_bounded_pool(database):
+    def worker(index):
+        for i in range(20):
+            database.save_study_session(make_session(f'{index}-{i}'))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(Config.DB_POOL_SIZE * 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(database.get_study_sessions('user-1')) == Config.DB_POOL_SIZE * 2 * 20
+    assert database.pool._idle.qsize() <= Config.DB_POOL_SIZE
+
+
+def test_connect_per_call_when_pool_disabled(database, monkeypatch):
+    monkeypatch.setattr(Config, 'DB_POOL_SIZE', 0)
+    database.db_path = database.db_path
+    with database.connection() as first:
+        pass
+    with database.connection() as second:
+        pass
+    assert first is not second
+
+
+def test_increment_questions_and_get_topic(database):
+    database.save_study_session(make_session('s1'))
+
+    assert database.increment_questions_and_get_topic('s1', 'user-1') == 'python'
+    assert database.increment_questions_and_get_topic('s1', 'user-1') == 'python'
+    assert database.get_study_session('s1').questions_asked == 2
+
+
+def test_increment_questions_ignores_other_users_sessions(database):
+    database.save_study_session(make_session('s1'))
+
+    assert database.increment_questions_and_get_topic('s1', 'someone-else') is None
+    assert database.increment_questions_and_get_topic('missing', 'user-1') is None
+    assert database.get_study_session('s1').questions_asked == 0
+
+
+def test_migrations_record_schema_version_once(database):
+    database.init_db()
+    with database.connection() as conn:
+        versions = [row[0] for row in conn.execute('SELECT version FROM schema_version')]
+    assert versions == list(range(1, SCHEMA_VERSION + 1))
+
+
+def test_current_schema_skips_ddl(database, monkeypatch):
+    def fail(conn):
+        raise AssertionError("DDL ran on an up-to-date database")
+
+    monkeypatch.setattr(database, '_create_tables', fail)
+    database.init_db()
+
+
+@pytest.mark.parametrize('query, index', [
+    ('SELECT * FROM study_sessions WHERE user_id = ?', 'idx_study_sessions_user_start'),
+    ('SELECT * FROM study_plans WHERE user_id = ?', 'idx_study_plans_user_created'),
+    ('SELECT * FROM quiz_progress WHERE user_id = ? AND next_review <= ?', 'idx_quiz_progress_user_next_review'),
+])
+def test_per_user_queries_use_indexes(database, query, index):
+    params = ('user-1',) * query.count('?')
+    with database.connection() as conn:
+        plan = ' '.join(row[-1] for row in conn.execute(f'EXPLAIN QUERY PLAN {query}', params))
+    assert index in plan
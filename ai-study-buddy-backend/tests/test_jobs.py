@@ -0,0 +1,113 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from config import Config
+from jobs import JobQueue
+
+
+@pytest.fixture
+def client(client, study_buddy, monkeypatch):
+    monkeypatch.setattr(study_buddy, 'has_gemini', False)
+    # No worker threads; tests drain the queue with run_pending()
+    monkeypatch.setattr(study_buddy, 'jobs', JobQueue(study_buddy.db, study_buddy._job_handlers(), workers=0,
+                                                      validators=study_buddy._job_validators()))
+    return client
+
+
+def test_async_study_plan_is_accepted_then_polled(client, study_buddy):
+    headers = {'User-ID': 'learner'}
+    response = client.post('/api/study-plans?async=1', json={'topic': 'python', 'target_days': 14}, headers=headers)
+    assert response.status_code == 202
+    status_url = response.headers['Location']
+    assert client.get(status_url, headers=headers).json['status'] == 'queued'
+
+    assert study_buddy.jobs.run_pending() == 1
+
+    job = client.get(status_url, headers=headers).json
+    assert job['status'] == 'succeeded'
+    assert job['result']['topic'] == 'python'
+    assert client.get(status_url, headers={'User-ID': 'someone-else'}).status_code == 404
+
+
+def test_idempotency_key_collapses_duplicates(client, study_buddy):
+    headers = {'User-ID': 'learner', 'Idempotency-Key': 'pack-1'}
+    body = {'kind': 'flashcards', 'params': {'topic': 'chemistry'}}
+    first = client.post('/api/jobs', json=body, headers=headers)
+    second = client.post('/api/jobs', json=body, headers=headers)
+
+    assert (first.status_code, second.status_code) == (202, 200)
+    assert first.json['job_id'] == second.json['job_id']
+    assert study_buddy.jobs.run_pending() == 1
+
+
+def test_unknown_kind_is_rejected(client):
+    assert client.post('/api/jobs', json={'kind': 'essay'}).status_code == 400
+
+
+@pytest.mark.parametrize('kind, params', [
+    ('flashcards', {}),
+    ('flashcards', {'topic': 'chemistry', 'count': 'many'}),
+    ('quiz', {'topic': 'python', 'num_questions': 0}),
+    ('quiz', {'topic': 'python', 'exclude_ids': 'q1'}),
+    ('quiz', {'topic': ['x']}),
+    ('quiz', {'topic': 'python', 'difficulty': ''}),
+    ('study_plan', {'topic': {'name': 'python'}, 'target_days': 14}),
+    ('study_plan', {'topic': 'python'}),
+    ('study_plan', {'topic': 'python', 'target_days': 'soon'}),
+])
+def test_invalid_params_are_rejected_at_submit(client, study_buddy, kind, params):
+    response = client.post('/api/jobs', json={'kind': kind, 'params': params})
+    assert response.status_code == 400
+    assert study_buddy.jobs.run_pending() == 0
+
+
+def test_submitted_params_are_coerced(client, study_buddy):
+    job, _ = study_buddy.jobs.submit('learner', 'quiz', {'topic': 'python', 'num_questions': '2'})
+    assert job['params']['num_questions'] == 2
+    study_buddy.jobs.run_pending()
+    assert len(study_buddy.jobs.get(job['id'], 'learner')['result']) == 2
+
+
+def test_job_with_lapsed_lease_is_recovered(client, db, study_buddy, monkeypatch):
+    job, _ = study_buddy.jobs.submit('learner', 'quiz', {'topic': 'python'})
+    # A worker claims the job and the process dies before finishing it
+    assert db.claim_job(time.time() - 600, 60, Config.JOB_MAX_ATTEMPTS, 'then')['id'] == job['id']
+
+    assert study_buddy.jobs.run_pending() == 1
+    recovered = study_buddy.jobs.get(job['id'], 'learner')
+    assert recovered['status'] == 'succeeded' and recovered['attempts'] == 2
+
+
+def test_transient_failure_is_retried_then_marked_failed(client, study_buddy, monkeypatch):
+    monkeypatch.setattr(Config, 'JOB_MAX_ATTEMPTS', 2)
+    handler = MagicMock(side_effect=TimeoutError('model timed out'))
+    queue = JobQueue(study_buddy.db, {'quiz': handler}, workers=0)
+    job, _ = queue.submit('learner', 'quiz', {})
+
+    assert queue.run_pending() == 2
+    failed = queue.get(job['id'], 'learner')
+    assert failed['status'] == 'failed' and failed['error'] == 'model timed out'
+
+
+def test_permanent_failure_is_not_retried(client, study_buddy):
+    handler = MagicMock(side_effect=KeyError('topic'))
+    queue = JobQueue(study_buddy.db, {'quiz': handler}, workers=0)
+    job, _ = queue.submit('learner', 'quiz', {})
+
+    assert queue.run_pending() == 1
+    failed = queue.get(job['id'], 'learner')
+    assert failed['status'] == 'failed' and failed['attempts'] == 1
+
+
+def test_worker_threads_run_submitted_jobs(client, study_buddy):
+    queue = JobQueue(study_buddy.db, study_buddy._job_handlers(), workers=1)
+    try:
+        job, _ = queue.submit('learner', 'flashcards', {'topic': 'biology', 'count': 3})
+        deadline = time.monotonic() + 5
+        while queue.get(job['id'], 'learner')['status'] != 'succeeded' and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert queue.get(job['id'], 'learner')['result'][0]['front'] == 'What is biology?'
+    finally:
+        queue.stop()
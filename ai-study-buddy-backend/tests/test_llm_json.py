@@ -0,0 +1,52 @@
+import llm_json
+from metrics import metrics
+
+CARD = '{"front": "Term", "back": "Definition"}'
+
+
+def parse_cards(text):
+    return llm_json.parse_list(text, llm_json.flashcard, 'test')
+
+
+def test_tolerates_fences_and_surrounding_prose():
+    text = f'Sure! Here are your [2] cards:\n```json\n[{CARD}, {CARD}]\n```\nGood luck with [studying].'
+    assert parse_cards(text) == [{'front': 'Term', 'back': 'Definition'}] * 2
+
+
+def test_salvages_complete_elements_of_truncated_array():
+    metrics.reset()
+    text = f'[{CARD}, {CARD}, {{"front": "Cut'
+    assert len(parse_cards(text)) == 2
+    assert metrics.value('llm_parse_total', caller='test', outcome='salvaged') == 1
+
+
+def test_unwraps_single_list_object():
+    assert parse_cards(f'{{"flashcards": [{CARD}]}}') == [{'front': 'Term', 'back': 'Definition'}]
+
+
+def test_drops_elements_failing_schema():
+    metrics.reset()
+    text = '''[
+        {"question": "Q1", "options": ["a", "b"], "correct_answer": "a"},
+        {"question": "Q2", "options": ["a", "b"], "correct_answer": "z"},
+        {"week": 1}
+    ]'''
+    questions = llm_json.parse_list(text, lambda q: llm_json.quiz_question(q, 'python', 'easy'), 'test')
+
+    assert [q['question'] for q in questions] == ['Q1']
+    assert questions[0]['topic'] == 'python' and questions[0]['id']
+    assert metrics.value('llm_parse_dropped_items_total', caller='test') == 2
+
+
+def test_failure_is_counted():
+    metrics.reset()
+    assert parse_cards('I cannot help with that.') is None
+    assert parse_cards('[{"front": 1}]') is None
+    assert metrics.value('llm_parse_total', caller='test', outcome='failed') == 2
+
+
+def test_weekly_goals_and_resources():
+    goals = llm_json.parse_list('[{"week": 1, "theme": "Basics", "goals": ["Syntax"]}, {"week": "2"}]',
+                                llm_json.weekly_goal, 'test')
+    assert goals == [{'week': 1, 'theme': 'Basics', 'goals': ['Syntax']}]
+    assert llm_json.parse_list('["Docs", "", 3]', llm_json.resource, 'test') == ['Docs']
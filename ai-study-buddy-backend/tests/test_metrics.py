@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+import metrics as metrics_module
+from metrics import Metrics, instrument_database, metrics
+from providers import GeminiProvider
+
+
+@pytest.fixture
+def client(client):
+    metrics.reset()
+    return client
+
+
+def test_routes_and_database_calls_are_counted(client):
+    headers = {'User-ID': 'learner'}
+    client.post('/api/sessions', json={'topic': 'python'}, headers=headers)
+    client.get('/api/sessions', headers=headers)
+
+    assert metrics.count('http_request_duration_seconds', method='GET', route='/api/sessions', status=200) == 1
+    assert metrics.count('db_query_duration_seconds', method='save_study_session') == 1
+    assert metrics.value('db_rows_total', method='get_study_sessions') == 1
+
+    body = client.get('/api/metrics').get_data(as_text=True)
+    assert '# TYPE http_request_duration_seconds histogram' in body
+    assert 'db_query_duration_seconds_count{method="get_study_sessions"} 1' in body
+
+
+def test_model_calls_are_counted_by_caller(client, study_buddy, monkeypatch):
+    usage = SimpleNamespace(prompt_token_count=12, candidates_token_count=30)
+    model = MagicMock()
+    model.generate_content.side_effect = [SimpleNamespace(text='answer', usage_metadata=usage), RuntimeError('boom')]
+    monkeypatch.setattr(study_buddy, 'has_gemini', True)
+    monkeypatch.setattr(study_buddy, 'provider', GeminiProvider(model))
+
+    assert study_buddy.ask_ai('learner', 'missing', 'What is a list?') == 'answer'
+    study_buddy.ask_ai('learner', 'missing', 'What is a dict?')
+
+    assert metrics.value('llm_requests_total', caller='ask_ai', outcome='ok') == 1
+    assert metrics.value('llm_requests_total', caller='ask_ai', outcome='error') == 1
+    assert metrics.value('llm_tokens_total', caller='ask_ai', kind='completion') == 30
+    assert metrics.count('llm_request_duration_seconds', caller='ask_ai') == 2
+
+
+def test_disabled_metrics_leave_classes_untouched(monkeypatch):
+    monkeypatch.setattr(metrics_module, 'metrics', Metrics(enabled=False))
+
+    class Store:
+        def fetch(self):
+            return [1, 2]
+
+    original = Store.fetch
+    assert instrument_database(Store).fetch is original
+
+
+def test_render_escapes_label_values():
+    registry = Metrics()
+    registry.inc('llm_requests_total', caller='say "hi"\n', outcome='ok')
+    assert 'llm_requests_total{caller="say \\"hi\\"\\n",outcome="ok"} 1' in registry.render()
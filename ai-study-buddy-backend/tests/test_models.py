@@ -0,0 +1,40 @@
+import json
+from dataclasses import asdict
+
+import pytest
+from flask import Flask
+
+import json_provider
+from json_provider import FastJSONProvider
+from models import QuizQuestion, StudyPlan, StudySession, UserProfile
+
+SAMPLES = [
+    StudySession('s1', 'u1', 'python', 30, ['notes'], 2, 7, '2024-01-01T10:00:00', '2024-01-01T10:30:00'),
+    UserProfile('visual', ['python'], 'beginner', ['pass exam'], 'Learner'),
+    QuizQuestion('q1', 'What?', ['a', 'b'], 'a', 'Because', 'python', 'easy'),
+    StudyPlan('p1', 'u1', 'python', 20, 1.5, [{'week': 1, 'goals': ['basics']}], ['docs'], ['week 1'],
+              '2024-02-01T00:00:00', '2024-01-01T00:00:00'),
+]
+
+
+@pytest.mark.parametrize('model', SAMPLES, ids=lambda m: type(m).__name__)
+def test_to_json_dict_matches_asdict(model):
+    assert model.to_json_dict() == asdict(model)
+    assert not hasattr(model, '__dict__')
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_provider_output_matches_stdlib(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(json_provider, 'orjson', None)
+    elif json_provider.orjson is None:
+        pytest.skip('orjson not installed')
+
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    payload = {'items': SAMPLES, 'next_cursor': None}
+    with app.app_context():
+        body = app.json.response(payload).get_data()
+
+    assert body.endswith(b'\n')
+    assert json.loads(body) == {'items': [asdict(m) for m in SAMPLES], 'next_cursor': None}
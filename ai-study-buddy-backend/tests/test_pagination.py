@@ -0,0 +1,58 @@
+import base64
+import json
+
+import pytest
+
+from models import StudyPlan, StudySession
+
+HEADERS = {'User-ID': 'pager'}
+
+
+@pytest.fixture
+def client(client, db):
+    # Duplicate timestamps make the id tie-breaker matter
+    for i in range(25):
+        db.save_study_session(StudySession(
+            id=f's{i:02d}', user_id='pager', topic='python', duration=i, materials_covered=['notes'],
+            questions_asked=0, confidence_level=0, start_time=f'2024-01-{i // 2 + 1:02d}T10:00:00', end_time=''
+        ))
+        db.save_study_plan(StudyPlan(
+            id=f'p{i:02d}', user_id='pager', topic='python', total_hours=1, daily_hours=1.0,
+            weekly_goals=[{'week': 1}], resources=['docs'], assessment_schedule=[], deadline='',
+            created_at=f'2024-02-{i // 3 + 1:02d}T10:00:00'
+        ))
+    return client
+
+
+def walk(client, url):
+    ids, cursor = [], ''
+    while cursor is not None:
+        page = client.get(f'{url}&cursor={cursor}', headers=HEADERS).json
+        ids.extend(item['id'] for item in page['items'])
+        cursor = page['next_cursor']
+    return ids
+
+
+@pytest.mark.parametrize('url, prefix', [('/api/sessions?limit=7', 's'), ('/api/study-plans?limit=7', 'p')])
+def test_cursor_walk_returns_every_row_once_newest_first(client, url, prefix):
+    ids = walk(client, url)
+    assert ids == [f'{prefix}{i:02d}' for i in reversed(range(25))]
+
+
+def test_fields_projection_skips_json_blobs(client):
+    page = client.get('/api/study-plans?limit=2&fields=id,topic', headers=HEADERS).json
+    assert page['items'] == [{'id': 'p24', 'topic': 'python'}, {'id': 'p23', 'topic': 'python'}]
+
+
+def test_legacy_listing_is_unchanged(client):
+    response = client.get('/api/sessions', headers=HEADERS)
+    assert isinstance(response.json, list)
+    assert len(response.json) == 25
+
+
+def test_bad_parameters_are_rejected(client):
+    assert client.get('/api/sessions?limit=5&fields=password', headers=HEADERS).status_code == 400
+    assert client.get('/api/sessions?cursor=not-a-cursor', headers=HEADERS).status_code == 400
+    for key in ([{'a': 1}, 'id'], [['x'], ['y']], ['2024-01-01', 'id', 'extra']):
+        cursor = base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+        assert client.get(f'/api/study-plans?cursor={cursor}', headers=HEADERS).status_code == 400
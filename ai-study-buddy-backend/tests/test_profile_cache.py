@@ -0,0 +1,65 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from cache import ProfileCache
+
+
+@pytest.fixture
+def client(client, db, study_buddy, monkeypatch):
+    monkeypatch.setattr(study_buddy, 'profiles', ProfileCache(10, 300))
+    db.create_user({'id': 'learner', 'email': 'l@example.com', 'password': 'x', 'name': 'Learner'})
+    return client
+
+
+def test_repeated_reads_hit_the_cache(client, study_buddy, monkeypatch):
+    headers = {'User-ID': 'learner'}
+    assert client.get('/api/user/profile', headers=headers).json['name'] == 'Learner'
+
+    lookup = MagicMock(side_effect=AssertionError('database read on cache hit'))
+    monkeypatch.setattr(study_buddy.db, 'get_user_by_id', lookup)
+    assert client.get('/api/user/profile', headers=headers).json['name'] == 'Learner'
+
+    stats = client.get('/api/cache/stats').json['profiles']
+    assert stats['hits'] == 1 and stats['misses'] == 1
+
+
+def test_update_writes_through(client, db):
+    headers = {'User-ID': 'learner'}
+    client.get('/api/user/profile', headers=headers)
+    updated = client.put('/api/user/profile', json={'difficulty_level': 'advanced'}, headers=headers).json
+
+    assert updated['difficulty_level'] == 'advanced'
+    assert updated['learning_style'] == 'visual'
+    assert client.get('/api/user/profile', headers=headers).json['difficulty_level'] == 'advanced'
+    assert db.get_user_version('learner') == 1
+
+
+def test_update_of_unknown_user(client):
+    assert client.put('/api/user/profile', json={'difficulty_level': 'advanced'},
+                      headers={'User-ID': 'ghost'}).status_code == 404
+
+
+def test_validated_cache_sees_writes_from_other_processes(client, db, study_buddy, monkeypatch):
+    monkeypatch.setattr(study_buddy, 'profiles', ProfileCache(10, 300, db.get_user_version))
+    assert study_buddy.get_user_profile('learner').learning_style == 'visual'
+
+    # Simulates another worker updating the row behind this process's cache
+    db.update_user_profile('learner', {'learning_style': 'auditory'})
+
+    assert study_buddy.get_user_profile('learner').learning_style == 'auditory'
+    assert study_buddy.profiles.invalidations == 1
+
+
+def test_profile_cache_evicts_and_expires(monkeypatch):
+    cache = ProfileCache(max_entries=2, ttl=10)
+    monkeypatch.setattr('cache.time.monotonic', lambda: 100.0)
+    cache.put('a', 'A')
+    cache.put('b', 'B')
+    cache.get('a')
+    cache.put('c', 'C')
+    assert cache.get('b') is None
+    assert cache.evictions == 1
+
+    monkeypatch.setattr('cache.time.monotonic', lambda: 111.0)
+    assert cache.get('a') is None
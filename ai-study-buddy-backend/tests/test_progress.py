@@ -0,0 +1,49 @@
+def rescan(db, user_id):
+    sessions = db.get_study_sessions(user_id)
+    distribution = {}
+    for session in sessions:
+        distribution[session.topic] = distribution.get(session.topic, 0) + session.duration
+    return {
+        'total_study_time': sum(s.duration for s in sessions),
+        'sessions_completed': len(sessions),
+        'questions_asked': sum(s.questions_asked for s in sessions),
+        'average_confidence': round(sum(s.confidence_level for s in sessions) / len(sessions), 1) if sessions else 0,
+        'topic_distribution': distribution
+    }
+
+
+def test_progress_tracks_session_lifecycle(client, db):
+    headers = {'User-ID': 'learner'}
+    for topic in ('python', 'python', 'java'):
+        session_id = client.post('/api/sessions', json={'topic': topic}, headers=headers).json['id']
+        client.post(f'/api/sessions/{session_id}/question', json={}, headers=headers)
+        session = db.get_study_session(session_id)
+        session.start_time = '2024-01-01T10:00:00'
+        db.save_study_session(session)
+        client.put(f'/api/sessions/{session_id}/end', json={'confidenceLevel': 7}, headers=headers)
+
+    progress = client.get('/api/progress', headers=headers).json
+    assert progress == rescan(db, 'learner')
+    assert progress['sessions_completed'] == 3
+    assert progress['questions_asked'] == 3
+    assert progress['average_confidence'] == 7
+    assert set(progress['topic_distribution']) == {'python', 'java'}
+
+
+def test_progress_for_new_user_is_empty(client):
+    progress = client.get('/api/progress', headers={'User-ID': 'nobody'}).json
+    assert progress == {'total_study_time': 0, 'sessions_completed': 0, 'questions_asked': 0,
+                        'average_confidence': 0, 'topic_distribution': {}}
+
+
+def test_rebuild_command_backfills_aggregates(client, app, db):
+    headers = {'User-ID': 'learner'}
+    client.post('/api/sessions', json={'topic': 'python'}, headers=headers)
+    with db.connection() as conn:
+        conn.execute('DELETE FROM user_progress')
+        conn.execute('DELETE FROM user_topic_progress')
+
+    result = app.test_cli_runner().invoke(args=['rebuild-progress'])
+
+    assert 'rebuilt' in result.output
+    assert client.get('/api/progress', headers=headers).json == rescan(db, 'learner')
@@ -0,0 +1,94 @@
+import json
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+from cache import ResponseCache
+from config import Config
+from providers import FakeProvider, FakeProviderError, GeminiProvider, ModelProvider, create_provider
+from services import AIStudyBuddyBackend
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'DB_PATH', str(tmp_path / 'providers.db'))
+    monkeypatch.setattr(Config, 'LLM_PROVIDER', 'fake')
+    monkeypatch.setattr(Config, 'FAKE_MODEL_LATENCY', 0)
+    monkeypatch.setattr(Config, 'FAKE_MODEL_FAILURE_RATE', 0)
+    backend = AIStudyBuddyBackend()
+    backend.cache = ResponseCache()
+    yield backend
+    backend.db.close()
+
+
+def test_fake_output_depends_only_on_prompt():
+    prompt = 'Generate 3 easy level quiz questions about python.'
+    first, second = FakeProvider(seed=1), FakeProvider(seed=2)
+    assert first.generate(prompt).text == second.generate(prompt).text
+    assert first.generate(prompt).text != first.generate(prompt.replace('python', 'java')).text
+    assert len(json.loads(first.generate(prompt).text)) == 3
+
+
+def test_fake_failures_are_seeded():
+    def outcomes(seed):
+        provider = FakeProvider(failure_rate=0.5, seed=seed)
+        results = []
+        for _ in range(20):
+            try:
+                provider.generate('hello')
+                results.append(True)
+            except FakeProviderError:
+                results.append(False)
+        return results
+
+    assert outcomes(7) == outcomes(7)
+    assert True in outcomes(7) and False in outcomes(7)
+
+
+def test_fake_stream_reassembles_to_full_answer():
+    provider = FakeProvider()
+    prompt = 'The student asks: what is a list?'
+    chunks = list(provider.stream(prompt))
+    assert ''.join(chunk.text for chunk in chunks) == provider.generate(prompt).text
+    assert chunks[-1].completion_tokens == len(provider.generate(prompt).text.split())
+
+
+def test_providers_must_implement_generate():
+    class Incomplete(ModelProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_create_provider_follows_config(monkeypatch):
+    monkeypatch.setattr(Config, 'LLM_PROVIDER', 'fake')
+    assert isinstance(create_provider(), FakeProvider)
+    monkeypatch.setattr(Config, 'LLM_PROVIDER', 'none')
+    assert create_provider() is None
+
+
+def test_gemini_sdk_is_loaded_on_first_call(monkeypatch):
+    genai = MagicMock()
+    monkeypatch.setitem(sys.modules, 'google.generativeai', genai)
+    provider = GeminiProvider(api_key='key', model_name='gemini-test')
+    genai.configure.assert_not_called()
+
+    provider.generate('hello')
+    genai.configure.assert_called_once_with(api_key='key')
+    genai.GenerativeModel.assert_called_once_with('gemini-test')
+
+
+def test_backend_runs_end_to_end_on_fake_provider(backend):
+    assert backend.has_gemini and backend.provider.name == 'fake'
+
+    questions = backend.generate_quiz('python', 'easy', 2)
+    assert len(questions) == 2 and questions[0]['id'].startswith('fake-')
+
+    batches = backend.generate_flashcards_batch([{'topic': 'python', 'count': 2}, {'topic': 'java', 'count': 3}])
+    assert [len(cards) for cards in batches] == [2, 3]
+
+    plan = backend.create_study_plan('user-1', {'topic': 'python', 'target_days': 14, 'daily_hours': 1})
+    assert [goal['week'] for goal in plan.weekly_goals] == [1, 2]
+    assert len(plan.resources) == 3
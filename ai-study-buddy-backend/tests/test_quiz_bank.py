@@ -0,0 +1,56 @@
+import json
+import os
+
+import pytest
+
+from config import Config
+from quiz_bank import QuizBank
+
+
+def question(question_id, topic='python', difficulty='easy'):
+    return {
+        'id': question_id, 'question': f'{question_id}?', 'options': ['a', 'b'], 'correct_answer': 'a',
+        'explanation': 'Because.', 'topic': topic, 'difficulty': difficulty
+    }
+
+
+@pytest.fixture
+def bank_file(tmp_path):
+    path = tmp_path / 'bank.json'
+    path.write_text(json.dumps({'python': {'easy': [question(f'q{i}') for i in range(5)]}}))
+    return path
+
+
+def test_default_bank_covers_topics_and_difficulties():
+    bank = QuizBank(Config.QUIZ_BANK_PATH)
+    assert len(bank.questions('python', 'easy')) == 2
+    assert bank.questions('python', 'hard')[0]['id'] == 'py_hard_1'
+    assert bank.questions('unknown', 'easy') == []
+
+
+def test_sample_has_no_repeats_and_honours_exclusions(bank_file):
+    bank = QuizBank(str(bank_file))
+
+    sample = bank.sample('python', 'easy', 10, exclude_ids=['q0', 'q1'])
+    ids = [q['id'] for q in sample]
+    assert sorted(ids) == ['q2', 'q3', 'q4']
+
+    sample[0]['question'] = 'mutated'
+    assert all(q['question'] != 'mutated' for q in bank.questions('python', 'easy'))
+
+
+def test_bank_hot_reloads_changed_file(bank_file):
+    bank = QuizBank(str(bank_file), reload_interval=0)
+    bank_file.write_text(json.dumps({'java': {'easy': [question('j1', 'java')]}}))
+    os.utime(bank_file, ns=(0, 10 ** 18))
+
+    assert bank.questions('java', 'easy')[0]['id'] == 'j1'
+    assert bank.questions('python', 'easy') == []
+
+
+def test_broken_file_keeps_previous_bank(bank_file):
+    bank = QuizBank(str(bank_file), reload_interval=0)
+    bank_file.write_text('{not json')
+    os.utime(bank_file, ns=(0, 10 ** 18))
+
+    assert len(bank.questions('python', 'easy')) == 5
@@ -0,0 +1,208 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from config import Config
+from metrics import metrics
+from providers import GeminiProvider
+from resilience import CircuitBreaker, CircuitOpenError, ResilientCaller
+
+
+class ServiceUnavailable(Exception):
+    pass
+
+
+class FlakyFakeModel:
+    """Plays back a script of steps: an exception to raise, or seconds to sleep before answering."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+        self.timeouts = []
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, request_options=None):
+        with self._lock:
+            step = self.script[self.calls] if self.calls < len(self.script) else 0
+            self.calls += 1
+            self.timeouts.append(request_options['timeout'])
+        if isinstance(step, Exception):
+            raise step
+        time.sleep(step)
+        return SimpleNamespace(text=f'answer after {step}s')
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+
+
+def caller(**kwargs):
+    options = dict(deadline=2, retries=2, backoff=0.01)
+    options.update(kwargs)
+    breaker = options.pop('breaker', CircuitBreaker(threshold=0.5, window=4, min_calls=4, cooldown=60))
+    return ResilientCaller(breaker, **options)
+
+
+def call(resilient, model):
+    return resilient.call(lambda timeout: model.generate_content('prompt', request_options={'timeout': timeout}))
+
+
+def test_transient_errors_are_retried():
+    model = FlakyFakeModel(ServiceUnavailable('503'), ServiceUnavailable('503'), 0)
+    assert call(caller(), model).text == 'answer after 0s'
+    assert model.calls == 3
+    assert metrics.value('llm_resilience_events_total', event='retry') == 2
+
+
+def test_permanent_errors_are_not_retried():
+    model = FlakyFakeModel(ValueError('prompt blocked'))
+    with pytest.raises(ValueError):
+        call(caller(), model)
+    assert model.calls == 1
+
+
+def test_deadline_bounds_a_hung_call():
+    model = FlakyFakeModel(5)
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        call(caller(deadline=0.2, retries=0), model)
+    assert time.monotonic() - started < 1
+    assert model.timeouts[0] <= 0.2
+
+
+def test_breaker_opens_then_recovers_after_cooldown():
+    breaker = CircuitBreaker(threshold=0.5, window=4, min_calls=4, cooldown=0.1)
+    resilient = caller(breaker=breaker, retries=0)
+    model = FlakyFakeModel(*[ServiceUnavailable('503')] * 4)
+    for _ in range(4):
+        with pytest.raises(ServiceUnavailable):
+            call(resilient, model)
+
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        call(resilient, model)
+    assert model.calls == 4
+
+    time.sleep(0.15)
+    assert call(resilient, model).text == 'answer after 0s'
+    assert breaker.state == 'closed'
+    assert metrics.value('llm_resilience_events_total', event='short_circuit') == 1
+
+
+def test_hedge_fires_after_latency_quantile():
+    resilient = caller(hedge_quantile=0.9, hedge_min_samples=5)
+    for _ in range(5):
+        call(resilient, FlakyFakeModel(0.01))
+
+    model = FlakyFakeModel(1.0, 0.01)
+    started = time.monotonic()
+    assert call(resilient, model).text == 'answer after 0.01s'
+    assert time.monotonic() - started < 0.5
+    assert metrics.value('llm_resilience_events_total', event='hedge_won') == 1
+
+
+def test_open_breaker_short_circuits_to_fallback(study_buddy, monkeypatch):
+    model = FlakyFakeModel()
+    breaker = CircuitBreaker(min_calls=1, window=1, cooldown=60)
+    breaker.record(False)
+    monkeypatch.setattr(study_buddy, 'has_gemini', True)
+    monkeypatch.setattr(study_buddy, 'provider', GeminiProvider(model))
+    monkeypatch.setattr(study_buddy, 'breaker', breaker)
+
+    assert study_buddy._call_gemini('prompt', 'ask_ai') is None
+    assert model.calls == 0
+    assert metrics.value('llm_requests_total', caller='ask_ai', outcome='short_circuit') == 1
+
+
+def test_slot_is_held_until_abandoned_attempt_finishes(study_buddy, monkeypatch):
+    model = FlakyFakeModel(0.3)
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(study_buddy, 'has_gemini', True)
+    monkeypatch.setattr(study_buddy, 'provider', GeminiProvider(model))
+    monkeypatch.setattr(study_buddy, 'resilient', caller(deadline=0.05, retries=0))
+    monkeypatch.setattr(study_buddy, 'model_slots', slots)
+
+    assert study_buddy._call_gemini('prompt', 'ask_ai') is None
+    # The timed-out attempt is still talking to the provider, so its slot is not free yet
+    assert not slots.acquire(blocking=False)
+    time.sleep(0.4)
+    assert slots.acquire(blocking=False)
+
+
+def test_base_exception_ends_half_open_trial():
+    class Abort(BaseException):
+        pass
+
+    breaker = CircuitBreaker(min_calls=1, window=1, cooldown=0.05)
+    breaker.record(False)
+    time.sleep(0.06)
+    resilient = caller(breaker=breaker)
+
+    def abort(timeout):
+        raise Abort()
+
+    with pytest.raises(Abort):
+        resilient.call(abort)
+    assert breaker.state == 'open'
+
+    time.sleep(0.06)
+    assert call(resilient, FlakyFakeModel()).text == 'answer after 0s'
+    assert breaker.state == 'closed'
+
+
+class StallingStreamModel:
+    """Streams ``chunks``, then stalls for ``stall`` seconds before the stream ends."""
+
+    def __init__(self, chunks, stall=0.0):
+        self.chunks = chunks
+        self.stall = stall
+        self.timeouts = []
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        self.timeouts.append(request_options['timeout'])
+        for chunk in self.chunks:
+            yield SimpleNamespace(text=chunk)
+        time.sleep(self.stall)
+
+
+def test_stalled_stream_times_out_and_keeps_slot_until_read_ends(study_buddy, monkeypatch):
+    breaker = CircuitBreaker(min_calls=1, window=1, cooldown=60)
+    slots = threading.BoundedSemaphore(1)
+    model = StallingStreamModel(['Lists ', 'hold items.'], stall=0.3)
+    monkeypatch.setattr(Config, 'LLM_STREAM_IDLE_TIMEOUT', 0.05)
+    monkeypatch.setattr(study_buddy, 'has_gemini', True)
+    monkeypatch.setattr(study_buddy, 'provider', GeminiProvider(model))
+    monkeypatch.setattr(study_buddy, 'breaker', breaker)
+    monkeypatch.setattr(study_buddy, 'resilient', caller(breaker=breaker))
+    monkeypatch.setattr(study_buddy, 'model_slots', slots)
+
+    started = time.monotonic()
+    assert list(study_buddy._call_gemini_stream('prompt', 'ask_ai_stream')) == ['Lists ', 'hold items.']
+    assert time.monotonic() - started < 0.25
+    assert model.timeouts == [Config.LLM_STREAM_DEADLINE]
+    assert breaker.state == 'open'
+    assert metrics.value('llm_requests_total', caller='ask_ai_stream', outcome='error') == 1
+
+    assert not slots.acquire(blocking=False)
+    time.sleep(0.35)
+    assert slots.acquire(blocking=False)
+
+
+def test_stream_takes_part_in_half_open_trial():
+    breaker = CircuitBreaker(min_calls=1, window=1, cooldown=0.05)
+    breaker.record(False)
+    time.sleep(0.06)
+    resilient = caller(breaker=breaker)
+    stream = lambda timeout: iter(['a', 'b', 'c'])
+
+    chunks = resilient.stream(stream, 1, 1)
+    assert next(chunks) == 'a'
+    # Only one trial at a time, and a reader that stops early still ends it
+    with pytest.raises(CircuitOpenError):
+        list(resilient.stream(stream, 1, 1))
+    chunks.close()
+    assert breaker.state == 'closed'
+    assert list(resilient.stream(stream, 1, 1)) == ['a', 'b', 'c']
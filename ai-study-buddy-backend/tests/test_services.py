@@ -0,0 +1,53 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from config import Config
+from providers import GeminiProvider
+from services import AIStudyBuddyBackend
+
+
+class SlowFakeModel:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(self.delay)
+        if 'week' in prompt:
+            return SimpleNamespace(text='[{"week": 1, "theme": "Fake", "goals": ["Fake goal"]}]')
+        return SimpleNamespace(text='["Fake resource"]')
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'DB_PATH', str(tmp_path / 'services.db'))
+    backend = AIStudyBuddyBackend()
+    backend.has_gemini = True
+    yield backend
+    backend.db.close()
+
+
+def test_study_plan_generation_steps_run_concurrently(backend):
+    backend.provider = GeminiProvider(SlowFakeModel(0.5))
+
+    start = time.perf_counter()
+    plan = backend.create_study_plan('user-1', {'topic': 'python', 'target_days': 7, 'daily_hours': 1})
+    elapsed = time.perf_counter() - start
+
+    assert plan.weekly_goals == [{'week': 1, 'theme': 'Fake', 'goals': ['Fake goal']}]
+    assert plan.resources == ['Fake resource']
+    assert elapsed < 0.9
+
+
+def test_study_plan_steps_fall_back_on_timeout(backend, monkeypatch):
+    monkeypatch.setattr(Config, 'LLM_STEP_TIMEOUT', 0.1)
+    backend.provider = GeminiProvider(SlowFakeModel(0.5))
+
+    start = time.perf_counter()
+    plan = backend.create_study_plan('user-1', {'topic': 'python', 'target_days': 7, 'daily_hours': 1})
+    elapsed = time.perf_counter() - start
+
+    assert plan.weekly_goals == backend._fallback_weekly_goals('python', 7)
+    assert plan.resources == backend._fallback_resources('python')
+    assert elapsed < 0.4
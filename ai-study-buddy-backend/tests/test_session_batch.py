@@ -0,0 +1,101 @@
+import json
+from datetime import datetime
+
+
+HEADERS = {'User-ID': 'batcher'}
+
+
+def test_batch_replays_a_whole_session(client, db):
+    existing = client.post('/api/sessions', json={'topic': 'java'}, headers=HEADERS).json['id']
+    events = [
+        {'type': 'create', 'topic': 'python', 'ref': 'local-1', 'start_time': '2024-01-01T10:00:00'},
+        {'type': 'question', 'session_id': 'local-1'},
+        {'type': 'question', 'session_id': 'local-1', 'count': 2},
+        {'type': 'end', 'session_id': 'local-1', 'confidence_level': 9, 'end_time': '2024-01-01T10:45:30'},
+        {'type': 'question', 'session_id': existing},
+        {'type': 'end', 'session_id': 'local-1'},
+        {'type': 'question', 'session_id': 'missing'},
+        {'type': 'teleport'},
+    ]
+
+    results = client.post('/api/sessions/batch', json={'events': events}, headers=HEADERS).json['results']
+
+    assert [r['ok'] for r in results] == [True, True, True, True, True, False, False, False]
+    assert results[5]['error'] == 'Session already ended'
+    session = db.get_study_session(results[0]['session_id'])
+    assert (session.questions_asked, session.confidence_level, session.duration) == (3, 9, 45)
+    assert db.get_study_session(existing).questions_asked == 1
+    assert client.get('/api/progress', headers=HEADERS).json['questions_asked'] == 4
+
+
+def test_invalid_events_fail_individually(client, db):
+    events = [
+        {'type': 'create', 'topic': 'python', 'ref': 'bad', 'start_time': 'yesterday'},
+        {'type': 'create', 'topic': 'python', 'ref': 'good', 'start_time': '2024-01-01T10:00:00'},
+        {'type': 'question', 'session_id': 'good', 'count': -50},
+        {'type': 'question', 'session_id': 'good', 'count': 'many'},
+        {'type': 'end', 'session_id': 'good', 'confidence_level': 'high'},
+        {'type': 'end', 'session_id': 'good', 'end_time': 'later'},
+        {'type': 'question', 'session_id': 'good', 'count': 2},
+        {'type': 'end', 'session_id': 'good', 'end_time': '2024-01-01T10:30:00'},
+    ]
+
+    response = client.post('/api/sessions/batch', json={'events': events}, headers=HEADERS)
+
+    assert response.status_code == 200
+    results = response.json['results']
+    assert [r['ok'] for r in results] == [False, True, False, False, False, False, True, True]
+    assert results[0]['error'] == 'start_time must be an ISO 8601 timestamp'
+    assert results[2]['error'] == 'count must be at least 1'
+    session = db.get_study_session(results[1]['session_id'])
+    assert (session.questions_asked, session.duration) == (2, 30)
+
+
+def test_events_with_wrong_types_fail_individually(client, db):
+    events = [
+        {'type': 'create', 'topic': ['x'], 'ref': 'bad'},
+        {'type': 'create', 'topic': 'python', 'ref': ['y']},
+        {'type': 'create', 'topic': 'python', 'ref': 'good', 'start_time': '2024-01-01T10:00:00'},
+        {'type': 'question', 'session_id': ['good']},
+        {'type': 'end', 'session_id': 'good', 'end_time': '2024-01-01T10:30:00+00:00'},
+    ]
+
+    response = client.post('/api/sessions/batch', json={'events': events}, headers=HEADERS)
+
+    assert response.status_code == 200
+    results = response.json['results']
+    assert [r['ok'] for r in results] == [False, False, True, False, True]
+    assert [results[i]['error'] for i in (0, 1, 3)] == [
+        'topic must be a string', 'ref must be a string', 'session_id must be a string'
+    ]
+    session = db.get_study_session(results[2]['session_id'])
+    expected = datetime.fromisoformat('2024-01-01T10:30:00+00:00').astimezone().replace(tzinfo=None)
+    assert session.end_time == expected.isoformat()
+
+
+def test_batch_cannot_touch_other_users_sessions(client, db):
+    other = client.post('/api/sessions', json={'topic': 'java'}, headers={'User-ID': 'someone-else'}).json['id']
+    results = client.post('/api/sessions/batch', json={'events': [{'type': 'end', 'session_id': other}]},
+                          headers=HEADERS).json['results']
+
+    assert results == [{'index': 0, 'ok': False, 'error': 'Session not found'}]
+    assert db.get_study_session(other).end_time == ''
+
+
+def test_import_sessions_from_jsonl_and_csv(client, app, db, tmp_path):
+    jsonl = tmp_path / 'sessions.jsonl'
+    jsonl.write_text('\n'.join(json.dumps({
+        'id': f'h{i}', 'user_id': 'batcher', 'topic': 'python', 'duration': 30,
+        'materials_covered': ['book'], 'start_time': f'2023-01-01T10:00:{i:02d}'
+    }) for i in range(50)))
+    csv_file = tmp_path / 'sessions.csv'
+    csv_file.write_text('id,user_id,topic,duration,materials_covered,questions_asked,confidence_level,start_time,end_time\n'
+                        'c1,batcher,java,15,"[""slides""]",2,7,2023-02-01T10:00:00,2023-02-01T10:15:00\n'
+                        'h0,batcher,python,30,[],0,0,2023-01-01T10:00:00,\n')
+
+    runner = app.test_cli_runner()
+    assert 'Imported 50 sessions' in runner.invoke(args=['import-sessions', str(jsonl)]).output
+    assert 'Imported 1 sessions' in runner.invoke(args=['import-sessions', str(csv_file)]).output
+
+    assert db.get_study_session('c1').materials_covered == ['slides']
+    assert client.get('/api/progress', headers=HEADERS).json['total_study_time'] == 50 * 30 + 15
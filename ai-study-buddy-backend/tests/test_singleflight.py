@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from cache import ResponseCache, SingleFlight
+from metrics import metrics
+from providers import GeminiProvider
+
+QUESTION = {'id': 'q1', 'question': 'Slow?', 'options': ['a', 'b', 'c', 'd'], 'correct_answer': 'a',
+            'explanation': 'Because'}
+
+
+class SlowFakeModel:
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return SimpleNamespace(text=json.dumps([QUESTION]))
+
+
+@pytest.fixture
+def model(study_buddy, monkeypatch):
+    model = SlowFakeModel(delay=0.5)
+    monkeypatch.setattr(study_buddy, 'has_gemini', True)
+    monkeypatch.setattr(study_buddy, 'provider', GeminiProvider(model))
+    # No response cache, so only in-flight coalescing can save calls
+    monkeypatch.setattr(study_buddy, 'cache', ResponseCache())
+    monkeypatch.setattr(study_buddy, 'inflight', SingleFlight())
+    metrics.reset()
+    return model
+
+
+def test_identical_concurrent_requests_share_one_call(app, study_buddy, model):
+    def fetch(_):
+        with app.test_client() as client:
+            return client.get('/api/quiz/generate?topic=python&difficulty=easy&numQuestions=1').json
+
+    # Kept below LLM_MAX_WORKERS: waiters hold an executor thread while they wait
+    with ThreadPoolExecutor(max_workers=30) as pool:
+        results = list(pool.map(fetch, range(30)))
+
+    assert model.calls == 1
+    assert all(result[0]['id'] == 'q1' for result in results)
+    assert study_buddy.inflight.stats() == {'leaders': 1, 'coalesced': 29, 'in_flight': 0}
+    assert metrics.value('llm_coalesced_total', kind='quiz') == 29
+
+
+def test_different_requests_are_not_coalesced(study_buddy, model):
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(lambda topic: study_buddy.generate_flashcards(topic, 1), ['python', 'java']))
+    assert model.calls == 2
+
+
+def test_waiters_get_independent_copies_and_errors():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.1)
+        return [{'front': 'Term'}]
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, 'k', slow)
+        started.wait()
+        waiter = pool.submit(flight.do, 'k', slow)
+        (lead_result, lead_shared), (wait_result, wait_shared) = leader.result(), waiter.result()
+
+    assert (lead_shared, wait_shared) == (False, True)
+    assert wait_result == lead_result and wait_result is not lead_result
+
+    def boom():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError('model down')
+
+    started.clear()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, 'k', boom)
+        started.wait()
+        waiter = pool.submit(flight.do, 'k', boom)
+        for future in (leader, waiter):
+            with pytest.raises(RuntimeError):
+                future.result()
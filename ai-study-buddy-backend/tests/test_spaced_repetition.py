@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from spaced_repetition import next_interval
+
+
+@pytest.mark.parametrize('performance, current, expected', [
+    ('easy', 1, 3), ('easy', 3, 14), ('medium', 1, 3), ('medium', 7, 14),
+    ('hard', 1, 1), ('hard', 14, 14), ('easy', 60, 60),
+])
+def test_next_interval_matches_client_schedule(performance, current, expected):
+    assert next_interval(performance, current) == expected
+
+
+def test_batch_of_reviews_is_recorded_in_one_request(client):
+    reviews = [{'question_id': f'q{i}', 'performance': 'easy'} for i in range(100)]
+    response = client.post('/api/reviews', json={'reviews': reviews}, headers={'User-ID': 'learner'})
+
+    assert response.status_code == 200
+    assert len(response.json['results']) == 100
+    assert {r['interval_days'] for r in response.json['results']} == {3}
+
+
+def test_repeated_card_in_batch_builds_on_previous_review(client, study_buddy):
+    results = study_buddy.scheduler.record_reviews('repeat-user', [
+        {'question_id': 'q1', 'performance': 'easy'},
+        {'question_id': 'q1', 'performance': 'easy'},
+    ])
+
+    assert [r['interval_days'] for r in results] == [3, 14]
+    assert [r['review_count'] for r in results] == [1, 2]
+    assert study_buddy.db.get_quiz_progress('repeat-user', ['q1'])['q1']['review_count'] == 2
+
+
+def test_due_queue_returns_only_cards_past_their_review_date(client, study_buddy):
+    scheduler = study_buddy.scheduler
+    past = datetime.now() - timedelta(days=10)
+    scheduler.record_reviews('learner', [{'question_id': 'old', 'performance': 'hard'}], now=past)
+    scheduler.record_reviews('learner', [{'question_id': 'fresh', 'performance': 'hard'}])
+    scheduler.record_reviews('someone-else', [{'question_id': 'other', 'performance': 'hard'}], now=past)
+
+    response = client.get('/api/reviews/due', headers={'User-ID': 'learner'})
+    assert [card['question_id'] for card in response.json] == ['old']
+
+
+def test_invalid_reviews_are_rejected(client):
+    response = client.post('/api/reviews', json={'reviews': [{'question_id': 'q1', 'performance': 'meh'}]})
+    assert response.status_code == 400
+    assert client.post('/api/reviews', json={'reviews': []}).status_code == 400
+
+
+@pytest.mark.parametrize('review', [
+    {'question_id': {'id': 'q1'}, 'performance': 'easy'},
+    {'question_id': 'q1', 'performance': ['easy']},
+    {'question_id': 'q1', 'performance': {'level': 'easy'}},
+])
+def test_reviews_with_wrong_types_are_rejected(client, review):
+    assert client.post('/api/reviews', json={'reviews': [review]}).status_code == 400
+
+
+def test_due_limit_is_validated_and_clamped(client, study_buddy):
+    scheduler = study_buddy.scheduler
+    past = datetime.now() - timedelta(days=10)
+    scheduler.record_reviews('learner', [{'question_id': f'q{i}', 'performance': 'hard'} for i in range(3)], now=past)
+
+    headers = {'User-ID': 'learner'}
+    assert client.get('/api/reviews/due?limit=abc', headers=headers).status_code == 400
+    assert len(client.get('/api/reviews/due?limit=-1', headers=headers).json) == 1
+    assert len(client.get('/api/reviews/due?limit=2', headers=headers).json) == 2
@@ -0,0 +1,66 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from cache import SemanticCache
+from providers import GeminiProvider
+
+
+class FakeStreamingModel:
+    def __init__(self, chunks, delay):
+        self.chunks = chunks
+        self.delay = delay
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        assert stream
+        for chunk in self.chunks:
+            time.sleep(self.delay)
+            yield SimpleNamespace(text=chunk)
+
+
+@pytest.fixture
+def client(client, study_buddy, monkeypatch):
+    monkeypatch.setattr(study_buddy, 'answers', SemanticCache())
+    return client
+
+
+def read_events(response):
+    events = []
+    for block in response.get_data(as_text=True).strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines.get('event', 'message'), json.loads(lines['data'])))
+    return events
+
+
+def test_stream_yields_first_token_before_generation_finishes(client, study_buddy, monkeypatch):
+    monkeypatch.setattr(study_buddy, 'has_gemini', True)
+    monkeypatch.setattr(study_buddy, 'provider', GeminiProvider(FakeStreamingModel(['Lists ', 'are ', 'ordered.'] + ['.'] * 7, 0.05)))
+    headers = {'User-ID': 'streamer'}
+    session_id = client.post('/api/sessions', json={'topic': 'python'}, headers=headers).json['id']
+
+    start = time.perf_counter()
+    response = client.post(f'/api/sessions/{session_id}/question?stream=1',
+                           json={'question': 'What is a list?'}, headers=headers, buffered=False)
+    chunks = iter(response.response)
+    first = next(chunks)
+    time_to_first_token = time.perf_counter() - start
+    body = first + b''.join(chunks)
+    total_time = time.perf_counter() - start
+
+    assert response.mimetype == 'text/event-stream'
+    assert json.loads(first.decode().split('data: ', 1)[1]) == {'token': 'Lists '}
+    assert time_to_first_token < total_time / 3
+    assert b'event: done' in body
+    assert study_buddy.db.get_study_session(session_id).questions_asked == 1
+
+
+def test_stream_uses_offline_fallback_without_model(client, study_buddy, monkeypatch):
+    monkeypatch.setattr(study_buddy, 'has_gemini', False)
+    response = client.post('/api/ask-question', json={'question': 'What is a list?'},
+                           headers={'Accept': 'text/event-stream'})
+
+    events = read_events(response)
+    assert events[0][1]['token'] == study_buddy._offline_answer('general knowledge')
+    assert events[-1] == ('done', {})